@@ -0,0 +1,254 @@
+import threading
+import subprocess
+import logging
+import shutil
+import queue
+import json
+import sys
+import re
+import os
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+ALERT_COOLDOWN_SECONDS = 300
+WEBHOOK_TIMEOUT_SECONDS = 5
+ALERT_LOG_NAME = "alerts.log"
+def normalize(text):
+    return " ".join(text.lower().split())
+def word_char(char):
+    return char.isalnum() or char == "_"
+class AhoCorasick:
+    def __init__(self, terms):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for term in terms:
+            self.add(term)
+        self.build()
+    def add(self, term):
+        node = 0
+        for char in term:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            node = next_node
+        if term not in self.output[node]:
+            self.output[node] += (term,)
+    def build(self):
+        pending = list(self.goto[0].values())
+        while pending:
+            following = []
+            for node in pending:
+                for char, child in self.goto[node].items():
+                    fallback = self.fail[node]
+                    while fallback and char not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    target = self.goto[fallback].get(char, 0)
+                    self.fail[child] = target if target != child else 0
+                    self.output[child] += self.output[self.fail[child]]
+                    following.append(child)
+            pending = following
+    def search(self, text):
+        node = 0
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for term in output[node]:
+                yield position + 1 - len(term), position + 1, term
+    def __len__(self):
+        return len(self.goto)
+class AlertRule:
+    def __init__(self, name, keywords=(), regex=None, streams=None, cooldown=ALERT_COOLDOWN_SECONDS):
+        self.name = name
+        self.keywords = [normalize(keyword) for keyword in keywords if keyword.strip()]
+        self.regex = re.compile(regex, re.IGNORECASE) if regex else None
+        self.streams = set(streams) if streams else None
+        self.cooldown = cooldown
+        if not self.keywords and self.regex is None:
+            raise ValueError(f"Alert rule {name} has neither keywords nor a regex")
+    def applies_to(self, stream):
+        return self.streams is None or stream in self.streams
+    @classmethod
+    def from_dict(cls, data, base_dir="."):
+        keywords = list(data.get("keywords", ()))
+        if data.get("keywords_file"):
+            with open(os.path.join(base_dir, data["keywords_file"]), encoding="utf-8") as keywords_file:
+                keywords.extend(line.strip() for line in keywords_file if line.strip() and not line.startswith("#"))
+        return cls(data["name"], keywords, data.get("regex"), data.get("streams"), data.get("cooldown", ALERT_COOLDOWN_SECONDS))
+def load_rules(path):
+    with open(path, encoding="utf-8") as rules_file:
+        data = json.load(rules_file)
+    items = data["rules"] if isinstance(data, dict) else data
+    return [AlertRule.from_dict(item, os.path.dirname(os.path.abspath(path))) for item in items]
+class Alert:
+    __slots__ = ("rule", "stream", "term", "text", "offset", "end_offset", "wall_start", "audio", "audio_offset")
+    def __init__(self, rule, stream, term, text, offset, end_offset, wall_start, audio=None, audio_offset=None):
+        self.rule = rule
+        self.stream = stream
+        self.term = term
+        self.text = text
+        self.offset = offset
+        self.end_offset = end_offset
+        self.wall_start = wall_start
+        self.audio = audio
+        self.audio_offset = audio_offset
+    def to_dict(self):
+        return {
+            "rule": self.rule,
+            "stream": self.stream,
+            "term": self.term,
+            "time": datetime.fromtimestamp(self.wall_start).isoformat(timespec="milliseconds"),
+            "start": round(self.wall_start, 3),
+            "offset": round(self.offset, 3),
+            "end_offset": round(self.end_offset, 3),
+            "audio": os.path.basename(self.audio) if self.audio else None,
+            "audio_offset": None if self.audio_offset is None else round(self.audio_offset, 3),
+            "text": self.text
+        }
+    def summary(self):
+        return f"{self.stream} [{self.rule}] \"{self.term}\" at {self.offset:.1f}s: {self.text}"
+class AlertEngine:
+    def __init__(self, rules, hooks=()):
+        self.rules = list(rules)
+        self.hooks = list(hooks)
+        self.matchers = {}
+        self.last_fired = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = None
+    def matcher(self, stream):
+        matcher = self.matchers.get(stream)
+        if matcher is None:
+            terms = {}
+            regexes = []
+            for rule in self.rules:
+                if not rule.applies_to(stream):
+                    continue
+                for keyword in rule.keywords:
+                    terms.setdefault(keyword, []).append(rule)
+                if rule.regex is not None:
+                    regexes.append(rule)
+            matcher = self.matchers[stream] = (AhoCorasick(terms) if terms else None, terms, regexes)
+        return matcher
+    def match(self, stream, text):
+        automaton, terms, regexes = self.matcher(stream)
+        normalized = normalize(text)
+        found = []
+        if automaton is not None:
+            for start, end, term in automaton.search(normalized):
+                if start > 0 and word_char(normalized[start - 1]) or end < len(normalized) and word_char(normalized[end]):
+                    continue
+                found.extend((rule, term) for rule in terms[term])
+        for rule in regexes:
+            for match in rule.regex.finditer(text):
+                found.append((rule, normalize(match.group(0))))
+        return found
+    def process(self, records, locate=None):
+        alerts = []
+        for record in records:
+            for rule, term in self.match(record.stream, record.text):
+                key = (rule.name, record.stream, term)
+                with self.lock:
+                    counts = self.counts.setdefault(record.stream, {"matches": 0, "alerts": 0, "suppressed": 0})
+                    counts["matches"] += 1
+                    last = self.last_fired.get(key)
+                    if last is not None and record.wall_start - last < rule.cooldown:
+                        counts["suppressed"] += 1
+                        continue
+                    self.last_fired[key] = record.wall_start
+                    counts["alerts"] += 1
+                audio, audio_offset = locate(record.offset) if locate is not None else (None, None)
+                alerts.append(Alert(rule.name, record.stream, term, record.text, record.offset, record.end_offset, record.wall_start, audio, audio_offset))
+        for alert in alerts:
+            logging.info(f"Alert: {alert.summary()}")
+            self.queue.put(alert)
+        return alerts
+    def start(self):
+        self.thread = threading.Thread(target=self.dispatch, name="alerts", daemon=True)
+        self.thread.start()
+    def dispatch(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                break
+            for hook in self.hooks:
+                try:
+                    hook(alert)
+                except Exception as e:
+                    logging.error(f"Alert hook {type(hook).__name__} failed: {str(e)}")
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        for hook in self.hooks:
+            close = getattr(hook, "close", None)
+            if close is not None:
+                close()
+    def stats(self, stream):
+        with self.lock:
+            return dict(self.counts.get(stream, {"matches": 0, "alerts": 0, "suppressed": 0}))
+class FileHook:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+    def __call__(self, alert):
+        self.file.write(json.dumps(alert.to_dict(), ensure_ascii=False) + "\n")
+        self.file.flush()
+    def close(self):
+        self.file.close()
+class WebhookHook:
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+    def __call__(self, alert):
+        body = json.dumps(alert.to_dict(), ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.url, body, {"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+class DesktopHook:
+    def __init__(self, notify=None):
+        self.notify = notify or self.command_notify
+    def __call__(self, alert):
+        self.notify(f"{alert.stream}: {alert.term}", alert.text)
+    def command_notify(self, title, message):
+        if sys.platform == "darwin":
+            script = f"display notification {json.dumps(message)} with title {json.dumps(title)}"
+            command = ["osascript", "-e", script]
+        elif shutil.which("notify-send"):
+            command = ["notify-send", "--app-name=stream", title, message]
+        else:
+            logging.warning(f"No desktop notifier available: {title}: {message}")
+            return
+        subprocess.run(command, timeout=WEBHOOK_TIMEOUT_SECONDS, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+class WebhookReceiver(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            alert = json.loads(body)
+            print(f"{alert['time']} {alert['stream']} [{alert['rule']}] {alert['term']} @ {alert['offset']}s: {alert['text']}", flush=True)
+        except (ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+            return
+        self.send_response(204)
+        self.end_headers()
+    def log_message(self, format, *args):
+        logging.debug(f"Alert receiver: {format % args}")
+def serve_webhooks(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), WebhookReceiver)
+    logging.info(f"Receiving alerts at http://{host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,674 @@
+import argparse
+import itertools
+import tracemalloc
+import subprocess
+import threading
+import mimetypes
+import tempfile
+import glob
+import os
+import logging
+import json
+import time
+import wave
+import sys
+import io
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+from engine import setup_model_cache, add_model_arguments
+from pipeline import Chunk, PCMRing, FloatBuffer, pcm_to_float, SAMPLE_RATE, SAMPLE_WIDTH, BYTES_PER_SECOND, AUDIO_FILTERS
+def load_pcm(path, ffmpeg="ffmpeg"):
+    try:
+        with wave.open(path, "rb") as wav_file:
+            if wav_file.getframerate() == SAMPLE_RATE and wav_file.getnchannels() == 1 and wav_file.getsampwidth() == 2:
+                return wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        pass
+    result = subprocess.run(
+        [ffmpeg, "-v", "error", "-i", path, "-vn", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-f", "s16le", "-"],
+        stdout=subprocess.PIPE,
+        check=True
+    )
+    return result.stdout
+def normalize_text(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+def wer(reference, hypothesis):
+    ref = normalize_text(reference)
+    hyp = normalize_text(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+def read_reference(path):
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as reference_file:
+        return reference_file.read()
+def fixed_chunks(pcm, chunk_bytes):
+    return [Chunk(pcm[start:start + chunk_bytes], index, start / BYTES_PER_SECOND) for index, start in enumerate(range(0, len(pcm), chunk_bytes))]
+def vad_chunks(pcm, max_seconds, min_seconds=3.0, min_silence=0.5):
+    from vad import VADSegmenter, READ_BYTES
+    segmenter = VADSegmenter(min(min_seconds, max_seconds), max_seconds, min_silence)
+    chunks = []
+    for start in range(0, len(pcm), READ_BYTES):
+        chunks.extend(segmenter.feed(Chunk(pcm[start:start + READ_BYTES], 0, start / BYTES_PER_SECOND)))
+    chunks.extend(segmenter.flush())
+    return chunks, segmenter.stats()
+def transcribe_chunks(model, chunks, **options):
+    texts = []
+    cpu_started = time.process_time()
+    wall_started = time.time()
+    for chunk in chunks:
+        segments, info = model.transcribe(pcm_to_float(chunk.data), **options)
+        texts.append("".join(segment.text for segment in segments))
+    return " ".join(texts), time.process_time() - cpu_started, time.time() - wall_started
+def print_table(rows, columns):
+    widths = [max(len(column), *(len(f"{row.get(column, '')}") for row in rows)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(f"{row.get(column, '')}".ljust(width) for column, width in zip(columns, widths)))
+def latest_recording(output_dir):
+    files = glob.glob(os.path.join(output_dir, "*_audio_*.wav")) + glob.glob(os.path.join(output_dir, "*_audio_*.mp3"))
+    if not files:
+        raise SystemExit(f"No recordings found in {output_dir}, pass an audio file")
+    return max(files, key=os.path.getmtime)
+def accuracy_rank(config):
+    from models import MODEL_SIZES, COMPUTE_TYPES
+    size_rank = MODEL_SIZES.index(config.size) if config.size in MODEL_SIZES else -1
+    precision_rank = COMPUTE_TYPES.index(config.compute_type) if config.compute_type in COMPUTE_TYPES else 0
+    return (size_rank, config.beam_size, not config.without_timestamps, precision_rank)
+def candidate_configs(args):
+    from models import ModelConfig
+    configs = []
+    for size, compute_type, threads, workers, beam_size, without_timestamps in itertools.product(args.sizes, args.compute_types, args.threads, args.workers, args.beam_sizes, args.without_timestamps):
+        configs.append(ModelConfig(size, args.device, compute_type, threads, workers, beam_size, beam_size, bool(without_timestamps)))
+    return configs
+def run_config(config, chunks):
+    from models import ModelPool
+    pool = ModelPool.from_config(config)
+    pool.start(warm_up=True)
+    try:
+        pool.handle.wait()
+        pool.handle.warm_up()
+        started = time.time()
+        jobs = [pool.submit("autotune", pcm_to_float(chunk.data)) for chunk in chunks]
+        texts = []
+        for job in jobs:
+            job.done.wait()
+            if job.error is not None:
+                raise job.error
+            texts.append("".join(segment.text for segment in job.result))
+        return " ".join(texts), time.time() - started
+    finally:
+        pool.stop()
+        pool.release()
+def autotune(args, ffmpeg="ffmpeg"):
+    audio_path = args.audio or latest_recording(args.output_dir)
+    pcm = load_pcm(audio_path, ffmpeg)[:int(args.sample_seconds * BYTES_PER_SECOND) // 2 * 2]
+    audio_seconds = len(pcm) / BYTES_PER_SECOND
+    if not audio_seconds:
+        raise SystemExit(f"No audio in {audio_path}")
+    chunks = fixed_chunks(pcm, int(args.chunk_seconds * BYTES_PER_SECOND) // 2 * 2)
+    configs = sorted(candidate_configs(args), key=accuracy_rank, reverse=True)
+    reference = read_reference(args.reference)
+    print(f"Testing {len(configs)} settings on {audio_seconds:.0f}s of {audio_path}")
+    rows = []
+    for config in configs:
+        try:
+            text, wall_seconds = run_config(config, chunks)
+        except Exception as e:
+            logging.error(f"{config.label()}: {str(e)}")
+            continue
+        if reference is None:
+            reference = text
+            logging.info(f"Using {config.label()} output as the reference transcript")
+        row = {
+            "config": config.label(),
+            "rtf": round(wall_seconds / audio_seconds, 3),
+            "wer": round(wer(reference, text), 4),
+            "settings": config
+        }
+        rows.append(row)
+        print(f"{row['config']}: rtf={row['rtf']} wer={row['wer']}")
+    if not rows:
+        raise SystemExit("No settings could be tested")
+    print_table(rows, ["config", "rtf", "wer"])
+    fitting = [row for row in rows if row["rtf"] <= args.target_rtf]
+    if not fitting:
+        best = min(rows, key=lambda row: row["rtf"])
+        print(f"No settings reach RTF {args.target_rtf}; fastest is {best['config']} (rtf={best['rtf']})")
+    else:
+        best = min(fitting, key=lambda row: (row["wer"], row["rtf"]))
+        print(f"Best under RTF {args.target_rtf}: {best['config']} (rtf={best['rtf']}, wer={best['wer']})")
+    save_path = args.save or os.path.join(args.output_dir, "model_config.json")
+    best["settings"].save(save_path)
+    print(f"Settings saved to {save_path}")
+    return 0
+def legacy_ingest(source, chunk_bytes):
+    import numpy as np
+    reader = io.BufferedReader(source, buffer_size=10**8)
+    while True:
+        audio_bytes = reader.read(chunk_bytes)
+        if not audio_bytes:
+            return
+        yield np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+def ring_ingest(source, chunk_bytes, slots=11):
+    ring = PCMRing(chunk_bytes, slots)
+    buffer = FloatBuffer(chunk_bytes // SAMPLE_WIDTH)
+    while True:
+        block = ring.read_block(source)
+        if block is None:
+            return
+        yield buffer.convert(block)
+def measure_ingest(reader, pcm, chunk_bytes):
+    source = io.BytesIO(pcm)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    blocks = 0
+    setup = 0
+    allocated = 0
+    resident = 0
+    started = time.perf_counter()
+    audio_blocks = reader(source, chunk_bytes)
+    while True:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        audio = next(audio_blocks, None)
+        if audio is None:
+            break
+        if blocks:
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        else:
+            setup = tracemalloc.get_traced_memory()[1] - before
+        resident = max(resident, tracemalloc.get_traced_memory()[0] - baseline)
+        blocks += 1
+        del audio
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return blocks, setup, allocated, resident, elapsed
+def cmd_ingest(args):
+    import numpy as np
+    if args.audio:
+        pcm = load_pcm(args.audio, args.ffmpeg)
+    else:
+        pcm = np.random.default_rng(0).integers(-3000, 3000, int(args.seconds * SAMPLE_RATE), dtype=np.int16).tobytes()
+    hours = len(pcm) / BYTES_PER_SECOND / 3600
+    rows = []
+    for name, reader in (("read+astype", legacy_ingest), ("readinto ring", ring_ingest)):
+        blocks, setup, allocated, resident, elapsed = measure_ingest(reader, pcm, args.chunk_bytes)
+        rows.append({
+            "path": name,
+            "blocks": blocks,
+            "setup_mb": round(setup / 2**20, 2),
+            "alloc_mb_per_block": round(allocated / max(1, blocks - 1) / 2**20, 3),
+            "alloc_mb_per_stream_hour": round(allocated / max(1, blocks - 1) * blocks / hours / 2**20, 1),
+            "resident_mb": round(resident / 2**20, 2),
+            "ms_per_block": round(elapsed * 1000 / max(1, blocks), 3)
+        })
+    print_table(rows, ["path", "blocks", "setup_mb", "alloc_mb_per_block", "alloc_mb_per_stream_hour", "resident_mb", "ms_per_block"])
+    return 0
+def run_batches(config, chunks, streams):
+    from models import ModelPool
+    pool = ModelPool.from_config(config)
+    pool.start(warm_up=True)
+    try:
+        pool.handle.wait()
+        pool.handle.warm_up()
+        started = time.time()
+        jobs = [pool.submit(f"stream{index % streams}", pcm_to_float(chunk.data)) for index, chunk in enumerate(chunks)]
+        texts = []
+        for job in jobs:
+            texts.append("".join(segment.text for segment in job.wait()))
+        wall_seconds = time.time() - started
+        latencies = sorted(job.finished - job.submitted for job in jobs)
+        return " ".join(texts), wall_seconds, latencies, pool.batches
+    finally:
+        pool.stop()
+        pool.release()
+def cmd_batch(args):
+    from models import ModelConfig
+    setup_model_cache()
+    pcm = load_pcm(args.audio, args.ffmpeg)[:int(args.sample_seconds * BYTES_PER_SECOND) // 2 * 2]
+    audio_seconds = len(pcm) / BYTES_PER_SECOND
+    chunks = fixed_chunks(pcm, int(args.chunk_seconds * BYTES_PER_SECOND) // 2 * 2)
+    reference = read_reference(args.reference)
+    rows = []
+    for batch_size in args.batch_sizes:
+        config = ModelConfig(args.model, "cpu", args.compute_type, args.threads, 1, args.beam_size, args.beam_size, batch_size=batch_size, batch_wait=args.batch_wait)
+        text, wall_seconds, latencies, batches = run_batches(config, chunks, args.streams)
+        if reference is None:
+            reference = text
+        rows.append({
+            "batch": batch_size,
+            "batches": batches,
+            "audio_s_per_s": round(audio_seconds / wall_seconds, 2),
+            "rtf": round(wall_seconds / audio_seconds, 3),
+            "avg_latency_s": round(sum(latencies) / len(latencies), 2),
+            "p95_latency_s": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+            "wer": round(wer(reference, text), 4)
+        })
+        print(f"batch={batch_size}: {rows[-1]['audio_s_per_s']} audio s/s, p95 latency {rows[-1]['p95_latency_s']}s")
+    print_table(rows, ["batch", "batches", "audio_s_per_s", "rtf", "avg_latency_s", "p95_latency_s", "wer"])
+    return 0
+def cmd_vad(args):
+    from models import load_model
+    setup_model_cache()
+    pcm = load_pcm(args.audio, args.ffmpeg)
+    reference = read_reference(args.reference)
+    minutes = len(pcm) / BYTES_PER_SECOND / 60
+    model = load_model(args.model, compute_type=args.compute_type, cpu_threads=args.threads)
+    max_seconds = args.chunk_bytes / BYTES_PER_SECOND
+    chunks, vad_stats = vad_chunks(pcm, max_seconds, args.min_chunk, args.min_silence)
+    modes = [
+        ("fixed", fixed_chunks(pcm, args.chunk_bytes), True),
+        ("vad", chunks, False)
+    ]
+    rows = []
+    for name, mode_chunks, vad_filter in modes:
+        text, cpu_seconds, wall_seconds = transcribe_chunks(model, mode_chunks, language="en", vad_filter=vad_filter)
+        sent_seconds = sum(chunk.duration for chunk in mode_chunks)
+        row = {
+            "mode": name,
+            "chunks": len(mode_chunks),
+            "avg_chunk_s": round(sent_seconds / max(1, len(mode_chunks)), 2),
+            "sent_s": round(sent_seconds, 1),
+            "cpu_s_per_min": round(cpu_seconds / minutes, 2) if minutes else 0.0,
+            "wall_s": round(wall_seconds, 2),
+            "rtf": round(wall_seconds / (minutes * 60), 3) if minutes else 0.0
+        }
+        if reference is not None:
+            row["wer"] = round(wer(reference, text), 4)
+        rows.append(row)
+    print_table(rows, ["mode", "chunks", "avg_chunk_s", "sent_s", "cpu_s_per_min", "wall_s", "rtf", "wer"])
+    print(f"VAD dropped {vad_stats['dropped_seconds']:.1f}s of {vad_stats['input_seconds']:.1f}s input")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump({"audio": args.audio, "minutes": minutes, "rows": rows, "vad": vad_stats}, json_file, indent=2)
+    return 0
+def legacy_ui_chunk(text_box, sentences, ranges):
+    from PySide6.QtCore import Qt
+    from PySide6.QtGui import QTextCursor
+    from transcript_view import char_format
+    cursor = text_box.textCursor()
+    for start, end in ranges:
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.mergeCharFormat(char_format(Qt.GlobalColor.blue))
+    ranges.clear()
+    for sentence in sentences:
+        cursor = text_box.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        start = cursor.position()
+        cursor.insertText(sentence, char_format(Qt.GlobalColor.red))
+        ranges.append((start, cursor.position()))
+        text_box.ensureCursorVisible()
+def view_ui_chunk(view, log, sentences):
+    from PySide6.QtCore import Qt
+    view.commit()
+    text = "".join(sentences)
+    log.append(text)
+    view.append(text, Qt.GlobalColor.red)
+def uncommitted_chars(view):
+    expected = view.committed_format.foreground().color()
+    count = 0
+    block = view.document.begin()
+    while block.isValid():
+        iterator = block.begin()
+        while not iterator.atEnd():
+            fragment = iterator.fragment()
+            fmt = fragment.charFormat()
+            if fmt.foreground().color() != expected or fmt.fontWeight() != view.committed_format.fontWeight():
+                count += fragment.length()
+            iterator += 1
+        block = block.next()
+    return count
+def cmd_ui(args):
+    import tempfile
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QTextEdit
+    from transcript_view import TranscriptView, TranscriptLog
+    app = QApplication.instance() or QApplication([])
+    sentence = "The quick brown fox jumps over the lazy dog near the river bank.\n"
+    chunks = [[sentence] * args.lines_per_chunk for _ in range(args.lines // args.lines_per_chunk)]
+    rows = []
+    for name in ("per-sentence", "per-chunk view"):
+        text_box = QTextEdit()
+        text_box.setReadOnly(True)
+        text_box.resize(800, 600)
+        text_box.show()
+        fd, path = tempfile.mkstemp(prefix="transcript_", suffix=".txt")
+        os.close(fd)
+        log = TranscriptLog(path, temporary=True)
+        view = TranscriptView(text_box, args.max_lines) if name == "per-chunk view" else None
+        if view is not None:
+            view.reset(log)
+        ranges = []
+        timings = []
+        for sentences in chunks:
+            started = time.perf_counter()
+            if view is None:
+                legacy_ui_chunk(text_box, sentences, ranges)
+            else:
+                view_ui_chunk(view, log, sentences)
+            app.processEvents()
+            timings.append(time.perf_counter() - started)
+        if view is not None:
+            view.commit()
+            wrong = uncommitted_chars(view)
+            if wrong:
+                raise SystemExit(f"{wrong} committed character(s) do not carry the committed format")
+        head = timings[:max(1, len(timings) // 10)]
+        tail = timings[-max(1, len(timings) // 10):]
+        timings.sort()
+        rows.append({
+            "path": name,
+            "lines": len(chunks) * args.lines_per_chunk,
+            "blocks": text_box.document().blockCount(),
+            "chars": text_box.document().characterCount(),
+            "avg_ms_per_chunk": round(sum(timings) * 1000 / len(timings), 3),
+            "p95_ms_per_chunk": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 3),
+            "first10pct_ms_per_chunk": round(sum(head) * 1000 / len(head), 3),
+            "last10pct_ms_per_chunk": round(sum(tail) * 1000 / len(tail), 3),
+            "growth": round(sum(tail) * len(head) / (sum(head) * len(tail)), 2) if sum(head) else 0.0
+        })
+        if view is not None:
+            view.reset()
+        else:
+            log.close()
+        text_box.close()
+    print_table(rows, ["path", "lines", "blocks", "chars", "avg_ms_per_chunk", "p95_ms_per_chunk", "first10pct_ms_per_chunk", "last10pct_ms_per_chunk", "growth"])
+    view_row = rows[-1]
+    if view_row["growth"] > args.max_growth:
+        print(f"REGRESSION {view_row['path']}: last 10% of chunks took {view_row['growth']}x the first 10% (limit {args.max_growth}x)")
+        return 1
+    print(f"{view_row['path']} stays within {args.max_growth}x per chunk at {view_row['lines']} lines")
+    return 0
+class ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.server.files.get(unquote(self.path.lstrip("/")))
+        if path is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("icy-name", os.path.basename(path))
+        self.end_headers()
+        rate = self.server.rates.get(path)
+        started = time.time()
+        sent = 0
+        with open(path, "rb") as audio_file:
+            while True:
+                data = audio_file.read(16384)
+                if not data:
+                    break
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                sent += len(data)
+                if rate:
+                    ahead = sent / rate - (time.time() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+    def log_message(self, format, *args):
+        logging.debug(f"Replay server: {format % args}")
+class ReplayServer:
+    def __init__(self, paths, speed=0.0, durations=None, port=0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), ReplayHandler)
+        self.server.daemon_threads = True
+        self.server.files = {os.path.basename(path): path for path in paths}
+        self.server.rates = {}
+        if speed:
+            for path in paths:
+                self.server.rates[path] = os.path.getsize(path) / durations[path] * speed
+        self.thread = threading.Thread(target=self.server.serve_forever, name="replay-http", daemon=True)
+    def url(self, path):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{quote(os.path.basename(path))}"
+    def start(self):
+        self.thread.start()
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+class PeakMemory:
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="peak-memory", daemon=True)
+    def start(self):
+        self.thread.start()
+    def run(self):
+        from metrics import memory_usage
+        while True:
+            self.peak = max(self.peak, memory_usage())
+            if self.stop_event.wait(self.interval):
+                return
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        return self.peak
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+def reference_for(path, references_dir=None):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    candidates = [os.path.join(references_dir, f"{stem}.txt")] if references_dir else []
+    candidates.append(os.path.join(os.path.dirname(path), f"{stem}.ref.txt"))
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return read_reference(candidate)
+    return None
+def replay_group(pool, args, targets, output_dir):
+    from sessions import SessionManager
+    texts = {name: [] for name, url, path in targets}
+    def collect_text(session, chunk, text):
+        texts[session.name].append(text)
+    manager = SessionManager(
+        pool,
+        ffmpeg_path=args.ffmpeg,
+        output_dir=output_dir,
+        chunk_bytes=args.chunk_bytes,
+        record=False,
+        on_text=collect_text,
+        transcribe_policy="block",
+        chunking=args.chunking,
+        min_chunk=args.min_chunk,
+        min_silence=args.min_silence,
+        sidecar_formats=(),
+        loop_input=False,
+        reconnect=False
+    )
+    for name, url, path in targets:
+        manager.add(name, url, filters=tuple(args.filters), speech_gate=args.speech_gate)
+    memory = PeakMemory()
+    memory.start()
+    started = time.time()
+    manager.start()
+    try:
+        manager.wait(0)
+    finally:
+        wall_seconds = time.time() - started
+        manager.stop()
+        peak = memory.stop()
+    results = []
+    for name, url, path in targets:
+        session = manager.sessions[name]
+        audio_seconds = session.pipeline.bytes_read / BYTES_PER_SECOND
+        latencies = list(session.pipeline.stages[0].latencies)
+        chunker = session.pipeline.stages[0].chunker
+        skipped = sum((chunker.stats().get("filters") or {}).values()) if chunker is not None else 0.0
+        results.append((path, "".join(texts[name]), audio_seconds, wall_seconds, latencies, peak, session.first_transcript_time, skipped))
+    return results
+def replay_row(args, path, text, audio_seconds, wall_seconds, latencies, peak, first_transcript, skipped):
+    row = {
+        "file": os.path.basename(path),
+        "audio_s": round(audio_seconds, 1),
+        "wall_s": round(wall_seconds, 2),
+        "audio_s_per_s": round(audio_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+        "rtf": round(wall_seconds / audio_seconds, 3) if audio_seconds else 0.0,
+        "first_text_s": round(first_transcript, 2) if first_transcript is not None else None,
+        "p50_latency_s": round(percentile(latencies, 0.5), 2),
+        "p95_latency_s": round(percentile(latencies, 0.95), 2),
+        "max_latency_s": round(max(latencies), 2) if latencies else 0.0,
+        "peak_rss_mb": round(peak / 2**20, 1),
+        "skipped_s": round(skipped, 1),
+        "wer": None
+    }
+    reference = reference_for(path, args.references)
+    if reference is not None:
+        row["wer"] = round(wer(reference, text), 4)
+    if args.transcripts:
+        os.makedirs(args.transcripts, exist_ok=True)
+        with open(os.path.join(args.transcripts, f"{os.path.splitext(row['file'])[0]}.txt"), "w", encoding="utf-8") as text_file:
+            text_file.write(text)
+    return row
+REGRESSION_KEYS = ("rtf", "p95_latency_s", "peak_rss_mb")
+def compare_baseline(rows, baseline, tolerance, wer_tolerance):
+    failures = []
+    previous = baseline.get("rows", {})
+    for row in rows:
+        base = previous.get(row["file"])
+        if base is None:
+            logging.warning(f"{row['file']} is not in the baseline")
+            continue
+        for key in REGRESSION_KEYS:
+            if base.get(key) and row[key] > base[key] * (1 + tolerance):
+                failures.append(f"{row['file']}: {key} {row[key]} > baseline {base[key]} (+{tolerance:.0%})")
+        if row["wer"] is not None and base.get("wer") is not None and row["wer"] > base["wer"] + wer_tolerance:
+            failures.append(f"{row['file']}: wer {row['wer']} > baseline {base['wer']} (+{wer_tolerance})")
+    return failures
+def replay_settings(args, config):
+    settings = {"model": config.to_dict(), "chunking": args.chunking, "chunk_bytes": args.chunk_bytes, "concurrent": args.concurrent, "serve": args.serve, "speed": args.speed}
+    if args.filters or args.speech_gate:
+        settings["filters"] = list(args.filters)
+        settings["speech_gate"] = args.speech_gate
+    return settings
+def cmd_replay(args):
+    from models import ModelPool
+    from engine import model_config_from_args
+    setup_model_cache()
+    paths = [path for pattern in args.audio for path in (sorted(glob.glob(pattern)) or [pattern])]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise SystemExit(f"Audio file(s) not found: {', '.join(missing)}")
+    config = model_config_from_args(args)
+    pool = ModelPool.from_config(config)
+    pool.start(warm_up=True)
+    server = None
+    rows = []
+    try:
+        if args.serve or args.speed:
+            durations = {path: len(load_pcm(path, args.ffmpeg)) / BYTES_PER_SECOND for path in paths} if args.speed else None
+            server = ReplayServer(paths, args.speed, durations)
+            server.start()
+        targets = []
+        for index, path in enumerate(paths):
+            targets.append((f"replay{index + 1}", server.url(path) if server else path, path))
+        groups = [targets] if args.concurrent else [[target] for target in targets]
+        pool.handle.wait()
+        pool.handle.warm_up()
+        with tempfile.TemporaryDirectory(prefix="replay_") as output_dir:
+            for group in groups:
+                for result in replay_group(pool, args, group, output_dir):
+                    rows.append(replay_row(args, *result))
+                    print(f"{rows[-1]['file']}: {rows[-1]['audio_s_per_s']} audio s/s, p95 latency {rows[-1]['p95_latency_s']}s, wer {rows[-1]['wer']}")
+    finally:
+        pool.stop()
+        if server is not None:
+            server.stop()
+    print_table(rows, ["file", "audio_s", "wall_s", "audio_s_per_s", "rtf", "first_text_s", "p50_latency_s", "p95_latency_s", "max_latency_s", "peak_rss_mb", "skipped_s", "wer"])
+    settings = replay_settings(args, config)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump({"settings": settings, "rows": rows}, json_file, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump({"settings": settings, "rows": {row["file"]: row for row in rows}}, baseline_file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("settings") != settings:
+            print(f"Settings differ from the baseline: {json.dumps(baseline.get('settings'))}")
+        failures = compare_baseline(rows, baseline, args.tolerance, args.wer_tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python benchmark.py", description="Offline benchmarks for the transcription pipeline.")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="path to the ffmpeg executable")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    vad = subparsers.add_parser("vad", help="compare fixed-size and VAD chunking (WER, CPU seconds per audio minute)")
+    vad.add_argument("audio", help="audio file to replay")
+    vad.add_argument("--reference", help="reference transcript for WER")
+    vad.add_argument("--chunk-bytes", type=int, default=16000 * 2 * 15, help="fixed block size and VAD maximum block size")
+    vad.add_argument("--min-chunk", type=float, default=3.0)
+    vad.add_argument("--min-silence", type=float, default=0.5)
+    vad.add_argument("--model", default="base")
+    vad.add_argument("--compute-type", default="int8")
+    vad.add_argument("--threads", type=int, default=0)
+    vad.add_argument("--json", help="write results to this JSON file")
+    vad.set_defaults(func=cmd_vad)
+    batch = subparsers.add_parser("batch", help="throughput and latency of batched decoding for several batch sizes")
+    batch.add_argument("audio", help="audio file whose blocks are queued all at once, as a backlog or several streams would")
+    batch.add_argument("--reference", help="reference transcript for WER (default: the first batch size's output)")
+    batch.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8, 16])
+    batch.add_argument("--batch-wait", type=float, default=0.05)
+    batch.add_argument("--streams", type=int, default=4, help="number of streams the blocks are spread over")
+    batch.add_argument("--sample-seconds", type=float, default=300)
+    batch.add_argument("--chunk-seconds", type=float, default=15)
+    batch.add_argument("--model", default="base")
+    batch.add_argument("--compute-type", default="int8")
+    batch.add_argument("--beam-size", type=int, default=5)
+    batch.add_argument("--threads", type=int, default=0)
+    batch.set_defaults(func=cmd_batch)
+    replay = subparsers.add_parser("replay", help="replay audio files through FFmpeg, chunking and the model pool as live sessions and check them against a baseline")
+    replay.add_argument("audio", nargs="+", help="audio files or glob patterns; FOO.ref.txt next to a file is used as its reference transcript")
+    replay.add_argument("--references", help="directory with reference transcripts named after the audio files (STEM.txt)")
+    replay.add_argument("--serve", action="store_true", help="serve the files from a local HTTP stand-in server instead of letting FFmpeg open them directly")
+    replay.add_argument("--speed", type=float, default=0, help="with the server, send audio at this multiple of real time (1 = live pacing), 0 sends as fast as possible")
+    replay.add_argument("--filters", nargs="*", default=[], choices=sorted(AUDIO_FILTERS), help="FFmpeg filters applied to the audio sent to the model")
+    replay.add_argument("--speech-gate", action="store_true", help="skip blocks the speech/music classifier finds to be mostly music or silence")
+    replay.add_argument("--concurrent", action="store_true", help="replay all files at once as separate streams sharing the model pool")
+    replay.add_argument("--chunking", choices=("fixed", "vad", "streaming"), default="fixed")
+    replay.add_argument("--chunk-bytes", type=int, default=16000 * 2 * 15)
+    replay.add_argument("--min-chunk", type=float, default=3.0)
+    replay.add_argument("--min-silence", type=float, default=0.5)
+    add_model_arguments(replay)
+    replay.add_argument("--transcripts", help="write each file's transcript to this directory")
+    replay.add_argument("--json", help="write results to this JSON file")
+    replay.add_argument("--save-baseline", help="write the results as a baseline JSON file")
+    replay.add_argument("--baseline", help="compare with this baseline and exit with status 1 on a regression")
+    replay.add_argument("--tolerance", type=float, default=0.15, help="allowed relative increase of rtf, p95 latency and peak RSS")
+    replay.add_argument("--wer-tolerance", type=float, default=0.02, help="allowed absolute increase of WER")
+    replay.set_defaults(func=cmd_replay)
+    ingest = subparsers.add_parser("ingest", help="compare allocations and memory of the old read/astype path and the readinto ring")
+    ingest.add_argument("--audio", help="audio file to replay (default: synthetic noise)")
+    ingest.add_argument("--seconds", type=float, default=600, help="length of the synthetic audio")
+    ingest.add_argument("--chunk-bytes", type=int, default=16000 * 2 * 15)
+    ingest.set_defaults(func=cmd_ingest)
+    ui = subparsers.add_parser("ui", help="UI-thread time per transcribed block for the old per-sentence updates and the bounded transcript view")
+    ui.add_argument("--lines", type=int, default=12000, help="transcript lines to append")
+    ui.add_argument("--lines-per-chunk", type=int, default=4)
+    ui.add_argument("--max-lines", type=int, default=2000, help="lines kept in the view's document")
+    ui.add_argument("--max-growth", type=float, default=2.0, help="fail if the view's time per chunk over the last 10%% of appends exceeds the first 10%% by more than this factor")
+    ui.set_defaults(func=cmd_ui)
+    return parser
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", stream=sys.stderr)
+    return args.func(args)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+import argparse
+import logging
+import signal
+import threading
+import time
+import sys
+import os
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from transcripts import open_index, SIDECAR_FORMATS
+STREAMS = {
+    "Aljazeera": "https://live-hls-audio-aje-fa.getaj.net/VOICE-AJE/01.m3u8",
+    "Aljazeera_News": "http://live-hls-web-aje.getaj.net/AJE/06.m3u8",
+    "BBC": "https://stream.live.vc.bbcmedia.co.uk/bbc_world_service",
+    "BBC_east": "https://stream.live.vc.bbcmedia.co.uk/bbc_world_service_east_asia",
+    "BBC_radio": "http://as-hls-ww-live.akamaized.net/pool_55057080/live/ww/bbc_radio_fourfm/bbc_radio_fourfm.isml/bbc_radio_fourfm-audio%3d128000.norewind.m3u8",
+    "Bloomberg": "https://playerservices.streamtheworld.com/api/livestream-redirect/WBBRDCAAC.aac",
+    "Bloomberg_Boston": "https://playerservices.streamtheworld.com/api/livestream-redirect/WRCAAMAAC.aac",
+    "Bloomberg_Busines": "https://stream.revma.ihrhls.com/zc301",
+    "CNN_Int": "https://tunein.cdnstream1.com/3519_96.aac",
+    "CNN": "https://tunein.cdnstream1.com/2868_96.aac",
+    "Sport": "http://13.54.221.214:8000/sen.mp3",
+    "VOA": "https://voa-ingest.akamaized.net/hls/live/2035234/160_342L/playlist.m3u8",
+    "VOA_news": "http://voa-28.akacast.akamaistream.net/7/54/322040/v1/ibb.akacast.akamaistream.net/voa-28"
+}
+PREPROCESSING = {
+    "Bloomberg": {"filters": ("highpass", "agc"), "speech_gate": True},
+    "Bloomberg_Boston": {"filters": ("highpass", "agc"), "speech_gate": True},
+    "Bloomberg_Busines": {"filters": ("highpass", "agc"), "speech_gate": True},
+    "CNN_Int": {"filters": ("highpass", "loudnorm"), "speech_gate": True},
+    "CNN": {"filters": ("highpass", "loudnorm"), "speech_gate": True}
+}
+DEFAULT_CHUNK_BYTES = 16000 * 2 * 15
+def preprocessing_options(name, filters=None, speech_gate=None):
+    preset = PREPROCESSING.get(name, {})
+    return {
+        "filters": tuple(preset.get("filters", ()) if filters is None else filters),
+        "speech_gate": preset.get("speech_gate", False) if speech_gate is None else speech_gate
+    }
+def setup_model_cache():
+    cache_dir = os.path.expanduser("~/.cache/huggingface")
+    hf_home_dir = os.path.join(cache_dir, "hub")
+    os.makedirs(hf_home_dir, exist_ok=True)
+    os.environ["HF_HOME"] = cache_dir
+def app_paths():
+    if getattr(sys, 'frozen', False):
+        return sys._MEIPASS, os.path.dirname(sys.executable)
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    return base_path, base_path
+def ffmpeg_path(base_path=None):
+    if getattr(sys, 'frozen', False):
+        return os.path.join(base_path or app_paths()[0], "ffmpeg.exe")
+    return "ffmpeg"
+usage_logger = logging.getLogger("stream")
+usage_logger.setLevel(logging.INFO)
+def setup_usage_log(log_dir=None):
+    if usage_logger.handlers:
+        return usage_logger
+    log_file_path = os.path.join(log_dir or app_paths()[1], "stream.log")
+    handler = RotatingFileHandler(log_file_path, maxBytes=5*1024*1024, backupCount=3)
+    formatter = logging.Formatter('%(asctime)s %(stream_name)s - %(action)s: %(duration_formatted)s', datefmt='%Y-%m-%d %H:%M:%S')
+    handler.setFormatter(formatter)
+    usage_logger.addHandler(handler)
+    usage_logger.propagate = False
+    return usage_logger
+def log_usage(stream_name, action, duration_seconds):
+    minutes = int(duration_seconds // 60)
+    seconds = int(duration_seconds % 60)
+    usage_logger.info(
+        "",
+        extra={
+            'stream_name': stream_name,
+            'action': action,
+            'duration_formatted': f"{minutes}:{seconds:02d}"
+        }
+    )
+def resolve_targets(urls, names):
+    targets = []
+    for name in names:
+        if name not in STREAMS:
+            raise SystemExit(f"Unknown stream preset: {name} (available: {', '.join(STREAMS)})")
+        targets.append((name, STREAMS[name]))
+    for index, url in enumerate(urls):
+        targets.append((f"URL{index + 1}" if len(urls) > 1 else "URL", url))
+    if not targets:
+        raise SystemExit("Specify at least one --url or --stream")
+    return targets
+class StdoutWriter:
+    def __init__(self, stream, with_names):
+        self.stream = stream
+        self.with_names = with_names
+        self.pending = {}
+        self.lock = threading.Lock()
+    def __call__(self, session, chunk, text):
+        with self.lock:
+            if self.with_names:
+                lines = (self.pending.pop(session.name, "") + text).split("\n")
+                self.pending[session.name] = lines.pop()
+                text = "".join(f"{session.name}: {line}\n" for line in lines)
+            self.stream.write(text)
+            self.stream.flush()
+def add_model_arguments(parser):
+    parser.add_argument("--config", help="JSON model settings, e.g. written by autotune")
+    parser.add_argument("--model", help="Whisper model size (tiny, base, small, distil-small.en, ...)")
+    parser.add_argument("--device", help="cpu or cuda")
+    parser.add_argument("--compute-type", help="int8, int8_float32, float32, ...")
+    parser.add_argument("--threads", type=int, dest="cpu_threads", help="total CPU threads split between workers (0 = library default)")
+    parser.add_argument("--workers", type=int, dest="num_workers", help="concurrent model workers shared by all streams")
+    parser.add_argument("--beam-size", type=int, help="beam size (1 = greedy)")
+    parser.add_argument("--best-of", type=int, help="candidates when sampling with non-zero temperature")
+    parser.add_argument("--without-timestamps", action="store_true", default=None, help="decode without timestamp tokens")
+    parser.add_argument("--batch-size", type=int, help="pending blocks (from one stream's backlog or several streams) decoded together by the batched pipeline")
+    parser.add_argument("--batch-wait", type=float, help="seconds a worker waits for more blocks to fill a batch")
+def model_config_from_args(args):
+    from models import ModelConfig
+    config = ModelConfig.load(args.config) if args.config else ModelConfig()
+    overrides = {
+        "size": args.model,
+        "device": args.device,
+        "compute_type": args.compute_type,
+        "cpu_threads": args.cpu_threads,
+        "num_workers": args.num_workers,
+        "beam_size": args.beam_size,
+        "best_of": args.best_of,
+        "without_timestamps": args.without_timestamps,
+        "batch_size": args.batch_size,
+        "batch_wait": args.batch_wait
+    }
+    data = config.to_dict()
+    data.update({key: value for key, value in overrides.items() if value is not None})
+    return ModelConfig.from_dict(data)
+def cmd_record(args):
+    from models import ModelPool
+    from sessions import SessionManager
+    from pipeline import AUDIO_FILTERS
+    setup_model_cache()
+    setup_usage_log(args.output_dir)
+    targets = resolve_targets(args.url, args.stream)
+    if args.audio_stdout and len(targets) > 1:
+        raise SystemExit("--audio-stdout supports a single stream")
+    if args.monitor and len(targets) > 1:
+        raise SystemExit("--monitor supports a single stream")
+    unknown = [name for name in args.filters or () if name not in AUDIO_FILTERS]
+    if unknown:
+        raise SystemExit(f"Unknown filter: {', '.join(unknown)} (available: {', '.join(AUDIO_FILTERS)})")
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    text_out = sys.stderr if args.audio_stdout else sys.stdout
+    config = model_config_from_args(args)
+    logging.info(f"Model settings: {config.label()}")
+    index = None if args.no_index else open_index(args.output_dir)
+    alerts = build_alerts(args) if args.alerts else None
+    monitor = None
+    if args.monitor:
+        from monitor import AudioMonitor
+        monitor = AudioMonitor()
+        monitor.enable()
+    if args.processes:
+        from workers import ProcessModelPool
+        pool = ProcessModelPool.from_config(config)
+    else:
+        pool = ModelPool.from_config(config)
+    manager = SessionManager(
+        pool,
+        ffmpeg_path=args.ffmpeg or ffmpeg_path(),
+        output_dir=args.output_dir,
+        chunk_bytes=args.chunk_bytes,
+        max_duration=args.duration * 60,
+        record=not args.no_audio,
+        on_text=StdoutWriter(text_out, len(targets) > 1) if args.stdout or args.audio_stdout else None,
+        audio_out=sys.stdout.buffer if args.audio_stdout else None,
+        chunking=args.chunking,
+        min_chunk=args.min_chunk,
+        min_silence=args.min_silence,
+        audio_format=args.format,
+        segment_seconds=args.segment_minutes * 60,
+        keep_segments=args.keep_segments,
+        max_disk_bytes=int(args.max_disk_mb * 1024 * 1024),
+        index=index,
+        sidecar_formats=tuple(args.sidecars),
+        profile_dir=args.profile,
+        reconnect=not args.no_reconnect,
+        stall_timeout=args.stall_timeout,
+        monitor=monitor,
+        alerts=alerts
+    )
+    for name, url in targets:
+        manager.add(name, url, **preprocessing_options(name, args.filters, args.speech_gate))
+    stop_requested = []
+    def request_stop(signum, frame):
+        logging.info(f"Signal {signum} received, stopping.")
+        stop_requested.append(signum)
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    reporters = []
+    if args.metrics_port:
+        from metrics import MetricsServer
+        reporters.append(MetricsServer(manager.stats, args.metrics_port, args.metrics_host))
+    if args.metrics_json:
+        from metrics import JsonReporter
+        reporters.append(JsonReporter(manager.stats, args.metrics_json, args.metrics_interval))
+    started = time.time()
+    if alerts is not None:
+        alerts.start()
+    manager.start()
+    for reporter in reporters:
+        reporter.start()
+    try:
+        manager.wait(args.report_interval, lambda: bool(stop_requested))
+    finally:
+        for reporter in reporters:
+            reporter.stop()
+        manager.stop()
+        if monitor is not None:
+            monitor.close()
+        if alerts is not None:
+            alerts.stop()
+        if index is not None:
+            index.close()
+        action = "Record" if not args.no_audio else "Listening"
+        for name, url in targets:
+            log_usage(name, f"{action} (cli)", time.time() - started)
+    return 0
+def build_alerts(args):
+    from alerts import AlertEngine, FileHook, WebhookHook, DesktopHook, load_rules, ALERT_LOG_NAME
+    try:
+        rules = load_rules(args.alerts)
+    except (OSError, ValueError, KeyError) as e:
+        raise SystemExit(f"Cannot load alert rules from {args.alerts}: {str(e)}")
+    hooks = [FileHook(args.alert_log or os.path.join(args.output_dir, ALERT_LOG_NAME))]
+    for url in args.alert_webhook:
+        hooks.append(WebhookHook(url))
+    if args.alert_desktop:
+        hooks.append(DesktopHook())
+    logging.info(f"{len(rules)} alert rule(s) loaded from {args.alerts}")
+    return AlertEngine(rules, hooks)
+def cmd_alert_receiver(args):
+    from alerts import serve_webhooks
+    serve_webhooks(args.port, args.host)
+    return 0
+def cmd_recover(args):
+    from segments import recover_segments
+    names = args.stream or [folder[:-len("_segments")] for folder in os.listdir(args.output_dir) if folder.endswith("_segments") and os.path.isdir(os.path.join(args.output_dir, folder))]
+    for name in names:
+        recovered = recover_segments(args.output_dir, name, args.ffmpeg or ffmpeg_path())
+        logging.info(f"{name}: {len(recovered)} partial segment(s) repaired")
+    return 0
+def format_offset(seconds):
+    minutes, seconds = divmod(max(0.0, seconds), 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{seconds:04.1f}" if hours else f"{minutes}:{seconds:04.1f}"
+def parse_time(value):
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected an ISO date/time such as 2025-12-11 or 2025-12-11T14:30, got {value}")
+def cmd_search(args):
+    from transcripts import TranscriptIndex, INDEX_NAME
+    import sqlite3
+    path = os.path.join(args.output_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        raise SystemExit(f"No transcript index in {args.output_dir} (run `python -m engine reindex` to build it from the .jsonl sidecars)")
+    index = TranscriptIndex(path)
+    started = time.perf_counter()
+    try:
+        results = index.search(" ".join(args.query), args.stream, args.since, args.until, args.limit)
+    except sqlite3.OperationalError as e:
+        raise SystemExit(f"Invalid search query: {str(e)}")
+    finally:
+        index.close()
+    for item in results:
+        when = datetime.fromtimestamp(item["start"]).strftime("%Y-%m-%d %H:%M:%S")
+        where = f"{item['audio']} @ {format_offset(item['offset'])}" if item["audio"] else "no audio"
+        confidence = f" ({item['confidence']:.2f})" if item["confidence"] is not None else ""
+        print(f"{when} {item['stream']}{confidence}: {item['snippet']}\n    {where}")
+    logging.info(f"{len(results)} match(es) in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+def cmd_reindex(args):
+    from transcripts import TranscriptIndex, INDEX_NAME, rebuild_index
+    index = TranscriptIndex(os.path.join(args.output_dir, INDEX_NAME))
+    try:
+        files, records = rebuild_index(index, args.output_dir)
+    finally:
+        index.close()
+    logging.info(f"Indexed {records} segment(s) from {files} sidecar file(s)")
+    return 0
+def cmd_probe(args):
+    from probe import StreamProber
+    import json
+    targets = resolve_targets(args.url, args.stream) if args.url or args.stream else list(STREAMS.items())
+    prober = StreamProber(timeout=args.timeout)
+    started = time.perf_counter()
+    try:
+        results = prober.probe_now([url for name, url in targets])
+    finally:
+        prober.close()
+    by_url = {result.url: result for result in results}
+    if args.json:
+        print(json.dumps([dict(by_url[url].to_dict(), stream=name) for name, url in targets], indent=2))
+    else:
+        for name, url in targets:
+            result = by_url[url]
+            print(f"{'OK  ' if result.ok else 'FAIL'} {name}: {result.summary()}")
+    logging.info(f"Checked {len(results)} URL(s) in {time.perf_counter() - started:.1f} s")
+    return 0 if all(result.ok for result in results) else 1
+def cmd_autotune(args):
+    from benchmark import autotune
+    setup_model_cache()
+    return autotune(args, args.ffmpeg or ffmpeg_path())
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m engine", description="Headless stream recorder and transcriber.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log FFmpeg output and debug messages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record = subparsers.add_parser("record", help="record and transcribe one or more streams")
+    record.add_argument("--url", action="append", default=[], help="stream URL (repeatable)")
+    record.add_argument("--stream", action="append", default=[], help="stream preset name (repeatable)")
+    record.add_argument("--duration", type=float, default=2, help="duration in minutes, 0 runs until interrupted")
+    record.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES, help="PCM bytes per transcription chunk (32000 = 1 sec)")
+    record.add_argument("--chunking", choices=("fixed", "vad", "streaming"), default="fixed", help="fixed-size blocks, blocks cut at speech pauses (--chunk-bytes is then the maximum) or 1 s incremental streaming (--chunk-bytes is then the rolling window)")
+    record.add_argument("--min-chunk", type=float, default=3.0, help="minimum block length in seconds for --chunking vad")
+    record.add_argument("--min-silence", type=float, default=0.5, help="pause length in seconds that closes a block for --chunking vad")
+    record.add_argument("--output-dir", default=app_paths()[1], help="directory for audio and transcripts")
+    record.add_argument("--filters", nargs="*", metavar="FILTER", help="FFmpeg filters applied to the audio sent to the model, in order: highpass, loudnorm, agc (default: the preset's, none for --url; an empty list disables)")
+    gate = record.add_mutually_exclusive_group()
+    gate.add_argument("--speech-gate", dest="speech_gate", action="store_true", default=None, help="skip blocks the speech/music classifier finds to be mostly music or silence (default: the preset's)")
+    gate.add_argument("--no-speech-gate", dest="speech_gate", action="store_false", help="send every block to the model")
+    record.add_argument("--no-audio", action="store_true", help="transcribe only, do not save audio")
+    record.add_argument("--format", choices=("mp3", "opus", "aac", "wav"), default="mp3", help="format of the saved audio, encoded by FFmpeg while recording")
+    record.add_argument("--segment-minutes", type=float, default=0, help="write rolling clock-aligned audio files of this length with sidecar transcripts (use with --duration 0 for 24/7 recording)")
+    record.add_argument("--keep-segments", type=int, default=0, help="delete the oldest segments beyond this count, 0 keeps all")
+    record.add_argument("--max-disk-mb", type=float, default=0, help="delete the oldest segments when a stream's segments exceed this size, 0 disables")
+    record.add_argument("--sidecars", nargs="*", choices=SIDECAR_FORMATS, default=list(SIDECAR_FORMATS), help="timestamped transcript files written next to the audio (none with an empty list)")
+    record.add_argument("--no-index", action="store_true", help="do not add segments to the search index (OUTPUT_DIR/transcripts.db)")
+    record.add_argument("--stdout", action="store_true", help="print transcripts to stdout")
+    record.add_argument("--monitor", action="store_true", help="play the incoming audio on the default output device (a null sink without one)")
+    record.add_argument("--audio-stdout", action="store_true", help="write raw s16le 16 kHz mono PCM to stdout, transcripts go to stderr")
+    add_model_arguments(record)
+    record.add_argument("--processes", action="store_true", help="run each model worker in its own process (PCM passed through shared memory, crashed workers restarted)")
+    record.add_argument("--ffmpeg", help="path to the ffmpeg executable")
+    record.add_argument("--no-reconnect", action="store_true", help="end a network stream when FFmpeg exits instead of restarting it with backoff")
+    record.add_argument("--stall-timeout", type=float, default=20, help="restart FFmpeg when a network stream delivers no audio for this many seconds, 0 disables")
+    record.add_argument("--alerts", metavar="RULES", help="JSON file of alert rules (keywords, keywords_file, regex, streams, cooldown) matched against every transcribed segment")
+    record.add_argument("--alert-log", help="JSON-lines file alerts are appended to (default: OUTPUT_DIR/alerts.log)")
+    record.add_argument("--alert-webhook", action="append", default=[], metavar="URL", help="POST each alert as JSON to this URL (repeatable)")
+    record.add_argument("--alert-desktop", action="store_true", help="show alerts as desktop notifications (notify-send or osascript)")
+    record.add_argument("--report-interval", type=float, default=10, help="seconds between pipeline status lines, 0 disables")
+    record.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics on http://HOST:PORT/metrics (and /metrics.json), 0 disables")
+    record.add_argument("--metrics-host", default="127.0.0.1", help="address the metrics endpoint listens on")
+    record.add_argument("--metrics-json", help="append a JSON metrics line every --metrics-interval seconds to this file (- for stderr)")
+    record.add_argument("--metrics-interval", type=float, default=10, help="seconds between JSON metrics lines")
+    record.add_argument("--profile", metavar="DIR", help="run each stage thread under cProfile and write STREAM_STAGE.prof files to DIR (thread ids are logged for py-spy)")
+    record.set_defaults(func=cmd_record)
+    recover = subparsers.add_parser("recover", help="repair segments left unfinished by a crash (also runs when a segmented recording starts)")
+    recover.add_argument("--output-dir", default=app_paths()[1], help="directory holding the *_segments folders")
+    recover.add_argument("--stream", action="append", default=[], help="stream name (repeatable, default: every segment folder)")
+    recover.add_argument("--ffmpeg", help="path to the ffmpeg executable")
+    recover.set_defaults(func=cmd_recover)
+    search = subparsers.add_parser("search", help="find transcribed segments in the search index and print the audio file and offset of each match")
+    search.add_argument("query", nargs="+", help="words to find (SQLite FTS5 syntax: \"exact phrase\", prefix*, OR, NOT)")
+    search.add_argument("--output-dir", default=app_paths()[1], help="directory holding transcripts.db")
+    search.add_argument("--stream", help="only this stream")
+    search.add_argument("--since", type=parse_time, help="only segments from this date/time on")
+    search.add_argument("--until", type=parse_time, help="only segments before this date/time")
+    search.add_argument("--limit", type=int, default=50, help="maximum number of matches, newest first")
+    search.set_defaults(func=cmd_search)
+    reindex = subparsers.add_parser("reindex", help="rebuild the search index from the .jsonl sidecars in the output directory")
+    reindex.add_argument("--output-dir", default=app_paths()[1], help="directory holding the recordings and transcripts.db")
+    reindex.set_defaults(func=cmd_reindex)
+    receiver = subparsers.add_parser("alert-receiver", help="print alerts POSTed by --alert-webhook (a local stand-in for a real webhook)")
+    receiver.add_argument("--port", type=int, default=8765, help="port to listen on")
+    receiver.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    receiver.set_defaults(func=cmd_alert_receiver)
+    probe = subparsers.add_parser("probe", help="check stream URLs in parallel and print the resolved URL, codec and bitrate of each")
+    probe.add_argument("--url", action="append", default=[], help="stream URL (repeatable)")
+    probe.add_argument("--stream", action="append", default=[], help="stream preset name (repeatable, default: every preset)")
+    probe.add_argument("--timeout", type=float, default=5, help="connect and read timeout per URL in seconds")
+    probe.add_argument("--json", action="store_true", help="print the results as JSON")
+    probe.set_defaults(func=cmd_probe)
+    autotune = subparsers.add_parser("autotune", help="benchmark model settings on recorded audio and pick the most accurate one under a real-time factor target")
+    autotune.add_argument("audio", nargs="?", help="audio file to test on (default: the newest recording in --output-dir)")
+    autotune.add_argument("--output-dir", default=app_paths()[1], help="where recordings are looked up and model_config.json is written")
+    autotune.add_argument("--reference", help="reference transcript; without it the most accurate candidate serves as the reference")
+    autotune.add_argument("--target-rtf", type=float, default=0.5, help="maximum processing time per second of audio")
+    autotune.add_argument("--sample-seconds", type=float, default=120, help="length of the audio sample to use")
+    autotune.add_argument("--chunk-seconds", type=float, default=15, help="block length used for live transcription")
+    autotune.add_argument("--sizes", nargs="+", default=["tiny.en", "base.en", "base", "small.en", "distil-small.en"])
+    autotune.add_argument("--compute-types", nargs="+", default=["int8"])
+    autotune.add_argument("--threads", nargs="+", type=int, default=[0], help="total CPU thread counts to try")
+    autotune.add_argument("--workers", nargs="+", type=int, default=[1], help="worker counts to try")
+    autotune.add_argument("--beam-sizes", nargs="+", type=int, default=[1, 5])
+    autotune.add_argument("--without-timestamps", nargs="+", type=int, choices=(0, 1), default=[0], help="0, 1 or both")
+    autotune.add_argument("--device", default="cpu")
+    autotune.add_argument("--save", help="where to write the chosen settings (default: OUTPUT_DIR/model_config.json)")
+    autotune.add_argument("--ffmpeg", help="path to the ffmpeg executable")
+    autotune.set_defaults(func=cmd_autotune)
+    return parser
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", stream=sys.stderr)
+    return args.func(args)
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
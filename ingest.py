@@ -0,0 +1,138 @@
+import threading
+import logging
+import time
+from pipeline import stop_ffmpeg, SAMPLE_WIDTH, BYTES_PER_SECOND
+SILENCE = bytes(64 * 1024)
+class IngestSupervisor:
+    def __init__(self, launch, restartable=True, max_duration=0, stall_timeout=20.0, backoff_min=1.0, backoff_max=30.0, stable_seconds=60.0, fill_gaps=True, on_gap=None, name="stream"):
+        self.launch = launch
+        self.restartable = restartable
+        self.max_duration = max_duration
+        self.stall_timeout = stall_timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.stable_seconds = stable_seconds
+        self.fill_gaps = fill_gaps
+        self.on_gap = on_gap
+        self.name = name
+        self.process = None
+        self.running = False
+        self.started = 0.0
+        self.launched = 0.0
+        self.waiting_since = None
+        self.position = 0
+        self.silence = 0
+        self.failures = 0
+        self.reconnects = 0
+        self.stalls = 0
+        self.lost_seconds = 0.0
+        self.gaps = []
+        self.exit_codes = []
+        self.stop_event = threading.Event()
+        self.watchdog = threading.Thread(target=self.watch, name=f"ingest-{name}", daemon=True)
+    @property
+    def offset(self):
+        return self.position / BYTES_PER_SECOND
+    def remaining(self):
+        if not self.max_duration:
+            return 0
+        return max(0.001, self.max_duration - (time.time() - self.started))
+    def expired(self):
+        return bool(self.max_duration) and (time.time() - self.started >= self.max_duration or self.offset >= self.max_duration - 1.0)
+    def start(self):
+        self.running = True
+        self.started = time.time()
+        self.process = self.launch(0.0, self.remaining())
+        self.launched = time.time()
+        if self.restartable and self.stall_timeout:
+            self.watchdog.start()
+        return self.process
+    def readinto(self, buffer):
+        while True:
+            if self.silence:
+                count = min(len(buffer), self.silence, len(SILENCE))
+                buffer[:count] = SILENCE[:count]
+                self.silence -= count
+                self.position += count
+                return count
+            process = self.process
+            waiting_since = self.waiting_since = time.time()
+            try:
+                count = process.stdout.readinto(buffer) if process is not None else 0
+            except (OSError, ValueError):
+                count = 0
+            self.waiting_since = None
+            if count:
+                self.position += count
+                return count
+            if not self.reconnect(waiting_since):
+                return 0
+    def reconnect(self, waiting_since):
+        if self.process is not None:
+            code = stop_ffmpeg(self.process)
+            self.exit_codes.append(code)
+        if not self.running or not self.restartable or self.expired():
+            return False
+        if time.time() - self.launched >= self.stable_seconds:
+            self.failures = 0
+        while self.running:
+            delay = min(self.backoff_max, self.backoff_min * 2 ** self.failures)
+            self.failures += 1
+            logging.warning(f"[{self.name}] FFmpeg exited with code {self.exit_codes[-1] if self.exit_codes else None}, reconnecting in {delay:.0f}s (attempt {self.failures})")
+            if self.stop_event.wait(delay) or self.expired():
+                return False
+            gap = time.time() - waiting_since
+            gap_bytes = int(gap * BYTES_PER_SECOND) // SAMPLE_WIDTH * SAMPLE_WIDTH if self.fill_gaps else 0
+            align = -self.position % SAMPLE_WIDTH
+            try:
+                process = self.launch((self.position + align + gap_bytes) / BYTES_PER_SECOND, self.remaining())
+            except Exception as e:
+                logging.error(f"[{self.name}] Failed to restart FFmpeg: {str(e)}")
+                continue
+            if not self.running:
+                stop_ffmpeg(process)
+                return False
+            offset = self.offset
+            self.process = process
+            self.silence = align + gap_bytes
+            self.launched = time.time()
+            self.reconnects += 1
+            self.lost_seconds += gap
+            self.gaps.append((offset, gap))
+            logging.info(f"[{self.name}] Reconnected after {gap:.1f}s of lost audio at {offset:.1f}s")
+            if self.on_gap is not None:
+                self.on_gap(offset, gap)
+            return True
+        return False
+    def watch(self):
+        while not self.stop_event.wait(1.0):
+            process = self.process
+            waiting_since = self.waiting_since
+            if process is None or waiting_since is None or process.poll() is not None:
+                continue
+            if time.time() - waiting_since > self.stall_timeout:
+                logging.warning(f"[{self.name}] No audio for {self.stall_timeout:.0f}s, restarting FFmpeg")
+                self.stalls += 1
+                try:
+                    process.kill()
+                    process.wait(5)
+                except Exception as e:
+                    logging.error(f"[{self.name}] Failed to stop a stalled FFmpeg: {str(e)}")
+    def stop(self):
+        self.running = False
+        self.stop_event.set()
+        if self.process is not None:
+            return stop_ffmpeg(self.process)
+        return None
+    def poll(self):
+        process = self.process
+        return process.poll() if process is not None else None
+    def stats(self):
+        return {
+            "reconnects": self.reconnects,
+            "stalls": self.stalls,
+            "lost_seconds": self.lost_seconds,
+            "gaps": len(self.gaps),
+            "offset": self.offset,
+            "exit_codes": list(self.exit_codes[-5:])
+        }
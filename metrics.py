@@ -0,0 +1,258 @@
+import threading
+import logging
+import json
+import time
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pipeline import BYTES_PER_SECOND
+METRICS = {
+    "stream_audio_seconds_total": ("counter", "Seconds of audio read from FFmpeg"),
+    "stream_live_lag_seconds": ("gauge", "How far the reader is behind wall-clock time since the start"),
+    "stream_rtf": ("gauge", "Transcription time per second of audio read (above 1 falls behind live)"),
+    "stream_first_transcript_seconds": ("gauge", "Time from start to the first transcript"),
+    "stream_stage_queue_depth": ("gauge", "Blocks waiting in a stage queue"),
+    "stream_stage_lag_seconds": ("gauge", "Age of the oldest block waiting in or processed by a stage"),
+    "stream_stage_processed_total": ("counter", "Blocks processed by a stage"),
+    "stream_stage_dropped_seconds_total": ("counter", "Seconds of audio dropped by a full stage queue"),
+    "stream_stage_busy_seconds_total": ("counter", "Time a stage spent processing"),
+    "stream_stage_errors_total": ("counter", "Errors raised by a stage"),
+    "stream_phase_seconds_total": ("counter", "Time spent in a processing phase"),
+    "stream_phase_count_total": ("counter", "Number of timed phase runs"),
+    "stream_phase_last_seconds": ("gauge", "Duration of the last phase run"),
+    "stream_phase_max_seconds": ("gauge", "Longest phase run"),
+    "stream_window_seconds": ("gauge", "Audio in the rolling window of the last streaming transcription"),
+    "stream_vad_dropped_seconds_total": ("counter", "Seconds of non-speech audio not sent to the model"),
+    "stream_filter_skipped_seconds_total": ("counter", "Seconds of audio a preprocessing filter kept from the model"),
+    "stream_filter_saved_seconds_total": ("counter", "Estimated inference seconds saved by a preprocessing filter (skipped audio times the measured transcribe time per audio second)"),
+    "stream_reconnects_total": ("counter", "FFmpeg restarts after the input failed or stalled"),
+    "stream_stalls_total": ("counter", "Inputs restarted because no audio arrived within the stall timeout"),
+    "stream_lost_seconds_total": ("counter", "Seconds of audio lost while reconnecting (filled with silence)"),
+    "stream_monitor_buffer_seconds": ("gauge", "Audio waiting in the monitoring jitter buffer"),
+    "stream_monitor_underruns_total": ("counter", "Times the monitoring jitter buffer ran empty"),
+    "stream_monitor_dropped_seconds_total": ("counter", "Seconds of audio dropped by a full monitoring jitter buffer"),
+    "stream_alert_matches_total": ("counter", "Alert rule matches in transcribed text"),
+    "stream_alerts_total": ("counter", "Alerts sent to the hooks after deduplication"),
+    "stream_model_queue_depth": ("gauge", "Jobs of a stream waiting for a model worker"),
+    "stream_model_wait_seconds": ("gauge", "Average time a job waited for a model worker"),
+    "stream_model_rtf": ("gauge", "Inference time per second of audio sent to the model"),
+    "process_resident_memory_bytes": ("gauge", "Resident memory of this process"),
+    "process_cpu_seconds_total": ("counter", "User and system CPU time of this process")
+}
+def memory_usage():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+def process_samples():
+    times = os.times()
+    return [
+        ("process_resident_memory_bytes", {}, memory_usage()),
+        ("process_cpu_seconds_total", {}, times.user + times.system)
+    ]
+def stream_samples(item):
+    stream = item["stream"]
+    labels = {"stream": stream}
+    samples = []
+    transcribe_seconds = 0.0
+    audio_seconds = 0.0
+    for stage in item["stages"]:
+        stage_labels = {"stream": stream, "stage": stage["stage"]}
+        if stage["stage"] == "reader":
+            audio_seconds = stage["bytes_read"] / BYTES_PER_SECOND
+            samples.append(("stream_audio_seconds_total", labels, audio_seconds))
+            samples.append(("stream_live_lag_seconds", labels, stage["lag"]))
+        else:
+            samples.append(("stream_stage_queue_depth", stage_labels, stage["depth"]))
+            samples.append(("stream_stage_lag_seconds", stage_labels, stage["lag"]))
+            samples.append(("stream_stage_processed_total", stage_labels, stage["processed"]))
+            samples.append(("stream_stage_dropped_seconds_total", stage_labels, stage["dropped_seconds"]))
+            samples.append(("stream_stage_busy_seconds_total", stage_labels, stage["busy_seconds"]))
+            samples.append(("stream_stage_errors_total", stage_labels, stage["errors"]))
+        for phase, timing in (stage.get("timings") or {}).items():
+            if phase == "audio_seconds":
+                continue
+            if phase == "window_seconds":
+                samples.append(("stream_window_seconds", labels, timing))
+                continue
+            phase_labels = {"stream": stream, "phase": phase}
+            samples.append(("stream_phase_seconds_total", phase_labels, timing["total"]))
+            samples.append(("stream_phase_count_total", phase_labels, timing["count"]))
+            samples.append(("stream_phase_last_seconds", phase_labels, timing["last"]))
+            samples.append(("stream_phase_max_seconds", phase_labels, timing["max"]))
+            if phase == "transcribe":
+                transcribe_seconds += timing["total"]
+        chunker = stage.get("chunker")
+        if chunker and "dropped_seconds" in chunker:
+            samples.append(("stream_vad_dropped_seconds_total", labels, chunker["dropped_seconds"]))
+        if chunker:
+            timings = stage.get("timings") or {}
+            stage_audio = timings.get("audio_seconds", 0.0)
+            seconds_per_audio = timings["transcribe"]["total"] / stage_audio if stage_audio and "transcribe" in timings else 0.0
+            filters = chunker.get("filters") or ({"vad": chunker["dropped_seconds"]} if "dropped_seconds" in chunker else {})
+            for name, skipped in filters.items():
+                filter_labels = {"stream": stream, "filter": name}
+                samples.append(("stream_filter_skipped_seconds_total", filter_labels, skipped))
+                samples.append(("stream_filter_saved_seconds_total", filter_labels, skipped * seconds_per_audio))
+    if audio_seconds:
+        samples.append(("stream_rtf", labels, transcribe_seconds / audio_seconds))
+    if item.get("first_transcript") is not None:
+        samples.append(("stream_first_transcript_seconds", labels, item["first_transcript"]))
+    ingest = item.get("ingest")
+    if ingest:
+        samples.append(("stream_reconnects_total", labels, ingest["reconnects"]))
+        samples.append(("stream_stalls_total", labels, ingest["stalls"]))
+        samples.append(("stream_lost_seconds_total", labels, ingest["lost_seconds"]))
+    monitor = item.get("monitor")
+    if monitor and monitor["enabled"]:
+        samples.append(("stream_monitor_buffer_seconds", labels, monitor["buffer_seconds"]))
+        samples.append(("stream_monitor_underruns_total", labels, monitor["underruns"]))
+        samples.append(("stream_monitor_dropped_seconds_total", labels, monitor["dropped_seconds"]))
+    alerts = item.get("alerts")
+    if alerts:
+        samples.append(("stream_alert_matches_total", labels, alerts["matches"]))
+        samples.append(("stream_alerts_total", labels, alerts["alerts"]))
+    model = item.get("model") or {}
+    if model:
+        samples.append(("stream_model_queue_depth", labels, model["depth"]))
+        samples.append(("stream_model_wait_seconds", labels, model["avg_wait"]))
+        samples.append(("stream_model_rtf", labels, model["rtf"]))
+    return samples
+def collect_samples(stats):
+    samples = process_samples()
+    for item in stats:
+        samples.extend(stream_samples(item))
+    return samples
+def label_text(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+def prometheus_text(samples):
+    groups = {}
+    for name, labels, value in samples:
+        groups.setdefault(name, []).append(f"{name}{label_text(labels)} {float(value):.6g}")
+    lines = []
+    for name, values in groups.items():
+        metric_type, help_text = METRICS[name]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(values)
+    return "\n".join(lines) + "\n"
+def json_snapshot(samples):
+    result = {"time": round(time.time(), 3)}
+    streams = result.setdefault("streams", {})
+    for name, labels, value in samples:
+        if "stream" not in labels:
+            result[name] = value
+            continue
+        target = streams.setdefault(labels["stream"], {})
+        for key in ("stage", "phase", "filter"):
+            if key in labels:
+                target = target.setdefault(f"{key}s", {}).setdefault(labels[key], {})
+        target[name] = round(value, 6) if isinstance(value, float) else value
+    return result
+def status_text(stats):
+    parts = []
+    for item in stats:
+        stream_items = stream_samples(item)
+        samples = {name: value for name, labels, value in stream_items if "stage" not in labels and "phase" not in labels and "filter" not in labels}
+        saved = sum(value for name, labels, value in stream_items if name == "stream_filter_saved_seconds_total")
+        transcribe = {}
+        for stage in item["stages"]:
+            transcribe = (stage.get("timings") or {}).get("transcribe") or transcribe
+        text = f"RTF {samples.get('stream_rtf', 0.0):.2f}  lag {samples.get('stream_live_lag_seconds', 0.0):.1f}s"
+        if transcribe:
+            text += f"  transcribe {transcribe['last'] * 1000:.0f} ms/block"
+        if "stream_vad_dropped_seconds_total" in samples:
+            text += f"  VAD skipped {samples['stream_vad_dropped_seconds_total']:.0f}s"
+        if saved:
+            text += f"  filters saved {saved:.0f}s of inference"
+        if samples.get("stream_reconnects_total"):
+            text += f"  reconnects {samples['stream_reconnects_total']} ({samples['stream_lost_seconds_total']:.0f}s lost)"
+        parts.append(f"{item['stream']}: {text}" if len(stats) > 1 else text)
+    parts.append(f"RAM {memory_usage() / 2**20:.0f} MB")
+    return "  |  ".join(parts)
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        try:
+            samples = collect_samples(self.server.collect())
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        if path in ("/", "/metrics"):
+            body = prometheus_text(samples).encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(json_snapshot(samples)).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def log_message(self, format, *args):
+        logging.debug(f"Metrics request: {format % args}")
+class MetricsServer:
+    def __init__(self, collect, port, host="127.0.0.1"):
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.collect = collect
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+    def start(self):
+        self.thread.start()
+        logging.info(f"Metrics available at {self.address}")
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+class JsonReporter:
+    def __init__(self, collect, output, interval=10.0):
+        self.collect = collect
+        self.output = output
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="metrics-json", daemon=True)
+    def start(self):
+        self.thread.start()
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.report()
+    def report(self):
+        try:
+            line = json.dumps(json_snapshot(collect_samples(self.collect())))
+        except Exception as e:
+            logging.error(f"Metrics snapshot failed: {str(e)}")
+            return
+        if self.output in (None, "-"):
+            sys.stderr.write(line + "\n")
+            sys.stderr.flush()
+            return
+        with open(self.output, "a", encoding="utf-8") as output_file:
+            output_file.write(line + "\n")
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.report()
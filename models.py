@@ -0,0 +1,401 @@
+import threading
+import collections
+import dataclasses
+import json
+import logging
+import time
+import sys
+import os
+from contextlib import contextmanager
+@contextmanager
+def suppress_stdout():
+    devnull = open(os.devnull, "w")
+    old_stdout = sys.stdout
+    old_stderr = sys.stderr
+    sys.stdout = devnull
+    sys.stderr = devnull
+    try:
+        yield
+    finally:
+        sys.stdout = old_stdout
+        sys.stderr = old_stderr
+        devnull.close()
+MODEL_SIZES = ("tiny.en", "tiny", "base.en", "base", "distil-small.en", "small.en", "small", "distil-medium.en", "medium.en", "medium", "distil-large-v3", "large-v3")
+COMPUTE_TYPES = ("int8", "int8_float32", "int8_float16", "int16", "float16", "float32")
+CLIP_SECONDS = 30
+class ModelConfig:
+    fields = ("size", "device", "compute_type", "cpu_threads", "num_workers", "beam_size", "best_of", "without_timestamps", "batch_size", "batch_wait")
+    def __init__(self, size="base", device="cpu", compute_type="int8", cpu_threads=0, num_workers=1, beam_size=5, best_of=5, without_timestamps=False, batch_size=1, batch_wait=0.05):
+        self.size = size
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = int(cpu_threads)
+        self.num_workers = max(1, int(num_workers))
+        self.beam_size = max(1, int(beam_size))
+        self.best_of = max(1, int(best_of))
+        self.without_timestamps = bool(without_timestamps)
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = max(0.0, float(batch_wait))
+    def model_args(self):
+        return (self.size, self.device, self.compute_type, split_threads(self.cpu_threads, self.num_workers), self.num_workers)
+    def transcribe_options(self):
+        return {"beam_size": self.beam_size, "best_of": self.best_of, "without_timestamps": self.without_timestamps}
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.fields}
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.fields if field in data})
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as config_file:
+            return cls.from_dict(json.load(config_file))
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as config_file:
+            json.dump(self.to_dict(), config_file, indent=2)
+    def label(self):
+        text = f"{self.size} {self.compute_type} threads={self.cpu_threads or 'auto'} workers={self.num_workers} beam={self.beam_size}"
+        if self.batch_size > 1:
+            text += f" batch={self.batch_size}"
+        return text + " no-ts" if self.without_timestamps else text
+    def __repr__(self):
+        return f"ModelConfig({self.label()})"
+def load_model(size="base", device="cpu", compute_type="int8", cpu_threads=0, num_workers=1):
+    import faster_whisper
+    with suppress_stdout():
+        model = faster_whisper.WhisperModel(size, device=device, compute_type=compute_type, cpu_threads=cpu_threads, num_workers=num_workers)
+    logging.info(f"Model Whisper loaded successfully ({size}, {device}, {compute_type}, threads={cpu_threads}, workers={num_workers}).")
+    return model
+def transcribe_batch(batched, audios, sample_rate=16000, no_speech_threshold=0.6, log_prob_threshold=-1.0, **options):
+    import numpy as np
+    clip_samples = CLIP_SECONDS * sample_rate
+    clips = []
+    pieces = []
+    position = 0
+    for index, audio in enumerate(audios):
+        for offset in range(0, len(audio), clip_samples):
+            piece = audio[offset:offset + clip_samples]
+            clips.append((index, position, position + len(piece), offset))
+            pieces.append(piece)
+            position += len(piece)
+    results = [[] for audio in audios]
+    if not pieces:
+        return results
+    clip_timestamps = [{"start": start / sample_rate, "end": end / sample_rate} for index, start, end, offset in clips]
+    segments, info = batched.transcribe(np.concatenate(pieces), clip_timestamps=clip_timestamps, batch_size=len(clips), **options)
+    clip_index = 0
+    for segment in segments:
+        if segment.no_speech_prob > no_speech_threshold and segment.avg_logprob < log_prob_threshold:
+            continue
+        while clip_index + 1 < len(clips) and segment.start >= clips[clip_index + 1][1] / sample_rate - 0.01:
+            clip_index += 1
+        index, start, end, offset = clips[clip_index]
+        shift = (offset - start) / sample_rate
+        results[index].append(dataclasses.replace(segment, start=segment.start + shift, end=segment.end + shift))
+    return results
+def warm_up_model(model, seconds=2.0, sample_rate=16000):
+    import numpy as np
+    segments, info = model.transcribe(np.zeros(int(seconds * sample_rate), dtype=np.float32), language="en", vad_filter=False)
+    list(segments)
+class ModelHandle:
+    def __init__(self, key):
+        self.key = key
+        self.model = None
+        self.error = None
+        self.warmed = False
+        self.load_seconds = 0.0
+        self.warm_up_seconds = 0.0
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = []
+    def wait(self, timeout=None):
+        if not self.ready.wait(timeout):
+            raise TimeoutError(f"Model {self.key} is still loading")
+        if self.error is not None:
+            raise self.error
+        return self.model
+    def state(self):
+        if not self.ready.is_set():
+            return "loading"
+        return "error" if self.error is not None else "loaded"
+    def on_ready(self, callback):
+        with self.lock:
+            if not self.ready.is_set():
+                self.callbacks.append(callback)
+                return
+        callback(self)
+    def load(self, warm_up):
+        size, device, compute_type, cpu_threads, num_workers = self.key
+        started = time.time()
+        try:
+            self.model = load_model(size, device, compute_type, cpu_threads, num_workers)
+            self.load_seconds = time.time() - started
+            if warm_up:
+                self.warm_up()
+        except Exception as e:
+            logging.error(f"Failed to load Whisper model {self.key}: {str(e)}")
+            self.error = e
+            with registry_lock:
+                if registry.get(self.key) is self:
+                    del registry[self.key]
+        self.set_ready()
+    def set_ready(self):
+        with self.lock:
+            if self.ready.is_set():
+                return
+            self.ready.set()
+            callbacks = self.callbacks
+            self.callbacks = []
+        for callback in callbacks:
+            callback(self)
+    def warm_up(self):
+        with self.lock:
+            if self.warmed:
+                return
+            self.warmed = True
+        started = time.time()
+        warm_up_model(self.model)
+        self.warm_up_seconds = time.time() - started
+        logging.info(f"Model {self.key[0]} warmed up in {self.warm_up_seconds:.2f}s (load {self.load_seconds:.2f}s).")
+registry = {}
+registry_lock = threading.Lock()
+def model_key(size="base", device="cpu", compute_type="int8", cpu_threads=0, num_workers=1):
+    return (size, device, compute_type, int(cpu_threads or 0), max(1, int(num_workers)))
+def preload_model(size="base", device="cpu", compute_type="int8", cpu_threads=0, num_workers=1, warm_up=True, background=True):
+    key = model_key(size, device, compute_type, cpu_threads, num_workers)
+    with registry_lock:
+        handle = registry.get(key)
+        created = handle is None
+        if created:
+            handle = ModelHandle(key)
+            registry[key] = handle
+    if created:
+        if background:
+            threading.Thread(target=handle.load, args=(warm_up,), name=f"model-load-{size}", daemon=True).start()
+        else:
+            handle.load(warm_up)
+    elif warm_up and background:
+        handle.on_ready(lambda ready: threading.Thread(target=warm_up_handle, args=(ready,), daemon=True).start())
+    elif warm_up:
+        warm_up_handle(handle)
+    return handle
+def warm_up_handle(handle):
+    try:
+        handle.wait()
+        handle.warm_up()
+    except Exception as e:
+        logging.error(f"Model warm-up failed: {str(e)}")
+def get_model(size="base", device="cpu", compute_type="int8", cpu_threads=0, num_workers=1, warm_up=False):
+    return preload_model(size, device, compute_type, cpu_threads, num_workers, warm_up, background=False).wait()
+def release_model(size="base", device="cpu", compute_type="int8", cpu_threads=0, num_workers=1):
+    with registry_lock:
+        return registry.pop(model_key(size, device, compute_type, cpu_threads, num_workers), None) is not None
+def loaded_models():
+    with registry_lock:
+        return [handle.key for handle in registry.values() if handle.state() == "loaded"]
+def split_threads(cpu_threads, num_workers):
+    if not cpu_threads and num_workers <= 1:
+        return 0
+    if not cpu_threads:
+        cpu_threads = os.cpu_count() or 1
+    return max(1, cpu_threads // max(1, num_workers))
+class Job:
+    __slots__ = ("stream_name", "audio", "kwargs", "submitted", "started", "finished", "result", "error", "done")
+    def __init__(self, stream_name, audio, kwargs):
+        self.stream_name = stream_name
+        self.audio = audio
+        self.kwargs = kwargs
+        self.submitted = time.time()
+        self.started = 0.0
+        self.finished = 0.0
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"Transcription for {self.stream_name} is still running")
+        if self.error is not None:
+            raise self.error
+        return self.result
+class StreamLatency:
+    def __init__(self):
+        self.jobs = 0
+        self.audio_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.last_wait = 0.0
+        self.last_inference = 0.0
+        self.max_latency = 0.0
+    def add(self, job, sample_rate, inference=None):
+        wait = job.started - job.submitted
+        if inference is None:
+            inference = job.finished - job.started
+        self.jobs += 1
+        self.audio_seconds += len(job.audio) / sample_rate
+        self.wait_seconds += wait
+        self.inference_seconds += inference
+        self.last_wait = wait
+        self.last_inference = inference
+        self.max_latency = max(self.max_latency, wait + inference)
+    def stats(self):
+        jobs = max(1, self.jobs)
+        return {
+            "jobs": self.jobs,
+            "audio_seconds": self.audio_seconds,
+            "avg_wait": self.wait_seconds / jobs,
+            "avg_inference": self.inference_seconds / jobs,
+            "last_latency": self.last_wait + self.last_inference,
+            "max_latency": self.max_latency,
+            "rtf": self.inference_seconds / self.audio_seconds if self.audio_seconds else 0.0
+        }
+class ModelPool:
+    def __init__(self, size="base", device="cpu", compute_type="int8", num_workers=1, cpu_threads=0, sample_rate=16000, transcribe_options=None, batch_size=1, batch_wait=0.05):
+        self.size = size
+        self.device = device
+        self.compute_type = compute_type
+        self.num_workers = max(1, int(num_workers))
+        self.cpu_threads = split_threads(cpu_threads, self.num_workers)
+        self.sample_rate = sample_rate
+        self.transcribe_options = transcribe_options if transcribe_options is not None else {"language": "en", "vad_filter": True}
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.batches = 0
+        self.batched_jobs = 0
+        self.model = None
+        self.handle = None
+        self.queues = collections.OrderedDict()
+        self.latency = {}
+        self.running = False
+        self.cond = threading.Condition()
+        self.workers = []
+    @classmethod
+    def from_config(cls, config, sample_rate=16000, language="en"):
+        options = {"language": language, "vad_filter": True}
+        options.update(config.transcribe_options())
+        return cls(config.size, config.device, config.compute_type, config.num_workers, config.cpu_threads, sample_rate, options, config.batch_size, config.batch_wait)
+    def start(self, warm_up=True):
+        if self.handle is None:
+            self.handle = preload_model(self.size, self.device, self.compute_type, self.cpu_threads, self.num_workers, warm_up)
+        self.running = True
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self.run, args=(index,), name=f"model-worker-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+    def fail_pending(self, error):
+        with self.cond:
+            self.running = False
+            for queue in self.queues.values():
+                while queue:
+                    job = queue.popleft()
+                    job.error = error
+                    job.done.set()
+            self.cond.notify_all()
+    def stop(self):
+        self.fail_pending(RuntimeError("Model pool stopped"))
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+    def release(self):
+        release_model(self.size, self.device, self.compute_type, self.cpu_threads, self.num_workers)
+        self.handle = None
+        self.model = None
+    def submit(self, stream_name, audio, **kwargs):
+        job = Job(stream_name, audio, kwargs)
+        with self.cond:
+            if not self.running:
+                raise RuntimeError("Model pool is not running")
+            self.queues.setdefault(stream_name, collections.deque()).append(job)
+            self.latency.setdefault(stream_name, StreamLatency())
+            self.cond.notify()
+        return job
+    def transcribe(self, stream_name, audio, **kwargs):
+        return self.submit(stream_name, audio, **kwargs).wait()
+    def next_job(self, like=None):
+        for stream_name in list(self.queues):
+            queue = self.queues[stream_name]
+            if queue and (like is None or self.batchable(queue[0]) and queue[0].kwargs == like.kwargs):
+                self.queues.move_to_end(stream_name)
+                return queue.popleft()
+        return None
+    def batchable(self, job):
+        return self.batch_size > 1 and not job.kwargs.get("word_timestamps") and "initial_prompt" not in job.kwargs
+    def next_batch(self):
+        job = self.next_job()
+        if job is None or not self.batchable(job):
+            return [job] if job is not None else []
+        jobs = [job]
+        deadline = time.time() + self.batch_wait
+        while len(jobs) < self.batch_size:
+            job = self.next_job(like=jobs[0])
+            if job is not None:
+                jobs.append(job)
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0 or not self.running:
+                break
+            self.cond.wait(remaining)
+        return jobs
+    def take_jobs(self):
+        with self.cond:
+            jobs = self.next_batch()
+            while not jobs and self.running:
+                self.cond.wait()
+                jobs = self.next_batch()
+            return jobs
+    def finish_jobs(self, jobs, started):
+        finished = time.time()
+        total_samples = max(1, sum(len(job.audio) for job in jobs))
+        with self.cond:
+            if len(jobs) > 1:
+                self.batches += 1
+                self.batched_jobs += len(jobs)
+            for job in jobs:
+                job.finished = finished
+                self.latency[job.stream_name].add(job, self.sample_rate, (finished - started) * len(job.audio) / total_samples)
+        for job in jobs:
+            job.done.set()
+    def run(self, index):
+        try:
+            self.model = self.handle.wait()
+            batched = None
+            if self.batch_size > 1:
+                from faster_whisper import BatchedInferencePipeline
+                batched = BatchedInferencePipeline(self.model)
+        except Exception as e:
+            logging.error(f"Model pool cannot start: {str(e)}")
+            self.fail_pending(e)
+            return
+        while True:
+            jobs = self.take_jobs()
+            if not jobs:
+                return
+            started = time.time()
+            for job in jobs:
+                job.started = started
+            options = dict(self.transcribe_options)
+            options.update(jobs[0].kwargs)
+            try:
+                if len(jobs) > 1:
+                    options.pop("vad_filter", None)
+                    results = transcribe_batch(batched, [job.audio for job in jobs], self.sample_rate, **options)
+                else:
+                    segments, info = self.model.transcribe(jobs[0].audio, **options)
+                    results = [list(segments)]
+                for job, result in zip(jobs, results):
+                    job.result = result
+            except Exception as e:
+                for job in jobs:
+                    job.error = e
+            self.finish_jobs(jobs, started)
+    def depth(self, stream_name=None):
+        with self.cond:
+            if stream_name is not None:
+                return len(self.queues.get(stream_name, ()))
+            return sum(len(queue) for queue in self.queues.values())
+    def stats(self):
+        with self.cond:
+            result = {}
+            for stream_name, latency in self.latency.items():
+                item = latency.stats()
+                item["depth"] = len(self.queues.get(stream_name, ()))
+                result[stream_name] = item
+            return result
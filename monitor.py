@@ -0,0 +1,127 @@
+import threading
+import logging
+from pipeline import SAMPLE_RATE, SAMPLE_WIDTH, BYTES_PER_SECOND
+MONITOR_FRAMES = 1024
+MONITOR_PREFILL_SECONDS = 0.25
+MONITOR_CAPACITY_SECONDS = 2.0
+class JitterBuffer:
+    def __init__(self, prefill_seconds=MONITOR_PREFILL_SECONDS, capacity_seconds=MONITOR_CAPACITY_SECONDS):
+        self.prefill = int(prefill_seconds * BYTES_PER_SECOND) // SAMPLE_WIDTH * SAMPLE_WIDTH
+        self.capacity = max(self.prefill * 2, int(capacity_seconds * BYTES_PER_SECOND) // SAMPLE_WIDTH * SAMPLE_WIDTH)
+        self.buffer = bytearray()
+        self.buffering = True
+        self.underruns = 0
+        self.dropped = 0
+        self.played = 0
+        self.lock = threading.Lock()
+    def write(self, data):
+        with self.lock:
+            self.buffer += data
+            excess = len(self.buffer) - self.capacity
+            if excess > 0:
+                excess += -excess % SAMPLE_WIDTH
+                del self.buffer[:excess]
+                self.dropped += excess
+    def read(self, size):
+        with self.lock:
+            if self.buffering:
+                if len(self.buffer) < self.prefill:
+                    return bytes(size)
+                self.buffering = False
+            count = min(size, len(self.buffer))
+            data = bytes(self.buffer[:count])
+            del self.buffer[:count]
+            self.played += count
+            if count < size:
+                self.underruns += 1
+                self.buffering = True
+                data += bytes(size - count)
+            return data
+    def clear(self):
+        with self.lock:
+            self.buffer.clear()
+            self.buffering = True
+    def depth(self):
+        return len(self.buffer) / BYTES_PER_SECOND
+class NullOutput:
+    def is_active(self):
+        return False
+    def stop_stream(self):
+        pass
+    def close(self):
+        pass
+class AudioMonitor:
+    def __init__(self, prefill_seconds=MONITOR_PREFILL_SECONDS, capacity_seconds=MONITOR_CAPACITY_SECONDS, frames_per_buffer=MONITOR_FRAMES):
+        self.frames_per_buffer = frames_per_buffer
+        self.jitter = JitterBuffer(prefill_seconds, capacity_seconds)
+        self.enabled = False
+        self.audio = None
+        self.output = None
+        self.flag = 0
+        self.lock = threading.Lock()
+    @property
+    def device(self):
+        if self.output is None:
+            return None
+        return "null" if isinstance(self.output, NullOutput) else "pyaudio"
+    def open_output(self):
+        try:
+            import pyaudio
+            self.audio = self.audio or pyaudio.PyAudio()
+            self.audio.get_default_output_device_info()
+            self.flag = pyaudio.paContinue
+            return self.audio.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=SAMPLE_RATE,
+                output=True,
+                frames_per_buffer=self.frames_per_buffer,
+                stream_callback=self.callback
+            )
+        except Exception as e:
+            logging.warning(f"Audio output is unavailable, monitoring uses a null sink: {str(e)}")
+            return NullOutput()
+    def callback(self, in_data, frame_count, time_info, status):
+        return self.jitter.read(frame_count * SAMPLE_WIDTH), self.flag
+    def enable(self):
+        with self.lock:
+            if self.enabled:
+                return
+            self.jitter.clear()
+            if self.output is None:
+                self.output = self.open_output()
+            elif not isinstance(self.output, NullOutput):
+                self.output.start_stream()
+            self.enabled = True
+    def disable(self):
+        with self.lock:
+            self.enabled = False
+            if self.output is not None and self.output.is_active():
+                self.output.stop_stream()
+            self.jitter.clear()
+    def set_enabled(self, enabled):
+        if enabled:
+            self.enable()
+        else:
+            self.disable()
+    def feed(self, data):
+        if self.enabled and not isinstance(self.output, NullOutput):
+            self.jitter.write(data)
+    def close(self):
+        self.disable()
+        with self.lock:
+            if self.output is not None:
+                self.output.close()
+                self.output = None
+            if self.audio is not None:
+                self.audio.terminate()
+                self.audio = None
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "device": self.device,
+            "buffer_seconds": self.jitter.depth(),
+            "underruns": self.jitter.underruns,
+            "dropped_seconds": self.jitter.dropped / BYTES_PER_SECOND,
+            "played_seconds": self.jitter.played / BYTES_PER_SECOND
+        }
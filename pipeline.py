@@ -0,0 +1,475 @@
+import threading
+import subprocess
+import collections
+import logging
+import cProfile
+import time
+import os
+import numpy as np
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+POLICIES = ("block", "drop_oldest", "drop_newest")
+PIPE_BUFFER_BYTES = 1024 * 1024
+LATENCY_SAMPLES = 10000
+AUDIO_FORMATS = {
+    "mp3": ("libmp3lame", "192k", "mp3"),
+    "opus": ("libopus", "64k", "ogg"),
+    "aac": ("aac", "128k", "adts"),
+    "wav": ("pcm_s16le", None, "wav")
+}
+NETWORK_SCHEMES = ("http://", "https://", "rtmp://", "rtsp://", "tcp://", "udp://", "srt://", "icy://")
+RECONNECT_OPTIONS = ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_on_network_error", "1", "-reconnect_delay_max", "10"]
+READ_TIMEOUT_SECONDS = 15
+HLS_MAX_RELOAD = 30
+AUDIO_FILTERS = {
+    "highpass": "highpass=f=100",
+    "loudnorm": "loudnorm=I=-18:TP=-2:LRA=11",
+    "agc": "dynaudnorm=f=250:g=15:p=0.9:m=20"
+}
+def is_network_url(url):
+    return url.lower().startswith(NETWORK_SCHEMES)
+def is_hls_url(url):
+    return ".m3u8" in url.lower().split("?", 1)[0]
+def input_options(url, loop=True, reconnect=True):
+    if not is_network_url(url):
+        return ["-stream_loop", "-1"] if loop else []
+    options = ["-rw_timeout", str(READ_TIMEOUT_SECONDS * 1000000)]
+    if reconnect and url.lower().startswith(("http://", "https://")):
+        options += RECONNECT_OPTIONS
+    if is_hls_url(url):
+        options += ["-max_reload", str(HLS_MAX_RELOAD)]
+    return options
+def filter_graph(filters):
+    return ",".join(AUDIO_FILTERS[name] for name in filters)
+def ffmpeg_command(ffmpeg_path, url, record_path=None, audio_format="mp3", duration=0, segment_seconds=0, segment_list=None, loop=True, reconnect=True, filters=()):
+    limit = ["-t", f"{duration:.3f}"] if duration else []
+    cmd = [
+        ffmpeg_path,
+        "-y"
+    ] + input_options(url, loop, reconnect) + [
+        "-i", url
+    ] + limit + [
+        "-vn"
+    ] + (["-af", filter_graph(filters)] if filters else []) + [
+        "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),
+        "-ac", "1",
+        "-f", "s16le",
+        "-"
+    ]
+    if record_path:
+        codec, bitrate, muxer = AUDIO_FORMATS[audio_format]
+        cmd += limit + ["-vn", "-c:a", codec] + (["-b:a", bitrate] if bitrate else [])
+        if segment_seconds:
+            cmd += [
+                "-f", "segment",
+                "-segment_format", muxer,
+                "-segment_time", str(segment_seconds),
+                "-segment_atclocktime", "1",
+                "-reset_timestamps", "1",
+                "-strftime", "1"
+            ] + (["-segment_list", segment_list, "-segment_list_type", "csv"] if segment_list else [])
+        else:
+            cmd += ["-f", muxer]
+        cmd.append(record_path)
+    return cmd
+def start_ffmpeg(ffmpeg_path, url, record_path=None, audio_format="mp3", duration=0, segment_seconds=0, segment_list=None, loop=True, reconnect=True, filters=()):
+    process = subprocess.Popen(
+        ffmpeg_command(ffmpeg_path, url, record_path, audio_format, duration, segment_seconds, segment_list, loop, reconnect, filters),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=0,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    )
+    set_pipe_size(process.stdout, PIPE_BUFFER_BYTES)
+    return process
+def set_pipe_size(pipe, size):
+    try:
+        import fcntl
+        fcntl.fcntl(pipe.fileno(), getattr(fcntl, "F_SETPIPE_SZ", 1031), size)
+    except (ImportError, OSError) as e:
+        logging.debug(f"Pipe buffer size left at the system default: {str(e)}")
+def stop_ffmpeg(process, timeout=5):
+    if process.poll() is None:
+        try:
+            process.stdin.write(b"q")
+            process.stdin.flush()
+            process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logging.warning("FFmpeg did not stop in time, terminating.")
+            process.terminate()
+            process.wait()
+    return process.returncode
+def pcm_to_float(audio_bytes, out=None):
+    samples = np.frombuffer(audio_bytes, dtype=np.int16)
+    if out is None:
+        out = np.empty(len(samples), dtype=np.float32)
+    else:
+        out = out[:len(samples)]
+    return np.multiply(samples, np.float32(1.0 / 32768.0), out=out, dtype=np.float32)
+class FloatBuffer:
+    def __init__(self, samples=0):
+        self.array = np.empty(samples, dtype=np.float32)
+    def convert(self, audio_bytes):
+        samples = len(audio_bytes) // SAMPLE_WIDTH
+        if samples > len(self.array):
+            self.array = np.empty(samples, dtype=np.float32)
+        return pcm_to_float(audio_bytes, self.array)
+class PCMRing:
+    def __init__(self, block_bytes, slots):
+        self.block_bytes = block_bytes - block_bytes % SAMPLE_WIDTH
+        self.slots = max(2, int(slots))
+        self.buffer = bytearray(self.block_bytes * self.slots)
+        self.view = memoryview(self.buffer)
+        self.position = 0
+    def read_block(self, source, on_data=None):
+        start = self.position * self.block_bytes
+        block = self.view[start:start + self.block_bytes]
+        filled = 0
+        while filled < self.block_bytes:
+            count = source.readinto(block[filled:])
+            if not count:
+                break
+            if on_data is not None:
+                on_data(block[filled:filled + count])
+            filled += count
+        filled -= filled % SAMPLE_WIDTH
+        if not filled:
+            return None
+        self.position = (self.position + 1) % self.slots
+        return block[:filled]
+class PhaseTimings:
+    def __init__(self):
+        self.phases = {}
+        self.audio_seconds = 0.0
+        self.window_seconds = None
+        self.lock = threading.Lock()
+    def add(self, phase, seconds):
+        with self.lock:
+            item = self.phases.get(phase)
+            if item is None:
+                item = self.phases[phase] = [0, 0.0, 0.0, 0.0]
+            item[0] += 1
+            item[1] += seconds
+            item[2] = seconds
+            item[3] = max(item[3], seconds)
+    def add_audio(self, seconds):
+        with self.lock:
+            self.audio_seconds += seconds
+    def stats(self):
+        with self.lock:
+            result = {phase: {"count": item[0], "total": item[1], "last": item[2], "max": item[3]} for phase, item in self.phases.items()}
+            if self.audio_seconds:
+                result["audio_seconds"] = self.audio_seconds
+            if self.window_seconds is not None:
+                result["window_seconds"] = self.window_seconds
+            return result
+class Chunk:
+    __slots__ = ("data", "index", "offset", "created")
+    def __init__(self, data, index, offset):
+        self.data = data
+        self.index = index
+        self.offset = offset
+        self.created = time.time()
+    @property
+    def duration(self):
+        return len(self.data) / BYTES_PER_SECOND
+class RingBuffer:
+    def __init__(self, capacity, policy="block"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.capacity = max(1, int(capacity))
+        self.policy = policy
+        self.items = collections.deque()
+        self.closed = False
+        self.dropped = 0
+        self.dropped_seconds = 0.0
+        self.cond = threading.Condition()
+    def put(self, item):
+        with self.cond:
+            while len(self.items) >= self.capacity and not self.closed:
+                if self.policy == "drop_newest":
+                    self._count_drop(item)
+                    return False
+                if self.policy == "drop_oldest":
+                    self._count_drop(self.items.popleft())
+                    break
+                self.cond.wait(0.5)
+            if self.closed:
+                return False
+            self.items.append(item)
+            self.cond.notify_all()
+            return True
+    def get(self, timeout=None):
+        with self.cond:
+            deadline = None if timeout is None else time.time() + timeout
+            while not self.items:
+                if self.closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+    def take(self, limit):
+        with self.cond:
+            items = []
+            while self.items and len(items) < limit:
+                items.append(self.items.popleft())
+            if items:
+                self.cond.notify_all()
+            return items
+    def close(self, discard=False):
+        with self.cond:
+            self.closed = True
+            if discard:
+                while self.items:
+                    self._count_drop(self.items.popleft())
+            self.cond.notify_all()
+    def _count_drop(self, item):
+        self.dropped += 1
+        self.dropped_seconds += getattr(item, "duration", 0.0)
+    def depth(self):
+        with self.cond:
+            return len(self.items)
+    def oldest_age(self):
+        with self.cond:
+            if not self.items:
+                return 0.0
+            return time.time() - self.items[0].created
+class Stage:
+    def __init__(self, name, handler, capacity=8, policy="block", drain=True, chunker=None, label=None, profile_path=None):
+        self.name = name
+        self.profile_path = profile_path
+        self.handler = handler
+        self.chunker = chunker
+        self.ring = RingBuffer(capacity, policy)
+        self.drain = drain
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.last_latency = 0.0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.current = None
+        self.errors = 0
+        self.batch_size = max(1, getattr(handler, "batch_size", 1))
+        if hasattr(handler, "backlog"):
+            handler.backlog = self.ring.depth
+        self.thread = threading.Thread(target=self.run, name=f"stage-{label}-{name}" if label else f"stage-{name}", daemon=True)
+    def start(self):
+        self.thread.start()
+    def submit(self, chunk):
+        if self.chunker is None:
+            return self.ring.put(chunk)
+        for item in self.chunker.feed(chunk):
+            self.ring.put(item)
+        return True
+    def finish(self):
+        if self.chunker is not None:
+            for item in self.chunker.flush():
+                self.ring.put(item)
+        self.ring.close()
+    def run(self):
+        if self.profile_path is None:
+            self.loop()
+            return
+        logging.info(f"Profiling {self.thread.name} (pid {os.getpid()}, thread {threading.get_native_id()}) to {self.profile_path}")
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(self.loop)
+        finally:
+            try:
+                profiler.dump_stats(self.profile_path)
+            except OSError as e:
+                logging.error(f"Failed to write profile {self.profile_path}: {str(e)}")
+    def loop(self):
+        while True:
+            chunk = self.ring.get()
+            if chunk is None:
+                break
+            chunks = [chunk] + self.ring.take(self.batch_size - 1) if self.batch_size > 1 else [chunk]
+            self.current = chunk
+            started = time.time()
+            try:
+                if len(chunks) > 1:
+                    self.handler.process_batch(chunks)
+                else:
+                    self.handler(chunk)
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Stage {self.name} error: {str(e)}")
+            finished = time.time()
+            self.current = None
+            self.busy_seconds += finished - started
+            self.last_latency = finished - chunk.created
+            self.latencies.extend(finished - item.created for item in chunks)
+            self.processed += len(chunks)
+        finish = getattr(self.handler, "finish", None)
+        if finish is not None:
+            try:
+                finish()
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Stage {self.name} error: {str(e)}")
+    def stop(self):
+        self.ring.close(discard=not self.drain)
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+    def lag(self):
+        current = self.current
+        if current is not None:
+            return max(time.time() - current.created, self.ring.oldest_age())
+        return self.ring.oldest_age()
+    def stats(self):
+        return {
+            "stage": self.name,
+            "depth": self.ring.depth(),
+            "capacity": self.ring.capacity,
+            "policy": self.ring.policy,
+            "lag": self.lag(),
+            "last_latency": self.last_latency,
+            "processed": self.processed,
+            "dropped": self.ring.dropped,
+            "dropped_seconds": self.ring.dropped_seconds,
+            "busy_seconds": self.busy_seconds,
+            "errors": self.errors,
+            "chunker": self.chunker.stats() if self.chunker is not None else None,
+            "timings": self.handler.timings.stats() if hasattr(self.handler, "timings") else None
+        }
+class RawSink:
+    def __init__(self, output):
+        self.output = output
+    def __call__(self, chunk):
+        self.output.write(chunk.data)
+        self.output.flush()
+class TranscribeSink:
+    def __init__(self, transcribe_func, on_segments, submit_func=None, batch_size=1):
+        self.transcribe_func = transcribe_func
+        self.on_segments = on_segments
+        self.submit_func = submit_func
+        self.batch_size = max(1, batch_size) if submit_func is not None else 1
+        self.buffers = [FloatBuffer() for index in range(self.batch_size)]
+        self.timings = PhaseTimings()
+    def __call__(self, chunk):
+        started = time.perf_counter()
+        audio = self.buffers[0].convert(chunk.data)
+        converted = time.perf_counter()
+        segments = list(self.transcribe_func(audio))
+        transcribed = time.perf_counter()
+        self.on_segments(chunk, segments)
+        self.timings.add("convert", converted - started)
+        self.timings.add("transcribe", transcribed - converted)
+        self.timings.add("emit", time.perf_counter() - transcribed)
+        self.timings.add_audio(chunk.duration)
+    def process_batch(self, chunks):
+        started = time.perf_counter()
+        audios = [buffer.convert(chunk.data) for buffer, chunk in zip(self.buffers, chunks)]
+        converted = time.perf_counter()
+        jobs = [self.submit_func(audio) for audio in audios]
+        for job in jobs:
+            job.done.wait()
+        transcribed = time.perf_counter()
+        for chunk, job in zip(chunks, jobs):
+            if job.error is not None:
+                logging.error(f"Transcription error: {str(job.error)}")
+                continue
+            self.on_segments(chunk, job.result)
+        self.timings.add("convert", converted - started)
+        self.timings.add("transcribe", transcribed - converted)
+        self.timings.add("emit", time.perf_counter() - transcribed)
+        self.timings.add_audio(sum(chunk.duration for chunk in chunks))
+class AudioPipeline:
+    def __init__(self, source, chunk_bytes, max_duration=0, label=None, profile_dir=None):
+        self.source = source
+        self.label = label
+        self.profile_dir = profile_dir
+        self.timings = PhaseTimings()
+        self.chunk_bytes = chunk_bytes
+        self.max_duration = max_duration
+        self.stages = []
+        self.taps = []
+        self.running = False
+        self.started = 0.0
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+        self.ring = None
+        self.reader = threading.Thread(target=self.read_loop, name=f"stage-{label}-reader" if label else "stage-reader", daemon=True)
+    def add_stage(self, name, handler, capacity=8, policy="block", drain=True, chunker=None):
+        profile_path = None
+        if self.profile_dir:
+            profile_path = os.path.join(self.profile_dir, f"{self.label}_{name}.prof" if self.label else f"{name}.prof")
+        stage = Stage(name, handler, capacity, policy, drain, chunker, self.label, profile_path)
+        self.stages.append(stage)
+        return stage
+    def add_tap(self, func):
+        self.taps.append(func)
+    def tap(self, data):
+        for func in self.taps:
+            try:
+                func(data)
+            except Exception as e:
+                logging.error(f"Audio tap error: {str(e)}")
+    def start(self):
+        self.ring = PCMRing(self.chunk_bytes, max([stage.ring.capacity + stage.batch_size for stage in self.stages] + [0]) + 3)
+        self.running = True
+        self.started = time.time()
+        for stage in self.stages:
+            stage.start()
+        self.reader.start()
+    def read_loop(self):
+        index = 0
+        try:
+            while self.running:
+                started = time.perf_counter()
+                audio_bytes = self.ring.read_block(self.source, self.tap if self.taps else None)
+                elapsed = time.perf_counter() - started
+                self.read_seconds += elapsed
+                if audio_bytes is None:
+                    break
+                self.timings.add("read", elapsed)
+                chunk = Chunk(audio_bytes, index, self.bytes_read / BYTES_PER_SECOND)
+                self.bytes_read += len(audio_bytes)
+                index += 1
+                for stage in self.stages:
+                    stage.submit(chunk)
+                if self.max_duration and time.time() - self.started >= self.max_duration:
+                    break
+        except Exception as e:
+            logging.error(f"Stream read error: {str(e)}")
+        finally:
+            self.running = False
+            for stage in self.stages:
+                stage.finish()
+    def is_alive(self):
+        return self.reader.is_alive() or any(stage.thread.is_alive() for stage in self.stages)
+    def stop(self):
+        self.running = False
+        for stage in self.stages:
+            stage.stop()
+    def join(self, timeout=None):
+        self.reader.join(timeout)
+        for stage in self.stages:
+            stage.join(timeout)
+    def stats(self):
+        elapsed = time.time() - self.started if self.started else 0.0
+        reader = {
+            "stage": "reader",
+            "depth": 0,
+            "lag": max(0.0, elapsed - self.bytes_read / BYTES_PER_SECOND),
+            "bytes_read": self.bytes_read,
+            "busy_seconds": self.read_seconds,
+            "timings": self.timings.stats()
+        }
+        return [reader] + [stage.stats() for stage in self.stages]
+    def report(self):
+        parts = []
+        for item in self.stats():
+            parts.append(f"{item['stage']} q={item['depth']} lag={item['lag']:.1f}s")
+        return " | ".join(parts)
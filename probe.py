@@ -0,0 +1,172 @@
+import threading
+import asyncio
+import logging
+import time
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+PROBE_TTL_SECONDS = 300
+PROBE_TIMEOUT_SECONDS = 5
+PLAYLIST_BYTES = 64 * 1024
+PLAYLIST_TYPES = ("mpegurl", "x-mpegurl", "vnd.apple.mpegurl")
+CONTENT_CODECS = {
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/aac": "aac",
+    "audio/aacp": "aac",
+    "audio/x-aac": "aac",
+    "audio/mp4": "aac",
+    "audio/ogg": "ogg",
+    "application/ogg": "ogg",
+    "audio/opus": "opus",
+    "audio/flac": "flac",
+    "audio/wav": "wav",
+    "audio/x-wav": "wav"
+}
+HLS_CODECS = {"mp4a": "aac", "mp3": "mp3", "ac-3": "ac3", "ec-3": "eac3", "opus": "opus", "flac": "flac"}
+class ProbeResult:
+    __slots__ = ("url", "resolved_url", "ok", "status", "codec", "bitrate", "content_type", "error", "checked_at", "elapsed")
+    def __init__(self, url, resolved_url=None, ok=False, status=None, codec=None, bitrate=None, content_type=None, error=None, elapsed=0.0):
+        self.url = url
+        self.resolved_url = resolved_url or url
+        self.ok = ok
+        self.status = status
+        self.codec = codec
+        self.bitrate = bitrate
+        self.content_type = content_type
+        self.error = error
+        self.checked_at = time.time()
+        self.elapsed = elapsed
+    def age(self):
+        return time.time() - self.checked_at
+    def summary(self):
+        if not self.ok:
+            return f"unavailable: {self.error or f'HTTP {self.status}'}"
+        details = [self.codec or self.content_type or "unknown format"]
+        if self.bitrate:
+            details.append(f"{self.bitrate} kbps")
+        details.append(f"{self.elapsed * 1000:.0f} ms")
+        if self.resolved_url != self.url:
+            details.append(f"via {self.resolved_url}")
+        return ", ".join(details)
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+def playlist_info(text):
+    bitrate = None
+    codec = None
+    for line in text.splitlines():
+        if not line.startswith("#EXT-X-STREAM-INF:"):
+            continue
+        bandwidth = re.search(r'(?<![A-Z-])BANDWIDTH=(\d+)', line)
+        if bandwidth and (bitrate is None or int(bandwidth.group(1)) // 1000 > bitrate):
+            bitrate = int(bandwidth.group(1)) // 1000
+            codecs = re.search(r'CODECS="([^"]*)"', line)
+            if codecs:
+                codec = next((name for prefix, name in HLS_CODECS.items() for item in codecs.group(1).split(",") if item.strip().startswith(prefix)), None)
+    return codec, bitrate
+def media_playlist(text):
+    return "#EXTINF" in text or "#EXT-X-TARGETDURATION" in text
+def first_variant(text, base_url):
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            return urljoin(base_url, line)
+    return None
+class StreamProber:
+    def __init__(self, ttl=PROBE_TTL_SECONDS, timeout=PROBE_TIMEOUT_SECONDS, concurrency=8, on_result=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.ttl = ttl
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.on_result = on_result
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "Lavf"
+        self.session.headers["Icy-MetaData"] = "1"
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix="probe")
+        self.results = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="probe-loop", daemon=True)
+        self.thread.start()
+    def result(self, url):
+        with self.lock:
+            result = self.results.get(url)
+        if result is None or result.age() > self.ttl:
+            return None
+        return result
+    def resolve(self, url):
+        result = self.result(url)
+        return result.resolved_url if result is not None and result.ok else url
+    def invalidate(self, url):
+        with self.lock:
+            self.results.pop(url, None)
+    def health(self):
+        with self.lock:
+            results = list(self.results.values())
+        return [result for result in results if result.age() <= self.ttl]
+    def probe(self, urls, force=False):
+        urls = [url for url in dict.fromkeys(urls) if force or self.result(url) is None]
+        return asyncio.run_coroutine_threadsafe(self.check_all(urls), self.loop)
+    def probe_now(self, urls, force=False):
+        return self.probe(urls, force).result()
+    async def check_all(self, urls):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async def limited(url):
+            async with semaphore:
+                return await self.check(url)
+        return await asyncio.gather(*(limited(url) for url in urls))
+    async def check(self, url):
+        with self.lock:
+            task = self.pending.get(url)
+            if task is None:
+                task = self.pending[url] = asyncio.ensure_future(self.loop.run_in_executor(self.executor, self.fetch, url))
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            with self.lock:
+                if self.pending.get(url) is task:
+                    del self.pending[url]
+        return result
+    def fetch(self, url):
+        import requests
+        started = time.perf_counter()
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=True) as response:
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                codec = CONTENT_CODECS.get(content_type)
+                bitrate = response.headers.get("icy-br")
+                bitrate = int(bitrate.split(",")[0]) if bitrate and bitrate.split(",")[0].isdigit() else None
+                resolved_url = response.url
+                if response.ok and (content_type.endswith(PLAYLIST_TYPES) or resolved_url.split("?")[0].endswith(".m3u8")):
+                    text = response.raw.read(PLAYLIST_BYTES, decode_content=True).decode("utf-8", "replace")
+                    codec, bitrate = playlist_info(text)
+                    codec = codec or "hls"
+                    if not media_playlist(text) and first_variant(text, resolved_url) is None:
+                        return self.store(ProbeResult(url, resolved_url, False, response.status_code, codec, bitrate, content_type, "empty playlist", time.perf_counter() - started))
+                result = ProbeResult(url, resolved_url, response.ok, response.status_code, codec, bitrate, content_type, None if response.ok else response.reason, time.perf_counter() - started)
+        except (requests.exceptions.RequestException, OSError, ValueError) as e:
+            result = ProbeResult(url, ok=False, error=str(e), elapsed=time.perf_counter() - started)
+        return self.store(result)
+    def store(self, result):
+        with self.lock:
+            self.results[result.url] = result
+        if result.ok:
+            logging.debug(f"Probed {result.url}: {result.summary()}")
+        else:
+            logging.warning(f"Stream check failed for {result.url}: {result.summary()}")
+        if self.on_result is not None:
+            try:
+                self.on_result(result)
+            except Exception as e:
+                logging.error(f"Probe callback failed: {str(e)}")
+        return result
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=self.timeout)
+        self.executor.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,290 @@
+import threading
+import subprocess
+import logging
+import struct
+import glob
+import time
+import os
+import re
+from pipeline import AUDIO_FORMATS
+from transcripts import write_sidecars, sidecar_files, SIDECAR_FORMATS
+SEGMENT_SECONDS = 300
+def stream_base(stream_name):
+    return re.sub(r'[^a-zA-Z0-9]', '_', stream_name)
+def segment_dir(output_dir, stream_name):
+    return os.path.join(output_dir, f"{stream_base(stream_name)}_segments")
+def segment_pattern(output_dir, stream_name, audio_format="mp3"):
+    return os.path.join(segment_dir(output_dir, stream_name), f"{stream_base(stream_name)}_audio_%Y-%m-%d_%H-%M-%S.{audio_format}")
+def segment_list_path(output_dir, stream_name):
+    return os.path.join(segment_dir(output_dir, stream_name), "segments.csv")
+def journal_path(output_dir, stream_name):
+    return os.path.join(segment_dir(output_dir, stream_name), "transcript_pending.txt")
+def sidecar_path(audio_path):
+    folder, name = os.path.split(audio_path)
+    head, sep, tail = name.rpartition("_audio_")
+    return os.path.join(folder, f"{head}_transcript_{os.path.splitext(tail)[0]}.txt")
+def stream_segments(output_dir, stream_name):
+    files = []
+    for audio_format in AUDIO_FORMATS:
+        files.extend(glob.glob(os.path.join(glob.escape(segment_dir(output_dir, stream_name)), f"*_audio_*.{audio_format}")))
+    return sorted(files, key=os.path.basename)
+def fsync_file(path):
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+def write_synced(path, text, mode="w"):
+    with open(path, mode, encoding="utf-8") as output_file:
+        output_file.write(text)
+        output_file.flush()
+        os.fsync(output_file.fileno())
+def repair_wav(path):
+    size = os.path.getsize(path)
+    with open(path, "r+b") as wav_file:
+        header = wav_file.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return False
+        position = 12
+        while position + 8 <= size:
+            wav_file.seek(position)
+            chunk_id, chunk_size = struct.unpack("<4sI", wav_file.read(8))
+            if chunk_id == b"data":
+                data_size = size - position - 8
+                data_size -= data_size % 2
+                wav_file.seek(position + 4)
+                wav_file.write(struct.pack("<I", data_size))
+                wav_file.seek(4)
+                wav_file.write(struct.pack("<I", position + data_size))
+                return data_size > 0
+            position += 8 + chunk_size + chunk_size % 2
+    return False
+def remux(path, ffmpeg_path="ffmpeg"):
+    muxer = AUDIO_FORMATS[os.path.splitext(path)[1][1:]][2]
+    temp_path = f"{path}.tmp"
+    result = subprocess.run(
+        [ffmpeg_path, "-v", "error", "-y", "-i", path, "-c", "copy", "-f", muxer, temp_path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    )
+    if result.returncode != 0 or not os.path.exists(temp_path) or not os.path.getsize(temp_path):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        logging.error(f"Could not repair {path}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        return False
+    os.replace(temp_path, path)
+    return True
+def repair_segment(path, ffmpeg_path="ffmpeg"):
+    if os.path.getsize(path) == 0:
+        os.remove(path)
+        return False
+    if path.endswith(".wav"):
+        repaired = repair_wav(path)
+    else:
+        repaired = remux(path, ffmpeg_path)
+    if repaired:
+        fsync_file(path)
+    return repaired
+def recover_segments(output_dir, stream_name, ffmpeg_path="ffmpeg"):
+    recovered = []
+    for path in stream_segments(output_dir, stream_name):
+        if os.path.exists(sidecar_path(path)):
+            continue
+        try:
+            if not repair_segment(path, ffmpeg_path):
+                logging.warning(f"Partial segment {path} has no usable audio")
+                continue
+        except Exception as e:
+            logging.error(f"Failed to repair {path}: {str(e)}")
+            continue
+        recovered.append(path)
+    journal = journal_path(output_dir, stream_name)
+    text = ""
+    if os.path.exists(journal):
+        with open(journal, encoding="utf-8") as journal_file:
+            text = journal_file.read()
+    for path in recovered:
+        write_synced(sidecar_path(path), text if path == recovered[-1] else "")
+        logging.info(f"Recovered partial segment {path}")
+    if os.path.exists(journal) and (recovered or not text):
+        os.remove(journal)
+    return recovered
+class SegmentRecorder:
+    def __init__(self, output_dir, stream_name, audio_format="mp3", segment_seconds=SEGMENT_SECONDS, keep_segments=0, max_bytes=0, poll_interval=1.0, index=None, sidecar_formats=SIDECAR_FORMATS, ffmpeg_path="ffmpeg"):
+        self.folder = segment_dir(output_dir, stream_name)
+        self.output_dir = output_dir
+        self.ffmpeg_path = ffmpeg_path
+        self.stream_name = stream_name
+        self.audio_format = audio_format
+        self.segment_seconds = segment_seconds
+        self.keep_segments = keep_segments
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self.pattern = segment_pattern(output_dir, stream_name, audio_format)
+        self.list_path = segment_list_path(output_dir, stream_name)
+        self.journal_path = journal_path(output_dir, stream_name)
+        self.index = index
+        self.sidecar_formats = sidecar_formats
+        self.pending = []
+        self.records = []
+        self.last_start = 0.0
+        self.last_cues = 0
+        self.completed = [path for path in stream_segments(output_dir, stream_name) if os.path.exists(sidecar_path(path))]
+        self.spans = []
+        self.list_position = 0
+        self.list_partial = b""
+        self.base = 0.0
+        self.last_end = 0.0
+        self.last_offset = 0.0
+        self.deleted = 0
+        self.running = False
+        self.lock = threading.Lock()
+        self.poll_lock = threading.Lock()
+        self.journal = None
+        self.thread = threading.Thread(target=self.run, name=f"segments-{stream_name}", daemon=True)
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        if os.path.exists(self.list_path):
+            os.remove(self.list_path)
+        self.journal = open(self.journal_path, "w", encoding="utf-8")
+        self.running = True
+        self.thread.start()
+    def add_text(self, offset, text):
+        with self.lock:
+            if offset is None:
+                offset = self.last_offset
+            self.last_offset = offset
+            self.pending.append((offset, text))
+            self.journal.write(text)
+            self.journal.flush()
+    def add_records(self, records):
+        with self.lock:
+            self.records.extend(records)
+    def run(self):
+        while self.running:
+            time.sleep(self.poll_interval)
+            self.poll()
+    def poll(self):
+        with self.poll_lock:
+            self.read_list()
+    def read_list(self):
+        try:
+            if not os.path.exists(self.list_path):
+                return
+            with open(self.list_path, "rb") as list_file:
+                list_file.seek(self.list_position)
+                data = self.list_partial + list_file.read()
+                self.list_position = list_file.tell()
+        except OSError as e:
+            logging.error(f"[{self.stream_name}] Error reading segment list: {str(e)}")
+            return
+        lines = data.split(b"\n")
+        self.list_partial = lines.pop()
+        for line in lines:
+            fields = line.decode("utf-8", errors="replace").strip().rsplit(",", 2)
+            if len(fields) == 3:
+                try:
+                    self.complete(os.path.join(self.folder, fields[0]), self.base + float(fields[1]), self.base + float(fields[2]))
+                except Exception as e:
+                    logging.error(f"[{self.stream_name}] Failed to close segment {fields[0]}: {str(e)}")
+    def complete(self, path, start, end):
+        with self.lock:
+            text = "".join(item[1] for item in self.pending if item[0] < end)
+            self.pending = [item for item in self.pending if item[0] >= end]
+            records = [record for record in self.records if record.offset < end]
+            self.records = [record for record in self.records if record.offset >= end]
+            self.journal.seek(0)
+            self.journal.truncate()
+            self.journal.write("".join(item[1] for item in self.pending))
+            self.journal.flush()
+            self.last_end = end
+            self.last_start = start
+            self.last_cues = len(records)
+            self.spans.append((start, end, path))
+        if os.path.exists(path):
+            fsync_file(path)
+        write_synced(sidecar_path(path), text)
+        self.save_records(path, records, start)
+        self.completed.append(path)
+        logging.info(f"[{self.stream_name}] Segment closed: {path}")
+        self.apply_retention()
+    def restart(self, base, end):
+        with self.poll_lock:
+            self.read_list()
+            for path in stream_segments(self.output_dir, self.stream_name):
+                if path in self.completed or os.path.exists(sidecar_path(path)):
+                    continue
+                try:
+                    if repair_segment(path, self.ffmpeg_path):
+                        self.complete(path, self.last_end, end)
+                except Exception as e:
+                    logging.error(f"[{self.stream_name}] Failed to close interrupted segment {path}: {str(e)}")
+            if os.path.exists(self.list_path):
+                os.remove(self.list_path)
+            self.list_position = 0
+            self.list_partial = b""
+            self.base = base
+    def locate(self, offset):
+        self.poll()
+        with self.lock:
+            for start, end, path in reversed(self.spans):
+                if start <= offset + 0.001 < end:
+                    return path, offset - start
+            start = max(self.last_end, self.base)
+        current = [path for path in stream_segments(self.output_dir, self.stream_name) if path not in self.completed and not os.path.exists(sidecar_path(path))]
+        if current and start <= offset + 0.001:
+            return current[-1], offset - start
+        return None, None
+    def save_records(self, path, records, start, mode="w", first_cue=1):
+        if self.sidecar_formats:
+            write_sidecars(path, records, self.sidecar_formats, start, mode, first_cue)
+        if self.index is not None:
+            try:
+                self.index.add(records, path, start)
+            except Exception as e:
+                logging.error(f"[{self.stream_name}] Failed to index {path}: {str(e)}")
+    def apply_retention(self):
+        sizes = {}
+        for path in self.completed:
+            sizes[path] = os.path.getsize(path) if os.path.exists(path) else 0
+        total = sum(sizes.values())
+        while len(self.completed) > 1 and ((self.keep_segments and len(self.completed) > self.keep_segments) or (self.max_bytes and total > self.max_bytes)):
+            path = self.completed.pop(0)
+            total -= sizes[path]
+            with self.lock:
+                self.spans = [span for span in self.spans if span[2] != path]
+            for old_path in [path, sidecar_path(path)] + sidecar_files(path, self.sidecar_formats):
+                try:
+                    if os.path.exists(old_path):
+                        os.remove(old_path)
+                except OSError as e:
+                    logging.error(f"[{self.stream_name}] Failed to delete {old_path}: {str(e)}")
+            if self.index is not None:
+                try:
+                    self.index.remove_audio(path)
+                except Exception as e:
+                    logging.error(f"[{self.stream_name}] Failed to unindex {path}: {str(e)}")
+            self.deleted += 1
+            logging.info(f"[{self.stream_name}] Retention removed {path}")
+    def stop(self):
+        self.running = False
+        if self.thread.is_alive():
+            self.thread.join()
+        self.poll()
+        if self.pending and self.completed:
+            last = self.completed[-1]
+            with self.lock:
+                text = "".join(item[1] for item in self.pending)
+                self.pending = []
+                records = self.records
+                self.records = []
+            write_synced(sidecar_path(last), text, "a")
+            self.save_records(last, records, self.last_start, "a", self.last_cues + 1)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+            if not self.pending and os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+    def stats(self):
+        return {"segments": len(self.completed), "deleted": self.deleted, "last_end": self.last_end}
@@ -0,0 +1,265 @@
+import threading
+import logging
+import time
+import os
+import re
+from datetime import datetime
+import functools
+from pipeline import AudioPipeline, TranscribeSink, RawSink, start_ffmpeg, is_network_url, SAMPLE_RATE, BYTES_PER_SECOND
+from vad import VADSegmenter, SpeechGate, READ_BYTES as VAD_READ_BYTES
+from streaming import StreamingSink, words_text, STEP_BYTES as STREAMING_STEP_BYTES
+from segments import SegmentRecorder, recover_segments
+from transcripts import TranscriptOutput, WordGrouper, segment_records, SIDECAR_FORMATS
+from ingest import IngestSupervisor
+CHUNKING_MODES = ("fixed", "vad", "streaming")
+def output_path(output_dir, stream_name, kind, ext, started=None):
+    current_time = (started or datetime.now()).strftime("%Y-%m-%d_%H-%M-%S")
+    base_name = re.sub(r'[^a-zA-Z0-9]', '_', stream_name)
+    return os.path.join(output_dir, f"{base_name}_{kind}_{current_time}.{ext}")
+def split_sentences(text):
+    sentences = []
+    for sentence in re.split(r'[.!?]\s*', text):
+        sentence = sentence.strip()
+        if sentence:
+            sentences.append(f"{sentence}.")
+    return sentences
+def build_transcriber(chunking, chunk_bytes, transcribe_func, on_segments, on_words, min_chunk=3.0, min_silence=0.5, submit_func=None, batch_size=1, speech_gate=False):
+    max_seconds = chunk_bytes / BYTES_PER_SECOND
+    if chunking == "vad":
+        segmenter = VADSegmenter(min(min_chunk, max_seconds), max_seconds, min_silence)
+        submit = functools.partial(submit_func, vad_filter=False) if submit_func else None
+        return TranscribeSink(functools.partial(transcribe_func, vad_filter=False), on_segments, submit, batch_size), SpeechGate(segmenter) if speech_gate else segmenter, VAD_READ_BYTES
+    if chunking == "streaming":
+        if speech_gate:
+            logging.warning("The speech/music gate is not used with streaming chunking")
+        return StreamingSink(transcribe_func, on_words, min(max_seconds, 25.0)), None, STREAMING_STEP_BYTES
+    if chunking != "fixed":
+        raise ValueError(f"Unknown chunking mode: {chunking}")
+    submit = functools.partial(submit_func, vad_filter=True) if submit_func else None
+    return TranscribeSink(functools.partial(transcribe_func, vad_filter=True), on_segments, submit, batch_size), SpeechGate() if speech_gate else None, chunk_bytes
+class StreamSession:
+    def __init__(self, name, url, pool, ffmpeg_path="ffmpeg", output_dir=".", chunk_bytes=SAMPLE_RATE * 2 * 15, max_duration=0, record=True, on_text=None, queue_size=8, transcribe_policy="drop_oldest", audio_out=None, chunking="fixed", min_chunk=3.0, min_silence=0.5, audio_format="mp3", segment_seconds=0, keep_segments=0, max_disk_bytes=0, index=None, sidecar_formats=SIDECAR_FORMATS, profile_dir=None, loop_input=True, reconnect=True, stall_timeout=20.0, monitor=None, alerts=None, filters=(), speech_gate=False):
+        self.name = name
+        self.url = url
+        self.pool = pool
+        self.ffmpeg_path = ffmpeg_path
+        self.output_dir = output_dir
+        self.chunk_bytes = chunk_bytes
+        self.max_duration = max_duration
+        self.record = record
+        self.on_text = on_text
+        self.queue_size = queue_size
+        self.transcribe_policy = transcribe_policy
+        self.audio_out = audio_out
+        self.chunking = chunking
+        self.min_chunk = min_chunk
+        self.min_silence = min_silence
+        self.line_start = True
+        self.started_at = 0.0
+        self.first_transcript_time = None
+        self.ingest = None
+        self.pipeline = None
+        self.audio_format = audio_format
+        self.audio_filename = None
+        self.segment_seconds = segment_seconds
+        self.keep_segments = keep_segments
+        self.max_disk_bytes = max_disk_bytes
+        self.segments = None
+        self.transcript_file = None
+        self.transcript_filename = None
+        self.index = index
+        self.sidecar_formats = sidecar_formats
+        self.output = TranscriptOutput(sidecar_formats, index, name)
+        self.words = None
+        self.profile_dir = profile_dir
+        self.loop_input = loop_input
+        self.reconnect = reconnect
+        self.stall_timeout = stall_timeout
+        self.monitor = monitor
+        self.alerts = alerts
+        self.filters = tuple(filters)
+        self.speech_gate = speech_gate
+        self.lock = threading.Lock()
+    def start(self):
+        started = datetime.now()
+        self.started_at = time.time()
+        self.words = WordGrouper(self.name, self.started_at)
+        if self.record and self.segment_seconds:
+            recover_segments(self.output_dir, self.name, self.ffmpeg_path)
+            self.segments = SegmentRecorder(self.output_dir, self.name, self.audio_format, self.segment_seconds, self.keep_segments, self.max_disk_bytes, index=self.index, sidecar_formats=self.sidecar_formats, ffmpeg_path=self.ffmpeg_path)
+            self.segments.start()
+            self.audio_filename = self.segments.pattern
+        else:
+            self.transcript_filename = output_path(self.output_dir, self.name, "transcript", "txt", started)
+            self.transcript_file = open(self.transcript_filename, "a", encoding="utf-8")
+            if self.record:
+                self.audio_filename = output_path(self.output_dir, self.name, "audio", self.audio_format, started)
+            self.output.open(self.audio_filename or self.transcript_filename, audio=self.record)
+        restartable = self.reconnect and is_network_url(self.url)
+        self.ingest = IngestSupervisor(self.launch, restartable, self.max_duration, self.stall_timeout, on_gap=self.mark_gap, name=self.name)
+        self.ingest.start()
+        handler, chunker, read_bytes = build_transcriber(self.chunking, self.chunk_bytes, self.transcribe, self.handle_segments, self.handle_words, self.min_chunk, self.min_silence, self.submit, self.pool.batch_size, self.speech_gate)
+        policy = "block" if self.chunking == "streaming" else self.transcribe_policy
+        self.pipeline = AudioPipeline(self.ingest, read_bytes, label=re.sub(r'[^a-zA-Z0-9]', '_', self.name), profile_dir=self.profile_dir)
+        self.pipeline.add_stage("transcribe", handler, self.queue_size, policy, drain=False, chunker=chunker)
+        if self.audio_out is not None:
+            self.pipeline.add_stage("audio_out", RawSink(self.audio_out), self.queue_size, "block")
+        if self.monitor is not None:
+            self.pipeline.add_tap(self.monitor.feed)
+        self.pipeline.start()
+        logging.info(f"Session {self.name} started: {self.url}" + (f" (filters: {', '.join(self.filters)})" if self.filters else "") + (" with speech/music gate" if self.speech_gate else ""))
+    def launch(self, offset, duration):
+        audio_path = self.audio_filename
+        segment_list = None
+        if self.segments is not None:
+            if offset:
+                self.segments.restart(offset, self.ingest.offset)
+            segment_list = self.segments.list_path
+        elif self.record and offset:
+            audio_path = output_path(self.output_dir, self.name, "audio", self.audio_format)
+            if audio_path == self.audio_filename:
+                audio_path = f"{os.path.splitext(audio_path)[0]}_{int(offset)}.{self.audio_format}"
+            self.audio_filename = audio_path
+            self.output.open(audio_path, offset)
+        process = start_ffmpeg(self.ffmpeg_path, self.url, audio_path, self.audio_format, duration, self.segment_seconds if self.segments else 0, segment_list, self.loop_input, self.reconnect, self.filters)
+        threading.Thread(target=self.read_stderr, args=(process,), name=f"stderr-{self.name}", daemon=True).start()
+        return process
+    def mark_gap(self, offset, seconds):
+        text = f"[{seconds:.0f} s of audio lost, stream reconnected]\n"
+        if self.segments is not None:
+            self.segments.add_text(offset, text)
+        elif self.transcript_file is not None:
+            with self.lock:
+                self.transcript_file.write(text)
+                self.transcript_file.flush()
+    def transcribe(self, audio, **options):
+        return self.pool.transcribe(self.name, audio, **options)
+    def submit(self, audio, **options):
+        return self.pool.submit(self.name, audio, **options)
+    def handle_segments(self, chunk, segments):
+        self.write_records(segment_records(self.name, segments, chunk.offset, self.started_at))
+        full_text = "".join(segment.text for segment in segments)
+        self.write_text(chunk, "".join(f"{sentence}\n" for sentence in split_sentences(full_text)))
+    def handle_words(self, chunk, committed, unconfirmed):
+        text, self.line_start = words_text(committed, self.line_start)
+        records = self.words.feed(committed)
+        if chunk is None:
+            records += self.words.flush()
+        self.write_records(records)
+        self.write_text(chunk, text)
+    def write_records(self, records):
+        if not records:
+            return
+        if self.segments is not None:
+            self.segments.add_records(records)
+        else:
+            self.output.write(records)
+        if self.alerts is not None:
+            self.alerts.process(records, self.segments.locate if self.segments is not None else self.output.locate)
+    def write_text(self, chunk, text):
+        if not text:
+            return
+        if self.first_transcript_time is None:
+            self.first_transcript_time = time.time() - self.started_at
+            logging.info(f"[{self.name}] Time to first transcript: {self.first_transcript_time:.1f}s")
+        if self.segments is not None:
+            self.segments.add_text(chunk.offset if chunk is not None else None, text)
+        else:
+            with self.lock:
+                self.transcript_file.write(text)
+                self.transcript_file.flush()
+        if self.on_text:
+            self.on_text(self, chunk, text)
+    def read_stderr(self, process):
+        try:
+            for line in process.stderr:
+                logging.debug(f"[{self.name}] {line.decode('utf-8', errors='replace').strip()}")
+        except Exception as e:
+            logging.error(f"[{self.name}] Error reading stderr: {str(e)}")
+    def is_alive(self):
+        return self.pipeline is not None and self.pipeline.is_alive()
+    def stop(self):
+        if self.ingest and self.ingest.poll():
+            logging.error(f"[{self.name}] FFmpeg process ended with an error.")
+        if self.ingest:
+            self.ingest.stop()
+        if self.pipeline:
+            self.pipeline.stop()
+    def close(self):
+        if self.pipeline:
+            self.pipeline.join()
+        if self.segments is not None:
+            self.segments.stop()
+            logging.info(f"[{self.name}] Segments saved in {self.segments.folder}")
+        elif self.audio_filename:
+            logging.info(f"[{self.name}] Audio saved: {self.audio_filename}")
+        if self.transcript_file:
+            self.transcript_file.close()
+            self.transcript_file = None
+        self.output.close()
+        if self.ingest is not None and self.ingest.reconnects:
+            logging.info(f"[{self.name}] {self.ingest.reconnects} reconnect(s), {self.ingest.lost_seconds:.1f}s of audio lost")
+        logging.info(f"Session {self.name} finished: {self.pipeline.report() if self.pipeline else ''}")
+    def stats(self):
+        result = {"stream": self.name, "stages": self.pipeline.stats() if self.pipeline else [], "first_transcript": self.first_transcript_time}
+        result["model"] = self.pool.stats().get(self.name, {})
+        if self.segments is not None:
+            result["segments"] = self.segments.stats()
+        if self.ingest is not None:
+            result["ingest"] = self.ingest.stats()
+        if self.monitor is not None:
+            result["monitor"] = self.monitor.stats()
+        if self.alerts is not None:
+            result["alerts"] = self.alerts.stats(self.name)
+        return result
+class SessionManager:
+    def __init__(self, pool, **session_options):
+        self.pool = pool
+        self.session_options = session_options
+        self.sessions = {}
+    def add(self, name, url, **options):
+        if name in self.sessions:
+            raise ValueError(f"Stream {name} is already running")
+        merged = dict(self.session_options)
+        merged.update(options)
+        session = StreamSession(name, url, self.pool, **merged)
+        self.sessions[name] = session
+        return session
+    def start(self):
+        if not self.pool.running:
+            self.pool.start()
+        for session in self.sessions.values():
+            session.start()
+    def wait(self, report_interval=10, should_stop=None):
+        last_report = time.time()
+        while any(session.is_alive() for session in self.sessions.values()):
+            if should_stop is not None and should_stop():
+                break
+            if report_interval and time.time() - last_report >= report_interval:
+                for line in self.report():
+                    logging.info(line)
+                last_report = time.time()
+            time.sleep(0.2)
+    def stop(self):
+        for session in self.sessions.values():
+            session.stop()
+        for session in self.sessions.values():
+            session.close()
+        self.pool.stop()
+    def stats(self):
+        return [session.stats() for session in self.sessions.values()]
+    def report(self):
+        lines = []
+        for item in self.stats():
+            model = item["model"]
+            latency = f" latency={model.get('last_latency', 0.0):.1f}s rtf={model.get('rtf', 0.0):.2f}" if model else ""
+            stages = " | ".join(f"{stage['stage']} q={stage['depth']} lag={stage['lag']:.1f}s" for stage in item["stages"])
+            ingest = item.get("ingest") or {}
+            if ingest.get("reconnects"):
+                stages += f" | reconnects={ingest['reconnects']} lost={ingest['lost_seconds']:.1f}s"
+            for stage in item["stages"]:
+                filters = (stage.get("chunker") or {}).get("filters")
+                if filters:
+                    stages += " | skipped " + " ".join(f"{name}={seconds:.0f}s" for name, seconds in filters.items())
+            lines.append(f"{item['stream']}:{latency} {stages}")
+        return lines
@@ -1,61 +1,35 @@
 import threading
 import sys
-import subprocess
-import numpy as np
 import os
-cache_dir = os.path.expanduser("~/.cache/huggingface")
-hf_home_dir = os.path.join(cache_dir, "hub")
-os.makedirs(hf_home_dir, exist_ok=True)
-os.environ["HF_HOME"] = cache_dir
-import faster_whisper
-from colorama import Fore, Style, init
 import time
 from datetime import datetime
-import requests
 import re
-import wave
 import logging
-from logging.handlers import RotatingFileHandler
-import pyaudio
+import tempfile
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QTextEdit, QLabel, QLineEdit,
     QVBoxLayout, QHBoxLayout, QWidget, QFileDialog, QMessageBox, QSpinBox,
-    QComboBox, QDoubleSpinBox
+    QComboBox, QDoubleSpinBox, QCheckBox, QSystemTrayIcon, QStyle
 )
 from PySide6.QtCore import QTimer, Qt, Signal, QCoreApplication, QThread
-from PySide6.QtGui import QTextCharFormat, QFont, QColor, QTextCursor, QBrush
-from pydub import AudioSegment
-from contextlib import contextmanager
-@contextmanager
-def suppress_stdout():
-    devnull = open(os.devnull, "w")
-    old_stdout = sys.stdout
-    old_stderr = sys.stderr
-    sys.stdout = devnull
-    sys.stderr = devnull
-    try:
-        yield
-    finally:
-        sys.stdout = old_stdout
-        sys.stderr = old_stderr
-        devnull.close()
+from PySide6.QtGui import QColor
+from engine import STREAMS, DEFAULT_CHUNK_BYTES, preprocessing_options, setup_model_cache, setup_usage_log, app_paths, ffmpeg_path, log_usage
+from pipeline import AudioPipeline, start_ffmpeg, is_network_url, AUDIO_FORMATS
+from models import preload_model, ModelConfig, MODEL_SIZES, COMPUTE_TYPES
+from workers import ProcessModelPool
+from transcript_view import TranscriptView, TranscriptLog
+from sessions import split_sentences, build_transcriber
+from streaming import words_text
+from segments import SegmentRecorder, recover_segments, SEGMENT_SECONDS
+from transcripts import TranscriptOutput, WordGrouper, segment_records, open_index
+from ingest import IngestSupervisor
+from monitor import AudioMonitor
+from alerts import AlertEngine, FileHook, DesktopHook, load_rules, ALERT_LOG_NAME
+from probe import StreamProber, PROBE_TTL_SECONDS
+from metrics import status_text
+setup_model_cache()
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
-usage_logger = logging.getLogger("stream")
-usage_logger.setLevel(logging.INFO)
-if not usage_logger.handlers:
-    if getattr(sys, 'frozen', False):
-        base_path = sys._MEIPASS
-        log_dir = os.path.dirname(sys.executable)
-    else:
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        log_dir = base_path
-    log_file_path = os.path.join(log_dir, "stream.log")
-    handler = RotatingFileHandler(log_file_path, maxBytes=5*1024*1024, backupCount=3)
-    formatter = logging.Formatter('%(asctime)s %(stream_name)s - %(action)s: %(duration_formatted)s', datefmt='%Y-%m-%d %H:%M:%S')
-    handler.setFormatter(formatter)
-    usage_logger.addHandler(handler)
-    usage_logger.propagate = False
-init(autoreset=True)
+setup_usage_log()
 class WorkerThread(QThread):
     update_signal = Signal(str, bool, Qt.GlobalColor)
     reset_signal = Signal()
@@ -68,40 +42,76 @@ class WorkerThread(QThread):
 class AudioRecorderApp(QMainWindow):
     update_signal = Signal(str, bool, Qt.GlobalColor)
     reset_signal = Signal()
+    model_state_signal = Signal(str)
+    probe_signal = Signal(object)
+    alert_signal = Signal(str, str)
     def __init__(self):
         super().__init__()
-        self.setWindowTitle('Stream Recorder and Transcriber ("base") - V211125')
         self.setGeometry(100, 100, 1000, 600)
-        self.current_chunk_ranges = []
-        if getattr(sys, 'frozen', False):
-            self.base_path = sys._MEIPASS
-            self.output_dir = os.path.dirname(sys.executable)
-        else:
-            self.base_path = os.path.dirname(os.path.abspath(__file__))
-            self.output_dir = self.base_path
+        self.base_path, self.output_dir = app_paths()
+        self.model_config_filename = os.path.join(self.output_dir, "model_config.json")
         self.running = False
         self.model = None
+        self.model_handle = None
+        self.process_pool = None
+        self.use_processes = False
+        self.model_config = ModelConfig()
         self.model_state = "not_loaded"
-        self.wav_filename = None
+        self.first_transcript_time = None
+        self.audio_filename = None
+        self.audio_format = "mp3"
+        self.rolling = False
+        self.keep_segments = 24 * 3600 // SEGMENT_SECONDS
+        self.segments = None
         self.transcript_filename = None
-        self.process_ffmpeg = None
+        self.transcript_log = None
+        self.transcript_index = open_index(self.output_dir)
+        self.transcript_output = None
+        self.words = None
+        self.ingest = None
+        self.ffmpeg_exe = None
+        self.stream_url = None
+        self.source_url = None
+        self.preprocessing = preprocessing_options(None)
         self.start_time = 0
         self.max_duration = 0
-        self.audio_bytes_read_default = 16000 * 2 * 15
+        self.audio_bytes_read_default = DEFAULT_CHUNK_BYTES
         self.audio_bytes_read = self.audio_bytes_read_default
+        self.pipeline = None
+        self.worker_thread = None
+        self.pipeline_queue_size = 8
+        self.transcribe_policy = "drop_oldest"
+        self.monitor = AudioMonitor()
+        self.alert_rules_filename = os.path.join(self.output_dir, "alert_rules.json")
+        self.alerts = None
+        self.tray = None
+        self.pipeline_report_interval = 10
+        self.profile_dir = None
+        self.chunking = "fixed"
+        self.line_start = True
         self.operation_start_time = None
         self.current_stream_name = "Unknown Stream"
+        if os.path.exists(self.model_config_filename):
+            try:
+                self.model_config = ModelConfig.load(self.model_config_filename)
+                logging.info(f"Model settings loaded from {self.model_config_filename}: {self.model_config.label()}")
+            except Exception as e:
+                logging.error(f"Failed to read {self.model_config_filename}: {str(e)}")
+        self.update_window_title()
         self.init_ui()
+        self.transcript_view = TranscriptView(self.text_box)
         self.update_signal.connect(self.update_status)
         self.reset_signal.connect(self.reset_text_format)
-        self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=16000,
-            output=True,
-            frames_per_buffer=1024
-        )
+        self.model_state_signal.connect(self.set_model_state)
+        self.probe_signal.connect(self.show_probe_result)
+        self.prober = StreamProber(on_result=self.probe_signal.emit)
+        self.probe_timer = QTimer(self)
+        self.probe_timer.timeout.connect(self.probe_presets)
+        self.probe_timer.start(PROBE_TTL_SECONDS * 1000)
+        self.probe_presets()
+        self.alert_signal.connect(self.show_alert)
+        self.load_alerts()
+        self.preload_model()
     def init_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -116,22 +126,8 @@ class AudioRecorderApp(QMainWindow):
         self.stream_selector_label = QLabel("Select a stream:")
         self.stream_selector = QComboBox()
         self.stream_selector.setEditable(True)
-        self.streams = {
-            "URL": "Select from the drop-down list or enter a different URL manually.",
-            "Aljazeera": "https://live-hls-audio-aje-fa.getaj.net/VOICE-AJE/01.m3u8",
-            "Aljazeera_News": "http://live-hls-web-aje.getaj.net/AJE/06.m3u8",
-            "BBC": "https://stream.live.vc.bbcmedia.co.uk/bbc_world_service",
-            "BBC_east": "https://stream.live.vc.bbcmedia.co.uk/bbc_world_service_east_asia",
-            "BBC_radio": "http://as-hls-ww-live.akamaized.net/pool_55057080/live/ww/bbc_radio_fourfm/bbc_radio_fourfm.isml/bbc_radio_fourfm-audio%3d128000.norewind.m3u8",
-            "Bloomberg": "https://playerservices.streamtheworld.com/api/livestream-redirect/WBBRDCAAC.aac",
-            "Bloomberg_Boston": "https://playerservices.streamtheworld.com/api/livestream-redirect/WRCAAMAAC.aac",
-            "Bloomberg_Busines": "https://stream.revma.ihrhls.com/zc301",
-            "CNN_Int": "https://tunein.cdnstream1.com/3519_96.aac",
-            "CNN": "https://tunein.cdnstream1.com/2868_96.aac",
-            "Sport": "http://13.54.221.214:8000/sen.mp3",
-            "VOA": "https://voa-ingest.akamaized.net/hls/live/2035234/160_342L/playlist.m3u8",
-            "VOA_news": "http://voa-28.akacast.akamaistream.net/7/54/322040/v1/ibb.akacast.akamaistream.net/voa-28"
-        }
+        self.streams = {"URL": "Select from the drop-down list or enter a different URL manually."}
+        self.streams.update(STREAMS)
         for name in self.streams:
             self.stream_selector.addItem(name)
         self.stream_selector.currentIndexChanged.connect(self.update_url_from_selection)
@@ -146,13 +142,21 @@ class AudioRecorderApp(QMainWindow):
         url_entry_layout.addWidget(self.url_entry)
         layout.addLayout(url_entry_layout)
         duration_layout = QHBoxLayout()
-        self.duration_label = QLabel("Specify the duration of the stream up to 30 minutes and click the button:")
+        self.duration_label = QLabel("Specify the duration of the stream in minutes and click the button:")
         self.duration_spinbox = QSpinBox()
         self.duration_spinbox.setMinimum(1)
-        self.duration_spinbox.setMaximum(30)
+        self.duration_spinbox.setMaximum(24 * 60)
         self.duration_spinbox.setValue(2)
+        self.rolling_checkbox = QCheckBox(f"24/7: rolling {SEGMENT_SECONDS // 60}-minute files, last 24 hours kept")
+        self.rolling_checkbox.toggled.connect(self.update_rolling)
         duration_layout.addWidget(self.duration_label)
         duration_layout.addWidget(self.duration_spinbox)
+        duration_layout.addWidget(self.rolling_checkbox)
+        self.monitor_checkbox = QCheckBox("Play the stream")
+        self.monitor_checkbox.setChecked(True)
+        self.monitor_checkbox.setToolTip("Play the incoming audio with a short buffer, independent of transcription (the audio device is opened on first use)")
+        self.monitor_checkbox.toggled.connect(self.update_monitoring)
+        duration_layout.addWidget(self.monitor_checkbox)
         duration_layout.addStretch()
         layout.addLayout(duration_layout)
         audio_bytes_layout = QHBoxLayout()
@@ -164,8 +168,54 @@ class AudioRecorderApp(QMainWindow):
         self.audio_bytes_read_spinbox.valueChanged.connect(self.update_audio_bytes_read)
         audio_bytes_layout.addWidget(self.audio_bytes_read_label)
         audio_bytes_layout.addWidget(self.audio_bytes_read_spinbox)
+        self.chunking_selector = QComboBox()
+        self.chunking_modes = {
+            "Fixed blocks": "fixed",
+            "Cut at speech pauses (block = max length)": "vad",
+            "Streaming, 1 sec updates (block = window)": "streaming"
+        }
+        for name in self.chunking_modes:
+            self.chunking_selector.addItem(name)
+        self.chunking_selector.currentTextChanged.connect(self.update_chunking)
+        audio_bytes_layout.addWidget(self.chunking_selector)
         audio_bytes_layout.addStretch()
         layout.addLayout(audio_bytes_layout)
+        model_layout = QHBoxLayout()
+        self.model_size_selector = QComboBox()
+        self.model_size_selector.addItems(MODEL_SIZES)
+        self.model_size_selector.setEditable(True)
+        self.model_size_selector.setCurrentText(self.model_config.size)
+        self.compute_type_selector = QComboBox()
+        self.compute_type_selector.addItems(COMPUTE_TYPES)
+        self.compute_type_selector.setCurrentText(self.model_config.compute_type)
+        self.cpu_threads_spinbox = QSpinBox()
+        self.cpu_threads_spinbox.setRange(0, os.cpu_count() or 64)
+        self.cpu_threads_spinbox.setSpecialValueText("auto")
+        self.cpu_threads_spinbox.setValue(self.model_config.cpu_threads)
+        self.beam_size_spinbox = QSpinBox()
+        self.beam_size_spinbox.setRange(1, 10)
+        self.beam_size_spinbox.setValue(self.model_config.beam_size)
+        model_layout.addWidget(QLabel("Model:"))
+        model_layout.addWidget(self.model_size_selector)
+        model_layout.addWidget(QLabel("Compute type:"))
+        model_layout.addWidget(self.compute_type_selector)
+        model_layout.addWidget(QLabel("CPU threads:"))
+        model_layout.addWidget(self.cpu_threads_spinbox)
+        model_layout.addWidget(QLabel("Beam size:"))
+        model_layout.addWidget(self.beam_size_spinbox)
+        self.process_checkbox = QCheckBox("Run model in a separate process")
+        self.process_checkbox.toggled.connect(self.update_use_processes)
+        model_layout.addWidget(self.process_checkbox)
+        self.profile_checkbox = QCheckBox("Profile worker threads")
+        self.profile_checkbox.setToolTip("Write cProfile .prof files for each stage to the output folder when the job ends")
+        self.profile_checkbox.toggled.connect(self.update_profiling)
+        model_layout.addWidget(self.profile_checkbox)
+        model_layout.addStretch()
+        layout.addLayout(model_layout)
+        self.model_size_selector.currentTextChanged.connect(self.update_model_config)
+        self.compute_type_selector.currentTextChanged.connect(self.update_model_config)
+        self.cpu_threads_spinbox.valueChanged.connect(self.update_model_config)
+        self.beam_size_spinbox.valueChanged.connect(self.update_model_config)
         self.text_box = QTextEdit()
         self.text_box.setReadOnly(True)
         layout.addWidget(self.text_box)
@@ -178,6 +228,12 @@ class AudioRecorderApp(QMainWindow):
         self.listen_button = QPushButton("Listen")
         self.listen_button.clicked.connect(self.toggle_listen_mode)
         button_layout.addWidget(self.listen_button)
+        self.audio_format_selector = QComboBox()
+        self.audio_format_selector.addItems(AUDIO_FORMATS)
+        self.audio_format_selector.setCurrentText(self.audio_format)
+        self.audio_format_selector.currentTextChanged.connect(self.update_audio_format)
+        button_layout.addWidget(QLabel("Save as:"))
+        button_layout.addWidget(self.audio_format_selector)
         button_frame.setLayout(button_layout)
         layout.addWidget(button_frame)
         central_widget.setLayout(layout)
@@ -195,64 +251,118 @@ class AudioRecorderApp(QMainWindow):
             "error": "Error"
         }
         return state_map.get(self.model_state, "Unknown")
+    def update_window_title(self):
+        self.setWindowTitle(f'Stream Recorder and Transcriber ("{self.model_config.size}") - V211125')
+    def update_model_config(self, *args):
+        config = ModelConfig(
+            self.model_size_selector.currentText().strip() or "base",
+            self.model_config.device,
+            self.compute_type_selector.currentText(),
+            self.cpu_threads_spinbox.value(),
+            self.model_config.num_workers,
+            self.beam_size_spinbox.value(),
+            self.beam_size_spinbox.value(),
+            self.model_config.without_timestamps
+        )
+        reload = config.model_args() != self.model_config.model_args()
+        self.model_config = config
+        self.update_window_title()
+        if reload:
+            self.model = None
+            self.preload_model()
+    def preload_model(self):
+        self.model_state = "loading"
+        self.update_status_display()
+        if self.process_pool is not None:
+            self.process_pool.stop()
+            self.process_pool = None
+        if self.use_processes:
+            self.process_pool = ProcessModelPool.from_config(self.model_config)
+            self.process_pool.start()
+            self.model_handle = self.process_pool.handle
+        else:
+            self.model_handle = preload_model(*self.model_config.model_args(), warm_up=True)
+        self.model_handle.on_ready(lambda handle: self.model_state_signal.emit(handle.state()))
+    def set_model_state(self, state):
+        if self.model_handle is not None:
+            state = self.model_handle.state()
+        self.model_state = state
+        if state == "loaded":
+            self.model = self.model_handle.model
+        self.update_status_display()
     def load_model_if_needed(self):
-        if self.model is None:
-            self.model_state = "loading"
-            self.update_status_display()
-            QApplication.processEvents()
-            try:
-                with suppress_stdout():
-                    self.model = faster_whisper.WhisperModel("base", device="cpu", compute_type="int8")
-                logging.info("Model Whisper loaded successfully.")
-                self.model_state = "loaded"
-                self.update_status_display()
-                QApplication.processEvents()
-            except Exception as e:
-                self.model_state = "error"
-                self.update_status_display()
-                QApplication.processEvents()
-                QMessageBox.critical(self, "Error", f"Failed to load Whisper model: {str(e)}")
-                raise
+        if self.model is None and (self.model_handle is None or self.model_handle.state() == "error"):
+            self.preload_model()
+    def wait_for_model(self):
+        try:
+            return self.model_handle.wait()
+        except Exception as e:
+            self.model_state_signal.emit("error")
+            raise RuntimeError(f"Failed to load Whisper model: {str(e)}")
+    def note_first_transcript(self):
+        if self.first_transcript_time is None:
+            self.first_transcript_time = time.time() - self.start_time
+            handle = self.model_handle
+            logging.info(f"Time to first transcript: {self.first_transcript_time:.1f}s (model load {handle.load_seconds:.1f}s, warm-up {handle.warm_up_seconds:.1f}s)")
+    def load_alerts(self):
+        if not os.path.exists(self.alert_rules_filename):
+            return
+        try:
+            rules = load_rules(self.alert_rules_filename)
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Failed to read {self.alert_rules_filename}: {str(e)}")
+            return
+        self.alerts = AlertEngine(rules, [FileHook(os.path.join(self.output_dir, ALERT_LOG_NAME)), DesktopHook(self.alert_signal.emit)])
+        self.alerts.start()
+        logging.info(f"{len(rules)} alert rule(s) loaded from {self.alert_rules_filename}")
+    def show_alert(self, title, message):
+        if self.tray is None and QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray = QSystemTrayIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxInformation), self)
+            self.tray.show()
+        if self.tray is not None:
+            self.tray.showMessage(title, message, QSystemTrayIcon.MessageIcon.Information, 10000)
+        self.statusBar().showMessage(f"Alert - {title}: {message}", 30000)
+    def probe_presets(self):
+        self.prober.probe([url for url in self.streams.values() if is_network_url(url)], force=True)
+    def show_probe_result(self, result):
+        for index in range(self.stream_selector.count()):
+            if self.streams.get(self.stream_selector.itemText(index)) == result.url:
+                self.stream_selector.setItemData(index, result.summary(), Qt.ItemDataRole.ToolTipRole)
+                self.stream_selector.setItemData(index, None if result.ok else QColor(Qt.GlobalColor.gray), Qt.ItemDataRole.ForegroundRole)
+    def checked_url(self, url):
+        result = self.prober.result(url)
+        if result is None:
+            if is_network_url(url):
+                self.prober.probe([url])
+            return url
+        if not result.ok:
+            self.prober.invalidate(url)
+            self.prober.probe([url])
+            QMessageBox.critical(self, "Error", f"URL is unavailable: {url} ({result.summary()})")
+            return None
+        return result.resolved_url
     def update_url_from_selection(self):
         selected_name = self.stream_selector.currentText()
         url = self.streams.get(selected_name, "")
         self.url_entry.setText(url)
     def update_status(self, text, bold=True, color=Qt.GlobalColor.red):
-        cursor = self.text_box.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        start_pos = cursor.position()
-        fmt = QTextCharFormat()
-        if bold:
-            fmt.setFontWeight(QFont.Weight.Bold)
-        fmt.setForeground(QBrush(color))
-        cursor.insertText(text, fmt)
-        end_pos = cursor.position()
-        self.current_chunk_ranges.append((start_pos, end_pos))
-        self.text_box.ensureCursorVisible()
+        self.transcript_view.append(text, color, bold)
     def reset_text_format(self):
-        cursor = self.text_box.textCursor()
-        normal_format = QTextCharFormat()
-        normal_format.setFontWeight(QFont.Weight.Bold)
-        normal_format.setForeground(QBrush(Qt.GlobalColor.blue))
-        for start, end in self.current_chunk_ranges:
-            cursor.setPosition(start)
-            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
-            cursor.mergeCharFormat(normal_format)
-        self.current_chunk_ranges = []
+        self.transcript_view.commit()
+    def open_transcript(self, stream_name, temporary=False):
+        if temporary:
+            fd, path = tempfile.mkstemp(prefix="transcript_", suffix=".txt")
+            os.close(fd)
+        else:
+            current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            base_name = re.sub(r'[^a-zA-Z0-9]', '_', stream_name)
+            path = os.path.join(self.output_dir, f"{base_name}_transcript_{current_time}.txt")
+        self.transcript_filename = path
+        self.transcript_log = TranscriptLog(path, temporary)
+        self.transcript_view.reset(self.transcript_log)
     def log_usage_event(self, action):
         if self.operation_start_time:
-            duration_seconds = time.time() - self.operation_start_time
-            minutes = int(duration_seconds // 60)
-            seconds = int(duration_seconds % 60)
-            duration_formatted = f"{minutes}:{seconds:02d}"
-            usage_logger.info(
-                "",
-                extra={
-                    'stream_name': self.current_stream_name,
-                    'action': action,
-                    'duration_formatted': duration_formatted
-                }
-            )
+            log_usage(self.current_stream_name, action, time.time() - self.operation_start_time)
     def toggle_recording(self):
         if self.running:
             self.stop_recording()
@@ -261,103 +371,164 @@ class AudioRecorderApp(QMainWindow):
             if not url:
                 QMessageBox.warning(self, "Warning", "Enter a stream URL")
                 return
-            self.text_box.clear()
+            self.transcript_view.reset()
             self.start_stream_processing(url)
             self.listen_button.setEnabled(False)
     def start_stream_processing(self, url):
-        try:
-            self.load_model_if_needed()
-        except Exception:
-            return
+        self.load_model_if_needed()
         self.operation_start_time = time.time()
         self.current_stream_name = self.stream_selector.currentText()
-        try:
-            response = requests.get(url, timeout=5, stream=True)
-            if response.status_code != 200:
-                QMessageBox.critical(self, "Error", f"URL is unavailable: {url}")
-                return
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Error", f"Error checking URL: {str(e)}")
+        self.source_url = url
+        url = self.checked_url(url)
+        if url is None:
+            self.operation_start_time = None
             return
-        self.max_duration = self.duration_spinbox.value() * 60
+        self.max_duration = 0 if self.rolling else self.duration_spinbox.value() * 60
         self.start_time = time.time()
         selected_name = self.stream_selector.currentText()
         current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         base_name = re.sub(r'[^a-zA-Z0-9]', '_', selected_name)
-        self.wav_filename = os.path.join(self.output_dir, f"{base_name}_audio_{current_time}.wav")
-        ffmpeg_path = os.path.join(self.base_path, "ffmpeg.exe") if getattr(sys, 'frozen', False) else "ffmpeg"
-        ffmpeg_cmd = [
-            ffmpeg_path,
-            "-y",
-            "-stream_loop", "-1",
-            "-i", url,
-            "-vn",
-            "-acodec", "pcm_s16le",
-            "-ar", "16000",
-            "-ac", "1",
-            "-f", "s16le",
-            "-"
-        ]
+        self.audio_filename = os.path.join(self.output_dir, f"{base_name}_audio_{current_time}.{self.audio_format}")
+        self.open_transcript(selected_name)
+        self.ffmpeg_exe = ffmpeg_path(self.base_path)
         try:
-            self.process_ffmpeg = subprocess.Popen(
-                ffmpeg_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=10**8,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            self.wav_file = wave.open(self.wav_filename, "wb")
-            self.wav_file.setnchannels(1)
-            self.wav_file.setsampwidth(2)
-            self.wav_file.setframerate(16000)
+            if self.rolling:
+                recover_segments(self.output_dir, selected_name, self.ffmpeg_exe)
+                self.segments = SegmentRecorder(self.output_dir, selected_name, self.audio_format, SEGMENT_SECONDS, self.keep_segments, index=self.transcript_index, ffmpeg_path=self.ffmpeg_exe)
+                self.segments.start()
+                self.audio_filename = None
+            else:
+                self.transcript_output = TranscriptOutput(index=self.transcript_index, stream=selected_name)
+                self.transcript_output.open(self.audio_filename)
+            self.start_ingest(url)
             self.running = True
             self.start_button.setText("Stop")
-            self.status_label.setText("Status: In progress... | Model: Loaded")
+            self.status_label.setText("Status: In progress...")
+            self.update_status_display()
             self.worker_thread = WorkerThread(self, self.process_audio, ())
             self.worker_thread.update_signal.connect(self.update_status)
             self.worker_thread.reset_signal.connect(self.reset_text_format)
             self.worker_thread.finished.connect(self.stop_processing_stream)
             self.worker_thread.start()
-            self.read_stderr_thread = threading.Thread(target=self.read_stderr, daemon=True)
-            self.read_stderr_thread.start()
             self.timer.start(1000)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to start FFmpeg: {str(e)}")
             return
+    def start_ingest(self, url):
+        self.preprocessing = preprocessing_options(self.current_stream_name)
+        self.stream_url = url
+        self.ingest = IngestSupervisor(self.launch_ffmpeg, is_network_url(url), self.max_duration, on_gap=self.mark_gap, name=self.current_stream_name)
+        self.ingest.start()
+    def launch_ffmpeg(self, offset, duration):
+        if offset and self.stream_url != self.source_url:
+            self.prober.invalidate(self.source_url)
+            self.stream_url = self.source_url
+        if self.segments is not None:
+            if offset:
+                self.segments.restart(offset, self.ingest.offset)
+            process = start_ffmpeg(self.ffmpeg_exe, self.stream_url, self.segments.pattern, self.audio_format, 0, SEGMENT_SECONDS, self.segments.list_path, filters=self.preprocessing["filters"])
+        elif self.audio_filename:
+            if offset:
+                base, ext = os.path.splitext(self.audio_filename)
+                self.audio_filename = f"{re.sub(r'_part[0-9]+$', '', base)}_part{self.ingest.reconnects + 2}{ext}"
+                self.transcript_output.open(self.audio_filename, offset)
+            process = start_ffmpeg(self.ffmpeg_exe, self.stream_url, self.audio_filename, self.audio_format, duration, filters=self.preprocessing["filters"])
+        else:
+            process = start_ffmpeg(self.ffmpeg_exe, self.stream_url, duration=duration, filters=self.preprocessing["filters"])
+        threading.Thread(target=self.read_stderr, args=(process,), daemon=True).start()
+        return process
+    def mark_gap(self, offset, seconds):
+        text = f"[{seconds:.0f} s of audio lost, stream reconnected]\n"
+        self.transcript_log.append(text)
+        self.update_signal.emit(text, True, Qt.GlobalColor.gray)
+        if self.segments is not None:
+            self.segments.add_text(offset, text)
     def process_audio(self):
         try:
-            while self.running:
-                if self.process_ffmpeg.poll() is not None:
-                    logging.error("FFmpeg process ended with an error.")
-                    self.running = False
-                    break
-                audio_bytes = self.process_ffmpeg.stdout.read(self.audio_bytes_read)
-                if not audio_bytes or (time.time() - self.start_time >= self.max_duration):
-                    self.running = False
-                    break
-                audio = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-                self.wav_file.writeframes(audio_bytes)
-                segments, info = self.model.transcribe(audio, language="en", vad_filter=True)  # , task="translate"
-                full_text = ""
-                for segment in segments:
-                    full_text += segment.text
-                if full_text.strip():
-                    sentences = re.split(r'[.!?]\s*', full_text)
-                    for sentence in sentences:
-                        sentence = sentence.strip()
-                        if sentence:
-                            self.update_signal.emit(f"{sentence}.\n", True, Qt.GlobalColor.red)
-                self.stream.write(audio_bytes)
-                self.reset_signal.emit()
+            self.run_pipeline()
         except Exception as e:
             logging.error(f"Audio processing error: {str(e)}")
             self.update_signal.emit(f"Audio processing error: {str(e)}", True, Qt.GlobalColor.red)
+    def run_pipeline(self):
+        self.line_start = True
+        self.first_transcript_time = None
+        self.words = WordGrouper(self.current_stream_name, self.start_time)
+        handler, chunker, read_bytes = build_transcriber(self.chunking, self.audio_bytes_read, self.transcribe_chunk, self.emit_segments, self.emit_words, speech_gate=self.preprocessing["speech_gate"])
+        policy = "block" if self.chunking == "streaming" else self.transcribe_policy
+        self.pipeline = AudioPipeline(self.ingest, read_bytes, label=re.sub(r'[^a-zA-Z0-9]', '_', self.current_stream_name), profile_dir=self.profile_dir)
+        self.pipeline.add_stage("transcribe", handler, self.pipeline_queue_size, policy, drain=False, chunker=chunker)
+        self.pipeline.add_tap(self.monitor.feed)
+        self.monitor.set_enabled(self.monitor_checkbox.isChecked())
+        self.pipeline.start()
+        last_report = time.time()
+        try:
+            while self.running and self.pipeline.is_alive():
+                if time.time() - last_report >= self.pipeline_report_interval:
+                    logging.debug(f"Pipeline: {self.pipeline.report()}")
+                    last_report = time.time()
+                time.sleep(0.2)
         finally:
-            if hasattr(self, 'wav_file'):
-                self.wav_file.close()
-            if hasattr(self, 'process_ffmpeg') and self.process_ffmpeg:
-                self.process_ffmpeg.terminate()
-                self.process_ffmpeg.wait()
+            self.running = False
+            self.monitor.disable()
+            if self.ingest.poll():
+                logging.error("FFmpeg process ended with an error.")
+            self.ingest.stop()
+            if self.ingest.reconnects:
+                logging.info(f"{self.ingest.reconnects} reconnect(s), {self.ingest.lost_seconds:.1f}s of audio lost")
+            self.pipeline.stop()
+            self.pipeline.join()
+            logging.info(f"Pipeline finished: {self.pipeline.report()}")
+            if self.segments is not None:
+                self.segments.stop()
+                logging.info(f"Segments saved in {self.segments.folder}")
+                self.segments = None
+            if self.transcript_output is not None:
+                self.transcript_output.close()
+                self.transcript_output = None
+    def transcribe_chunk(self, audio, **options):
+        if self.process_pool is not None:
+            return self.process_pool.transcribe(self.current_stream_name, audio, **options)
+        model = self.model or self.wait_for_model()
+        transcribe_options = self.model_config.transcribe_options()
+        transcribe_options.update(options)
+        segments, info = model.transcribe(audio, language="en", **transcribe_options)  # , task="translate"
+        return segments
+    def emit_segments(self, chunk, segments):
+        self.reset_signal.emit()
+        self.save_records(segment_records(self.current_stream_name, segments, chunk.offset, self.start_time))
+        full_text = ""
+        for segment in segments:
+            full_text += segment.text
+        text = "".join(f"{sentence}\n" for sentence in split_sentences(full_text))
+        if text:
+            self.note_first_transcript()
+            self.transcript_log.append(text)
+            self.update_signal.emit(text, True, Qt.GlobalColor.red)
+            if self.segments is not None:
+                self.segments.add_text(chunk.offset, text)
+    def emit_words(self, chunk, committed, unconfirmed):
+        text, self.line_start = words_text(committed, self.line_start)
+        records = self.words.feed(committed)
+        if chunk is None:
+            records += self.words.flush()
+        self.save_records(records)
+        if text:
+            self.note_first_transcript()
+            self.transcript_log.append(text)
+            self.reset_signal.emit()
+            self.update_signal.emit(text, True, Qt.GlobalColor.red)
+            if self.segments is not None:
+                self.segments.add_text(chunk.offset if chunk is not None else None, text)
+    def save_records(self, records):
+        if not records:
+            return
+        if self.alerts is not None:
+            self.alerts.process(records, self.segments.locate if self.segments is not None else self.transcript_output.locate if self.transcript_output is not None else None)
+        if self.segments is not None:
+            self.segments.add_records(records)
+            return
+        if self.transcript_output is not None:
+            self.transcript_output.write(records)
     def stop_processing_stream(self):
         self.running = False
         self.timer.stop()
@@ -366,12 +537,13 @@ class AudioRecorderApp(QMainWindow):
         self.log_usage_event("Record")
         self.operation_start_time = None
         QMessageBox.information(self, "Information", "Transcription completed.")
-        if self.wav_filename:
-            self.convert_wav_to_mp3(self.wav_filename)
+        if self.audio_filename:
+            logging.info(f"File saved successfully: {self.audio_filename}")
+            self.audio_filename = None
         self.listen_button.setEnabled(True)
-    def read_stderr(self):
+    def read_stderr(self, process):
         try:
-            for line in self.process_ffmpeg.stderr:
+            for line in process.stderr:
                 try:
                     decoded_line = line.decode('utf-8').strip()
                     logging.debug(decoded_line)
@@ -383,69 +555,47 @@ class AudioRecorderApp(QMainWindow):
         elapsed_time = int(time.time() - self.start_time)
         minutes = elapsed_time // 60
         seconds = elapsed_time % 60
-        self.elapsed_time_label.setText(f"Timer {minutes:02}:{seconds:02}")
-        if elapsed_time >= self.max_duration:
+        pipeline_text = f"  [{self.pipeline.report()}]" if self.pipeline and self.running else ""
+        self.elapsed_time_label.setText(f"Timer {minutes:02}:{seconds:02}{pipeline_text}")
+        if self.pipeline and self.running:
+            self.statusBar().showMessage(status_text([self.pipeline_stats()]))
+        if self.max_duration and elapsed_time >= self.max_duration:
             self.running = False
         QCoreApplication.processEvents()
+    def pipeline_stats(self):
+        model = self.process_pool.stats().get(self.current_stream_name, {}) if self.process_pool is not None else {}
+        return {"stream": self.current_stream_name, "stages": self.pipeline.stats(), "model": model, "first_transcript": self.first_transcript_time, "ingest": self.ingest.stats(), "monitor": self.monitor.stats(), "alerts": self.alerts.stats(self.current_stream_name) if self.alerts is not None else None}
     def toggle_listen_mode(self):
         if not self.running:
             url = self.url_entry.text().strip()
             if not url:
                 QMessageBox.warning(self, "Warning", "Enter a stream URL")
                 return
-            try:
-                self.load_model_if_needed()
-            except Exception:
-                return
+            self.load_model_if_needed()
             self.operation_start_time = time.time()
             self.current_stream_name = self.stream_selector.currentText()
-            try:
-                response = requests.get(url, timeout=5, stream=True)
-                if response.status_code != 200:
-                    self.operation_start_time = None
-                    QMessageBox.critical(self, "Error", f"URL is unavailable: {url}")
-                    return
-            except requests.exceptions.RequestException as e:
+            self.source_url = url
+            url = self.checked_url(url)
+            if url is None:
                 self.operation_start_time = None
-                QMessageBox.critical(self, "Error", f"Error checking URL: {str(e)}")
                 return
-            self.text_box.clear()
+            self.open_transcript(self.current_stream_name, temporary=True)
             self.max_duration = self.duration_spinbox.value() * 60
             self.start_time = time.time()
-            selected_name = self.stream_selector.currentText()
-            base_name = re.sub(r'[^a-zA-Z0-9]', '_', selected_name)
-            ffmpeg_path = os.path.join(self.base_path, "ffmpeg.exe") if getattr(sys, 'frozen', False) else "ffmpeg"
-            ffmpeg_cmd = [
-                ffmpeg_path,
-                "-y",
-                "-stream_loop", "-1",
-                "-i", url,
-                "-vn",
-                "-acodec", "pcm_s16le",
-                "-ar", "16000",
-                "-ac", "1",
-                "-f", "s16le",
-                "-"
-            ]
+            self.audio_filename = None
+            self.ffmpeg_exe = ffmpeg_path(self.base_path)
             try:
-                self.process_ffmpeg = subprocess.Popen(
-                    ffmpeg_cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    bufsize=10**8,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
+                self.start_ingest(url)
                 self.running = True
                 self.start_button.setEnabled(False)
                 self.listen_button.setText("Stop")
-                self.status_label.setText("Status: Transcription in progress... | Model: Loaded")
+                self.status_label.setText("Status: Transcription in progress...")
+                self.update_status_display()
                 self.worker_thread = WorkerThread(self, self.process_audio_for_listen, ())
                 self.worker_thread.update_signal.connect(self.update_status)
                 self.worker_thread.reset_signal.connect(self.reset_text_format)
                 self.worker_thread.finished.connect(self.stop_listening)
                 self.worker_thread.start()
-                self.read_stderr_thread = threading.Thread(target=self.read_stderr, daemon=True)
-                self.read_stderr_thread.start()
                 self.timer.start(1000)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to start FFmpeg: {str(e)}")
@@ -454,54 +604,45 @@ class AudioRecorderApp(QMainWindow):
         else:
             self.running = False
             self.timer.stop()
-            self.status_label.setText("Status: Ready for a new job | Model: Loaded")
+            self.status_label.setText("Status: Ready for a new job")
+            self.update_status_display()
             self.start_button.setEnabled(True)
             self.listen_button.setText("Listen")
             QMessageBox.information(self, "Information", "The stream has stopped, wait for the next message.")
     def process_audio_for_listen(self):
         try:
-            while self.running:
-                if self.process_ffmpeg.poll() is not None:
-                    logging.error("FFmpeg process ended with an error.")
-                    self.running = False
-                    break
-                audio_bytes = self.process_ffmpeg.stdout.read(self.audio_bytes_read)
-                if not audio_bytes or (time.time() - self.start_time >= self.max_duration):
-                    self.running = False
-                    break
-                audio = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-                segments, info = self.model.transcribe(audio, language="en", vad_filter=True)
-                full_text = ""
-                for segment in segments:
-                    full_text += segment.text
-                if full_text.strip():
-                    sentences = re.split(r'[.!?]\s*', full_text)
-                    for sentence in sentences:
-                        sentence = sentence.strip()
-                        if sentence:
-                            self.update_signal.emit(f"{sentence}.\n", True, Qt.GlobalColor.red)
-                self.stream.write(audio_bytes)
-                self.reset_signal.emit()
+            self.run_pipeline()
         except Exception as e:
             logging.error(f"Audio processing error: {str(e)}")
             self.update_signal.emit(f"Audio processing error: {str(e)}", True, Qt.GlobalColor.red)
-        finally:
-            if hasattr(self, 'process_ffmpeg') and self.process_ffmpeg:
-                self.process_ffmpeg.terminate()
-                self.process_ffmpeg.wait()
     def stop_listening(self):
         self.running = False
         self.timer.stop()
-        self.status_label.setText("Status: Ready for a new job | Model: Loaded")
+        self.status_label.setText("Status: Ready for a new job")
+        self.update_status_display()
         self.start_button.setEnabled(True)
         self.listen_button.setText("Listen")
         self.log_usage_event("Listening")
         self.operation_start_time = None
         QMessageBox.information(self, "Information", "Listening is over")
-        if self.wav_filename:
-            self.convert_wav_to_mp3(self.wav_filename)
     def update_audio_bytes_read(self, value):
         self.audio_bytes_read = value
+    def update_audio_format(self, audio_format):
+        self.audio_format = audio_format
+    def update_use_processes(self, checked):
+        self.use_processes = checked
+        self.model = None
+        self.preload_model()
+    def update_monitoring(self, checked):
+        if self.running:
+            self.monitor.set_enabled(checked)
+    def update_profiling(self, checked):
+        self.profile_dir = self.output_dir if checked else None
+    def update_rolling(self, checked):
+        self.rolling = checked
+        self.duration_spinbox.setEnabled(not checked)
+    def update_chunking(self, name):
+        self.chunking = self.chunking_modes.get(name, "fixed")
     def stop_recording(self):
         self.running = False
         self.timer.stop()
@@ -511,19 +652,22 @@ class AudioRecorderApp(QMainWindow):
         self.log_usage_event("Recording (int)")
         self.operation_start_time = None
         QMessageBox.information(self, "Information", "Recording stopped, wait for next message..")
-    def convert_wav_to_mp3(self, wav_file_path):
-        try:
-            audio = AudioSegment.from_wav(wav_file_path)
-            mp3_file_path = os.path.splitext(wav_file_path)[0] + ".mp3"
-            audio.export(mp3_file_path, format="mp3", bitrate="192k")
-            logging.info(f"File saved successfully: {mp3_file_path}")
-            with suppress_stdout():
-                os.remove(wav_file_path)
-            logging.info(f"WAV file deleted: {wav_file_path}")
-        except Exception as e:
-            logging.error(f"Failed to convert {wav_file_path}: {str(e)}")
+    def closeEvent(self, event):
+        self.running = False
+        if self.worker_thread is not None and self.worker_thread.isRunning():
+            self.worker_thread.finished.disconnect()
+            self.worker_thread.wait()
+        self.monitor.close()
+        self.prober.close()
+        if self.alerts is not None:
+            self.alerts.stop()
+            self.alerts = None
+        super().closeEvent(event)
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = AudioRecorderApp()
+    app.aboutToQuit.connect(window.transcript_view.reset)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,166 @@
+import logging
+import time
+import numpy as np
+from pipeline import FloatBuffer, PhaseTimings, SAMPLE_RATE, BYTES_PER_SECOND
+STEP_BYTES = BYTES_PER_SECOND
+SENTENCE_END = (".", "!", "?")
+class Word:
+    __slots__ = ("start", "end", "text", "probability")
+    def __init__(self, start, end, text, probability=1.0):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.probability = probability
+def normalize_word(text):
+    return text.strip().lower().strip(".,!?;:\"'")
+class HypothesisBuffer:
+    def __init__(self, max_ngram=5):
+        self.max_ngram = max_ngram
+        self.committed = []
+        self.buffer = []
+        self.new = []
+        self.last_committed_time = 0.0
+    def insert(self, words):
+        self.new = [word for word in words if word.start > self.last_committed_time - 0.1]
+        if not self.new or not self.committed:
+            return
+        if abs(self.new[0].start - self.last_committed_time) >= 1.0:
+            return
+        for size in range(min(len(self.committed), len(self.new), self.max_ngram), 0, -1):
+            tail = [normalize_word(word.text) for word in self.committed[-size:]]
+            head = [normalize_word(word.text) for word in self.new[:size]]
+            if tail == head:
+                del self.new[:size]
+                break
+    def flush(self):
+        commit = []
+        while self.new and self.buffer:
+            if normalize_word(self.new[0].text) != normalize_word(self.buffer[0].text):
+                break
+            word = self.new.pop(0)
+            self.buffer.pop(0)
+            commit.append(word)
+            self.last_committed_time = word.end
+        self.buffer = self.new
+        self.new = []
+        self.committed.extend(commit)
+        return commit
+    def pop_committed(self, time):
+        while self.committed and self.committed[0].end <= time:
+            self.committed.pop(0)
+    def unconfirmed(self):
+        return self.buffer
+class OnlineTranscriber:
+    def __init__(self, transcribe_func, trim_seconds=15.0, max_seconds=30.0, prompt_chars=200, options=None):
+        self.transcribe_func = transcribe_func
+        self.trim_seconds = trim_seconds
+        self.max_seconds = max_seconds
+        self.prompt_chars = prompt_chars
+        self.options = options if options is not None else {}
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = None
+        self.hypothesis = HypothesisBuffer()
+        self.committed = []
+        self.iterations = 0
+        self.transcribed_seconds = 0.0
+    def insert_audio(self, audio, offset):
+        if self.buffer_offset is None:
+            self.buffer_offset = offset
+        self.audio = np.concatenate((self.audio, audio))
+    def prompt(self):
+        words = [word.text for word in self.committed if word.end <= self.buffer_offset]
+        text = ""
+        while words and len(text) < self.prompt_chars:
+            text = words.pop() + text
+        return text.strip()
+    def process(self):
+        if not len(self.audio):
+            return [], []
+        options = dict(self.options)
+        options.update(word_timestamps=True, without_timestamps=False, condition_on_previous_text=False, vad_filter=False)
+        prompt = self.prompt()
+        if prompt:
+            options["initial_prompt"] = prompt
+        segments = list(self.transcribe_func(self.audio, **options))
+        self.iterations += 1
+        self.transcribed_seconds += len(self.audio) / SAMPLE_RATE
+        words = []
+        ends = []
+        for segment in segments:
+            for word in segment.words or ():
+                words.append(Word(word.start + self.buffer_offset, word.end + self.buffer_offset, word.word, word.probability))
+            ends.append(segment.end + self.buffer_offset)
+        self.hypothesis.insert(words)
+        commit = self.hypothesis.flush()
+        self.committed.extend(commit)
+        self.trim(ends)
+        return commit, self.hypothesis.unconfirmed()
+    def trim(self, segment_ends):
+        buffer_seconds = len(self.audio) / SAMPLE_RATE
+        if buffer_seconds <= self.trim_seconds:
+            return
+        cut_time = None
+        last_committed = self.committed[-1].end if self.committed else self.buffer_offset
+        for end in segment_ends[:-1]:
+            if end <= last_committed:
+                cut_time = end
+        if cut_time is None and buffer_seconds > self.max_seconds:
+            cut_time = max(last_committed, self.buffer_offset + buffer_seconds - self.trim_seconds)
+        if cut_time is not None:
+            self.cut(cut_time)
+    def cut(self, time):
+        samples = int((time - self.buffer_offset) * SAMPLE_RATE)
+        if samples <= 0:
+            return
+        self.hypothesis.pop_committed(time)
+        self.audio = self.audio[samples:]
+        self.buffer_offset = time
+        if len(self.committed) > 1000:
+            del self.committed[:-200]
+    def finish(self):
+        remaining = self.hypothesis.unconfirmed()
+        self.committed.extend(remaining)
+        self.hypothesis.buffer = []
+        if remaining:
+            self.buffer_offset = remaining[-1].end
+        self.audio = np.zeros(0, dtype=np.float32)
+        return remaining
+def words_text(words, line_start=False):
+    parts = []
+    for word in words:
+        text = word.text.lstrip() if line_start else word.text
+        parts.append(text)
+        line_start = text.rstrip().endswith(SENTENCE_END)
+        if line_start:
+            parts.append("\n")
+    return "".join(parts), line_start
+class StreamingSink:
+    def __init__(self, transcribe_func, on_words, trim_seconds=15.0, options=None):
+        self.online = OnlineTranscriber(transcribe_func, trim_seconds, options=options)
+        self.on_words = on_words
+        self.backlog = None
+        self.buffer = FloatBuffer()
+        self.timings = PhaseTimings()
+    def __call__(self, chunk):
+        started = time.perf_counter()
+        self.online.insert_audio(self.buffer.convert(chunk.data), chunk.offset)
+        self.timings.add("convert", time.perf_counter() - started)
+        self.timings.add_audio(chunk.duration)
+        if self.backlog is not None and self.backlog() > 0 and len(self.online.audio) < self.online.trim_seconds * SAMPLE_RATE:
+            return
+        self.timings.window_seconds = len(self.online.audio) / SAMPLE_RATE
+        started = time.perf_counter()
+        commit, unconfirmed = self.online.process()
+        transcribed = time.perf_counter()
+        self.timings.add("transcribe", transcribed - started)
+        if commit or unconfirmed:
+            self.on_words(chunk, commit, unconfirmed)
+            self.timings.add("emit", time.perf_counter() - transcribed)
+    def finish(self):
+        try:
+            remaining = self.online.finish()
+        except Exception as e:
+            logging.error(f"Streaming finish error: {str(e)}")
+            return
+        if remaining:
+            self.on_words(None, remaining, [])
@@ -0,0 +1,146 @@
+import threading
+import os
+from array import array
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QTextCharFormat, QFont, QTextCursor, QBrush
+MAX_VIEW_LINES = 2000
+PAGE_LINES = 500
+class TranscriptLog:
+    def __init__(self, path, temporary=False):
+        self.path = path
+        self.temporary = temporary
+        self.file = open(path, "ab")
+        self.reader = open(path, "rb")
+        self.size = self.file.tell()
+        self.offsets = array("q", [self.size])
+        self.lock = threading.Lock()
+    def append(self, text):
+        data = text.encode("utf-8")
+        with self.lock:
+            self.file.write(data)
+            self.file.flush()
+            position = data.find(b"\n")
+            while position != -1:
+                self.offsets.append(self.size + position + 1)
+                position = data.find(b"\n", position + 1)
+            self.size += len(data)
+    def line_count(self):
+        with self.lock:
+            return len(self.offsets) - 1 + (self.size > self.offsets[-1])
+    def read_lines(self, start, count):
+        with self.lock:
+            start = max(0, min(start, len(self.offsets) - 1))
+            end = start + count
+            begin = self.offsets[start]
+            finish = self.offsets[end] if end < len(self.offsets) else self.size
+            self.reader.seek(begin)
+            return self.reader.read(finish - begin).decode("utf-8", errors="replace")
+    def close(self):
+        with self.lock:
+            self.file.close()
+            self.reader.close()
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+def char_format(color, bold=True):
+    fmt = QTextCharFormat()
+    if bold:
+        fmt.setFontWeight(QFont.Weight.Bold)
+    fmt.setForeground(QBrush(color))
+    return fmt
+class TranscriptView:
+    def __init__(self, text_box, max_lines=MAX_VIEW_LINES, page_lines=PAGE_LINES):
+        self.text_box = text_box
+        self.document = text_box.document()
+        self.scrollbar = text_box.verticalScrollBar()
+        self.max_lines = max_lines
+        self.page_lines = page_lines
+        self.committed_format = char_format(Qt.GlobalColor.blue)
+        self.log = None
+        self.chunk_start = None
+        self.window_start = None
+        self.unseen = False
+        self.loading = False
+        self.scrollbar.valueChanged.connect(self.on_scroll)
+    def reset(self, log=None):
+        if self.log is not None and self.log is not log:
+            self.log.close()
+        self.log = log
+        self.chunk_start = None
+        self.window_start = None
+        self.unseen = False
+        self.text_box.clear()
+    def is_live(self):
+        return self.window_start is None
+    def append(self, text, color=Qt.GlobalColor.red, bold=True):
+        if not self.is_live():
+            self.unseen = True
+            return
+        follow = self.scrollbar.value() >= self.scrollbar.maximum()
+        cursor = QTextCursor(self.document)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        if self.chunk_start is None:
+            self.chunk_start = cursor.position()
+        cursor.insertText(text, char_format(color, bold))
+        if self.document.blockCount() > self.max_lines + self.page_lines:
+            self.trim(self.document.blockCount() - self.max_lines - 1)
+        if follow:
+            self.scroll_to(self.scrollbar.maximum())
+    def trim(self, lines):
+        cursor = QTextCursor(self.document)
+        cursor.movePosition(QTextCursor.MoveOperation.NextBlock, QTextCursor.MoveMode.KeepAnchor, lines)
+        removed = cursor.selectionEnd() - cursor.selectionStart()
+        cursor.removeSelectedText()
+        if self.chunk_start is not None:
+            self.chunk_start = max(0, self.chunk_start - removed)
+    def commit(self):
+        if self.chunk_start is None:
+            return
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(self.chunk_start)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.mergeCharFormat(self.committed_format)
+        self.chunk_start = None
+    def first_line(self):
+        if not self.is_live():
+            return self.window_start
+        return max(0, self.log.line_count() - self.document.blockCount() + 1)
+    def on_scroll(self, value):
+        if self.loading or self.log is None:
+            return
+        if value <= self.scrollbar.minimum() and self.first_line() > 0:
+            start = max(0, self.first_line() - self.page_lines)
+            self.show_window(start, self.first_line() - start)
+        elif not self.is_live() and value >= self.scrollbar.maximum():
+            start = self.window_start + self.page_lines
+            if start + self.max_lines >= self.log.line_count():
+                self.go_live()
+            else:
+                self.show_window(start, self.max_lines - self.page_lines, at_bottom=True)
+    def show_window(self, start, anchor_line, at_bottom=False):
+        self.commit()
+        self.loading = True
+        try:
+            self.window_start = start
+            self.text_box.clear()
+            cursor = QTextCursor(self.document)
+            cursor.insertText(self.log.read_lines(start, self.max_lines), self.committed_format)
+            block = self.document.findBlockByNumber(anchor_line)
+            layout = self.document.documentLayout()
+            top = int(layout.blockBoundingRect(block).top()) if block.isValid() else 0
+            self.scroll_to(top - self.scrollbar.pageStep() if at_bottom else top)
+        finally:
+            self.loading = False
+    def go_live(self):
+        self.loading = True
+        try:
+            self.window_start = None
+            self.unseen = False
+            self.text_box.clear()
+            cursor = QTextCursor(self.document)
+            count = self.log.line_count()
+            cursor.insertText(self.log.read_lines(max(0, count - self.max_lines), self.max_lines), self.committed_format)
+            self.scroll_to(self.scrollbar.maximum())
+        finally:
+            self.loading = False
+    def scroll_to(self, value):
+        self.scrollbar.setValue(max(self.scrollbar.minimum(), min(value, self.scrollbar.maximum())))
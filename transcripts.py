@@ -0,0 +1,251 @@
+import threading
+import sqlite3
+import logging
+import math
+import json
+import glob
+import os
+from datetime import datetime
+SIDECAR_FORMATS = ("jsonl", "srt", "vtt")
+INDEX_NAME = "transcripts.db"
+SENTENCE_END = (".", "!", "?")
+class TranscriptRecord:
+    __slots__ = ("stream", "offset", "end_offset", "wall_start", "text", "confidence")
+    def __init__(self, stream, offset, end_offset, wall_start, text, confidence=None):
+        self.stream = stream
+        self.offset = offset
+        self.end_offset = end_offset
+        self.wall_start = wall_start
+        self.text = text
+        self.confidence = confidence
+    @property
+    def wall_end(self):
+        return self.wall_start + self.end_offset - self.offset
+    def to_dict(self, origin=0.0, audio=None):
+        return {
+            "stream": self.stream,
+            "time": datetime.fromtimestamp(self.wall_start).isoformat(timespec="milliseconds"),
+            "start": round(self.wall_start, 3),
+            "end": round(self.wall_end, 3),
+            "offset": round(self.offset - origin, 3),
+            "end_offset": round(self.end_offset - origin, 3),
+            "confidence": None if self.confidence is None else round(self.confidence, 4),
+            "audio": os.path.basename(audio) if audio else None,
+            "text": self.text
+        }
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["stream"], data["offset"], data["end_offset"], data["start"], data["text"], data.get("confidence"))
+def segment_confidence(segment):
+    words = getattr(segment, "words", None)
+    if words:
+        return sum(word.probability for word in words) / len(words)
+    avg_logprob = getattr(segment, "avg_logprob", None)
+    return math.exp(avg_logprob) if avg_logprob is not None else None
+def segment_records(stream, segments, chunk_offset, started_at):
+    records = []
+    for segment in segments:
+        text = segment.text.strip()
+        if not text:
+            continue
+        offset = chunk_offset + segment.start
+        records.append(TranscriptRecord(stream, offset, chunk_offset + segment.end, started_at + offset, text, segment_confidence(segment)))
+    return records
+class WordGrouper:
+    def __init__(self, stream, started_at):
+        self.stream = stream
+        self.started_at = started_at
+        self.words = []
+    def feed(self, words):
+        records = []
+        for word in words:
+            self.words.append(word)
+            if word.text.rstrip().endswith(SENTENCE_END):
+                records.append(self.record())
+        return records
+    def flush(self):
+        return [self.record()] if self.words else []
+    def record(self):
+        words = self.words
+        self.words = []
+        text = "".join(word.text for word in words).strip()
+        confidence = sum(word.probability for word in words) / len(words)
+        return TranscriptRecord(self.stream, words[0].start, words[-1].end, self.started_at + words[0].start, text, confidence)
+def cue_time(seconds, separator="."):
+    milliseconds = int(round(max(0.0, seconds) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+def sidecar_file(audio_path, ext):
+    return f"{os.path.splitext(audio_path)[0]}.{ext}"
+def sidecar_files(audio_path, formats=SIDECAR_FORMATS):
+    return [sidecar_file(audio_path, ext) for ext in formats]
+class SidecarWriter:
+    def __init__(self, audio_path, formats=SIDECAR_FORMATS, origin=0.0, mode="w", first_cue=1):
+        self.audio_path = audio_path
+        self.origin = origin
+        self.cues = first_cue - 1
+        self.files = {}
+        self.lock = threading.Lock()
+        for ext in formats:
+            path = sidecar_file(audio_path, ext)
+            new_file = mode == "w" or not os.path.exists(path)
+            self.files[ext] = open(path, mode, encoding="utf-8")
+            if ext == "vtt" and new_file:
+                self.files[ext].write("WEBVTT\n\n")
+    def write(self, records):
+        if not records:
+            return
+        with self.lock:
+            for record in records:
+                self.cues += 1
+                start = cue_time(record.offset - self.origin)
+                end = cue_time(max(record.end_offset, record.offset) - self.origin)
+                for ext, output_file in self.files.items():
+                    if ext == "jsonl":
+                        output_file.write(json.dumps(record.to_dict(self.origin, self.audio_path), ensure_ascii=False) + "\n")
+                    elif ext == "srt":
+                        output_file.write(f"{self.cues}\n{start.replace('.', ',')} --> {end.replace('.', ',')}\n{record.text}\n\n")
+                    else:
+                        output_file.write(f"{start} --> {end}\n<v {record.stream}>{record.text}\n\n")
+            for output_file in self.files.values():
+                output_file.flush()
+    def close(self, sync=False):
+        with self.lock:
+            for output_file in self.files.values():
+                if sync:
+                    os.fsync(output_file.fileno())
+                output_file.close()
+            self.files = {}
+def write_sidecars(audio_path, records, formats=SIDECAR_FORMATS, origin=0.0, mode="w", first_cue=1):
+    writer = SidecarWriter(audio_path, formats, origin, mode, first_cue)
+    try:
+        writer.write(records)
+    finally:
+        writer.close(sync=True)
+class TranscriptOutput:
+    def __init__(self, formats=SIDECAR_FORMATS, index=None, stream=""):
+        self.formats = formats
+        self.index = index
+        self.stream = stream
+        self.parts = []
+        self.lock = threading.Lock()
+    def open(self, path, origin=0.0, audio=True):
+        writer = SidecarWriter(path, self.formats, origin) if self.formats else None
+        with self.lock:
+            self.parts.append((origin, path if audio else None, writer))
+    def write(self, records):
+        if not records:
+            return
+        groups = {}
+        with self.lock:
+            if not self.parts:
+                return
+            for record in records:
+                part = 0
+                while part + 1 < len(self.parts) and self.parts[part + 1][0] <= record.offset + 0.001:
+                    part += 1
+                groups.setdefault(part, []).append(record)
+            parts = [(self.parts[part], items) for part, items in groups.items()]
+        for (origin, audio, writer), items in parts:
+            if writer is not None:
+                writer.write(items)
+            if self.index is not None:
+                try:
+                    self.index.add(items, audio, origin)
+                except Exception as e:
+                    logging.error(f"[{self.stream}] Failed to index transcript: {str(e)}")
+    def locate(self, offset):
+        with self.lock:
+            for origin, audio, writer in reversed(self.parts):
+                if origin <= offset + 0.001:
+                    return audio, offset - origin if audio else None
+        return None, None
+    def close(self):
+        with self.lock:
+            parts = self.parts
+            self.parts = []
+        for origin, audio, writer in parts:
+            if writer is not None:
+                writer.close(sync=True)
+class TranscriptIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5("
+            "text, stream UNINDEXED, start_time UNINDEXED, end_time UNINDEXED, audio UNINDEXED, audio_offset UNINDEXED, confidence UNINDEXED, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        self.connection.commit()
+    def add(self, records, audio=None, origin=0.0):
+        if not records:
+            return
+        rows = [(record.text, record.stream, record.wall_start, record.wall_end, audio, record.offset - origin, record.confidence) for record in records]
+        with self.lock:
+            self.connection.executemany("INSERT INTO segments (text, stream, start_time, end_time, audio, audio_offset, confidence) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.commit()
+    def remove_audio(self, audio):
+        with self.lock:
+            self.connection.execute("DELETE FROM segments WHERE audio = ?", (audio,))
+            self.connection.commit()
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM segments")
+            self.connection.commit()
+    def search(self, query, stream=None, since=None, until=None, limit=50):
+        sql = "SELECT stream, start_time, end_time, audio, audio_offset, confidence, text, snippet(segments, 0, '[', ']', '...', 16) FROM segments WHERE segments MATCH ?"
+        params = [query]
+        if stream:
+            sql += " AND stream = ?"
+            params.append(stream)
+        if since is not None:
+            sql += " AND start_time >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND start_time < ?"
+            params.append(until)
+        sql += " ORDER BY start_time DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        columns = ("stream", "start", "end", "audio", "offset", "confidence", "text", "snippet")
+        return [dict(zip(columns, row)) for row in rows]
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT count(*) FROM segments").fetchone()[0]
+    def close(self):
+        with self.lock:
+            self.connection.close()
+def open_index(output_dir):
+    try:
+        return TranscriptIndex(os.path.join(output_dir, INDEX_NAME))
+    except sqlite3.Error as e:
+        logging.error(f"Transcript index is unavailable: {str(e)}")
+        return None
+def find_audio(jsonl_path):
+    base = os.path.splitext(jsonl_path)[0]
+    for path in glob.glob(f"{glob.escape(base)}.*"):
+        if os.path.splitext(path)[1][1:] not in SIDECAR_FORMATS + ("txt",):
+            return path
+    return None
+def rebuild_index(index, output_dir):
+    output_dir = os.path.abspath(output_dir)
+    index.clear()
+    files = glob.glob(os.path.join(glob.escape(output_dir), "*.jsonl")) + glob.glob(os.path.join(glob.escape(output_dir), "*_segments", "*.jsonl"))
+    total = 0
+    for path in sorted(files):
+        records = []
+        with open(path, encoding="utf-8") as jsonl_file:
+            for line in jsonl_file:
+                try:
+                    records.append(TranscriptRecord.from_dict(json.loads(line)))
+                except (ValueError, KeyError) as e:
+                    logging.warning(f"Skipping a damaged line in {path}: {str(e)}")
+        index.add(records, find_audio(path))
+        total += len(records)
+    return len(files), total
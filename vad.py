@@ -0,0 +1,204 @@
+import collections
+import numpy as np
+from pipeline import Chunk, SAMPLE_RATE, SAMPLE_WIDTH, BYTES_PER_SECOND
+READ_BYTES = BYTES_PER_SECOND // 2
+class EnergyVAD:
+    def __init__(self, frame_ms=30, threshold_db=9.0, min_db=-55.0, floor_rise=0.002):
+        self.frame_samples = SAMPLE_RATE * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * SAMPLE_WIDTH
+        self.threshold_db = threshold_db
+        self.min_db = min_db
+        self.floor_rise = floor_rise
+        self.noise_floor = None
+    def frame_levels(self, audio_bytes):
+        count = len(audio_bytes) // self.frame_bytes
+        if not count:
+            return np.zeros(0, dtype=np.float32)
+        samples = np.frombuffer(audio_bytes, dtype=np.int16, count=count * self.frame_samples).reshape(count, self.frame_samples)
+        power = np.mean(np.square(samples, dtype=np.float32), axis=1) / (32768.0 * 32768.0)
+        return 10.0 * np.log10(power + 1e-10)
+    def classify(self, levels):
+        speech = np.zeros(len(levels), dtype=bool)
+        floor = self.noise_floor
+        for index, level in enumerate(levels):
+            level = float(level)
+            if floor is None:
+                floor = level
+            elif level < floor:
+                floor = (floor + level) / 2.0
+            else:
+                floor += (level - floor) * self.floor_rise
+            speech[index] = level > self.min_db and level > floor + self.threshold_db
+        self.noise_floor = floor
+        return speech
+class VADSegmenter:
+    def __init__(self, min_seconds=3.0, max_seconds=15.0, min_silence=0.5, max_silence=2.0, padding=0.2, min_speech=0.25, vad=None):
+        self.vad = vad or EnergyVAD()
+        frame_seconds = self.vad.frame_samples / SAMPLE_RATE
+        self.frame_bytes = self.vad.frame_bytes
+        self.min_frames = int(min_seconds / frame_seconds)
+        self.max_frames = max(self.min_frames + 1, int(max_seconds / frame_seconds))
+        self.min_silence_frames = max(1, int(min_silence / frame_seconds))
+        self.max_silence_frames = max(self.min_silence_frames, int(max_silence / frame_seconds))
+        self.padding_frames = int(padding / frame_seconds)
+        self.search_frames = int(2.0 / frame_seconds)
+        self.min_speech_frames = int(min_speech / frame_seconds)
+        self.speech_frames = 0
+        self.pending = b""
+        self.preroll = collections.deque(maxlen=max(1, self.padding_frames))
+        self.frames = []
+        self.levels = []
+        self.start_offset = 0.0
+        self.silence_run = 0
+        self.position = None
+        self.index = 0
+        self.input_seconds = 0.0
+        self.emitted_seconds = 0.0
+        self.chunks = 0
+    def feed(self, chunk):
+        if self.position is None:
+            self.position = chunk.offset
+        data = self.pending + chunk.data
+        usable = len(data) - len(data) % self.frame_bytes
+        self.pending = data[usable:]
+        if not usable:
+            return []
+        levels = self.vad.frame_levels(data[:usable])
+        speech = self.vad.classify(levels)
+        output = []
+        for index in range(len(levels)):
+            frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            self.push(frame, float(levels[index]), bool(speech[index]), output)
+        return output
+    def push(self, frame, level, is_speech, output):
+        frame_offset = self.position
+        self.position += len(frame) / BYTES_PER_SECOND
+        self.input_seconds += len(frame) / BYTES_PER_SECOND
+        if not self.frames:
+            if not is_speech:
+                self.preroll.append((frame, level, frame_offset))
+                return
+            self.start_offset = self.preroll[0][2] if self.preroll else frame_offset
+            for item in self.preroll:
+                self.frames.append(item[0])
+                self.levels.append(item[1])
+            self.preroll.clear()
+            self.silence_run = 0
+        self.frames.append(frame)
+        self.levels.append(level)
+        self.silence_run = 0 if is_speech else self.silence_run + 1
+        self.speech_frames += is_speech
+        length = len(self.frames)
+        if self.silence_run >= self.min_silence_frames and length - self.silence_run + self.padding_frames >= self.min_frames:
+            self.close(length - self.silence_run + self.padding_frames, output)
+        elif self.silence_run >= self.max_silence_frames:
+            self.close(length - self.silence_run + self.padding_frames, output)
+        elif length >= self.max_frames:
+            window = self.levels[-self.search_frames:]
+            cut = length - len(window) + int(np.argmin(window)) + 1
+            self.close(max(cut, self.min_frames), output, keep_rest=True)
+    def close(self, end, output, keep_rest=False):
+        end = min(end, len(self.frames))
+        data = b"".join(self.frames[:end])
+        if data and self.speech_frames >= self.min_speech_frames:
+            output.append(self.make_chunk(data))
+        rest_frames = self.frames[end:]
+        rest_levels = self.levels[end:]
+        rest_offset = self.start_offset + len(data) / BYTES_PER_SECOND
+        self.frames = []
+        self.levels = []
+        self.silence_run = 0
+        self.speech_frames = 0
+        if keep_rest and rest_frames:
+            self.frames = rest_frames
+            self.levels = rest_levels
+            self.start_offset = rest_offset
+    def make_chunk(self, data):
+        chunk = Chunk(data, self.index, self.start_offset)
+        self.index += 1
+        self.chunks += 1
+        self.emitted_seconds += len(data) / BYTES_PER_SECOND
+        return chunk
+    def flush(self):
+        output = []
+        if self.frames:
+            self.close(len(self.frames) - self.silence_run + self.padding_frames, output)
+        self.pending = b""
+        self.preroll.clear()
+        return output
+    def stats(self):
+        return {
+            "input_seconds": self.input_seconds,
+            "speech_seconds": self.emitted_seconds,
+            "dropped_seconds": max(0.0, self.input_seconds - self.emitted_seconds),
+            "chunks": self.chunks,
+            "noise_floor_db": self.vad.noise_floor
+        }
+class SpeechMusicClassifier:
+    def __init__(self, window_seconds=1.0, frame_ms=25, lster_threshold=0.15, hzcrr_threshold=0.1, flux_threshold=0.9, silence_db=-50.0):
+        self.frame_samples = SAMPLE_RATE * frame_ms // 1000
+        self.window_frames = max(2, int(window_seconds * 1000 / frame_ms))
+        self.lster_threshold = lster_threshold
+        self.hzcrr_threshold = hzcrr_threshold
+        self.flux_threshold = flux_threshold
+        self.silence_db = silence_db
+        self.window = np.hanning(self.frame_samples).astype(np.float32)
+    def features(self, audio_bytes):
+        window_samples = self.frame_samples * self.window_frames
+        count = len(audio_bytes) // SAMPLE_WIDTH // window_samples
+        if not count:
+            return None
+        samples = np.frombuffer(audio_bytes, dtype=np.int16, count=count * window_samples).astype(np.float32) / 32768.0
+        frames = samples.reshape(count * self.window_frames, self.frame_samples)
+        energy = np.mean(np.square(frames), axis=1).reshape(count, self.window_frames)
+        mean_energy = np.mean(energy, axis=1, keepdims=True)
+        lster = np.mean(energy < 0.5 * mean_energy, axis=1)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1).reshape(count, self.window_frames)
+        hzcrr = np.mean(zcr > 1.5 * np.mean(zcr, axis=1, keepdims=True), axis=1)
+        spectra = np.abs(np.fft.rfft(frames * self.window, axis=1))
+        spectra /= np.sum(spectra, axis=1, keepdims=True) + 1e-10
+        flux = np.zeros(len(spectra), dtype=np.float32)
+        flux[1:] = np.sum(np.square(np.diff(spectra, axis=0)), axis=1)
+        flux = flux.reshape(count, self.window_frames)[:, 1:]
+        flux_variation = np.std(flux, axis=1) / (np.mean(flux, axis=1) + 1e-10)
+        level_db = 10.0 * np.log10(mean_energy[:, 0] + 1e-10)
+        return lster, hzcrr, flux_variation, level_db
+    def classify(self, audio_bytes):
+        features = self.features(audio_bytes)
+        if features is None:
+            return np.ones(1, dtype=bool)
+        lster, hzcrr, flux_variation, level_db = features
+        votes = (lster >= self.lster_threshold).astype(np.int8) + (hzcrr >= self.hzcrr_threshold) + (flux_variation >= self.flux_threshold)
+        return (votes >= 2) & (level_db > self.silence_db)
+class SpeechGate:
+    def __init__(self, chunker=None, min_speech_ratio=0.2, classifier=None):
+        self.chunker = chunker
+        self.min_speech_ratio = min_speech_ratio
+        self.classifier = classifier or SpeechMusicClassifier()
+        self.input_seconds = 0.0
+        self.skipped_seconds = 0.0
+        self.skipped_chunks = 0
+        self.last_ratio = None
+    def feed(self, chunk):
+        self.input_seconds += chunk.duration
+        return self.gate(self.chunker.feed(chunk) if self.chunker is not None else [chunk])
+    def flush(self):
+        return self.gate(self.chunker.flush()) if self.chunker is not None else []
+    def gate(self, chunks):
+        output = []
+        for chunk in chunks:
+            speech = self.classifier.classify(chunk.data)
+            self.last_ratio = float(np.mean(speech))
+            if self.last_ratio < self.min_speech_ratio:
+                self.skipped_seconds += chunk.duration
+                self.skipped_chunks += 1
+                continue
+            output.append(chunk)
+        return output
+    def stats(self):
+        result = dict(self.chunker.stats()) if self.chunker is not None else {"input_seconds": self.input_seconds}
+        filters = {"vad": result["dropped_seconds"]} if "dropped_seconds" in result else {}
+        filters["music"] = self.skipped_seconds
+        result.update({"filters": filters, "music_chunks": self.skipped_chunks, "speech_ratio": self.last_ratio})
+        return result
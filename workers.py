@@ -0,0 +1,195 @@
+import multiprocessing
+import threading
+import collections
+import logging
+import time
+import sys
+import numpy as np
+from multiprocessing import shared_memory
+from models import ModelPool, ModelHandle, load_model, warm_up_model
+MAX_AUDIO_SECONDS = 60
+MAX_RESTARTS = 3
+SegmentResult = collections.namedtuple("SegmentResult", ("start", "end", "text", "words", "no_speech_prob", "avg_logprob"))
+WordResult = collections.namedtuple("WordResult", ("start", "end", "word", "probability"))
+class WorkerCrashed(RuntimeError):
+    pass
+def attach_memory(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+def segment_result(segment):
+    words = [WordResult(word.start, word.end, word.word, word.probability) for word in segment.words] if segment.words else None
+    return SegmentResult(segment.start, segment.end, segment.text, words, segment.no_speech_prob, segment.avg_logprob)
+def worker_main(conn, memory_name, max_samples, model_args, transcribe_options, warm_up):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(processName)s - %(message)s")
+    memory = attach_memory(memory_name)
+    audio_buffer = np.ndarray((max_samples,), dtype=np.float32, buffer=memory.buf)
+    try:
+        started = time.time()
+        model = load_model(*model_args)
+        load_seconds = time.time() - started
+        if warm_up:
+            warm_up_model(model)
+        conn.send(("ready", (load_seconds, time.time() - started - load_seconds)))
+    except Exception as e:
+        conn.send(("error", f"Failed to load Whisper model: {str(e)}"))
+        del audio_buffer
+        memory.close()
+        return
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "stop":
+            break
+        samples, kwargs = message[1], message[2]
+        audio = audio_buffer[:samples] if samples >= 0 else message[3]
+        try:
+            options = dict(transcribe_options)
+            options.update(kwargs)
+            segments, info = model.transcribe(audio, **options)
+            conn.send(("ok", [segment_result(segment) for segment in segments]))
+        except Exception as e:
+            conn.send(("error", str(e)))
+        del audio
+    del audio_buffer
+    memory.close()
+class WorkerProcess:
+    def __init__(self, index, model_args, transcribe_options, max_samples, warm_up=True):
+        context = multiprocessing.get_context("spawn")
+        self.index = index
+        self.max_samples = max_samples
+        self.memory = shared_memory.SharedMemory(create=True, size=max_samples * 4)
+        self.buffer = np.ndarray((max_samples,), dtype=np.float32, buffer=self.memory.buf)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main,
+            args=(child_conn, self.memory.name, max_samples, model_args, transcribe_options, warm_up),
+            name=f"whisper-worker-{index}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+    def receive(self, should_stop=None):
+        while not self.conn.poll(0.5):
+            if not self.process.is_alive():
+                raise WorkerCrashed(f"Worker {self.index} exited with code {self.process.exitcode}")
+            if should_stop is not None and should_stop():
+                raise WorkerCrashed(f"Worker {self.index} stopped while starting")
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(1)
+            raise WorkerCrashed(f"Worker {self.index} closed its pipe (exit code {self.process.exitcode})")
+    def transcribe(self, audio, kwargs):
+        samples = len(audio)
+        if samples <= self.max_samples:
+            self.buffer[:samples] = audio
+            self.conn.send(("transcribe", samples, kwargs))
+        else:
+            self.conn.send(("transcribe", -1, kwargs, np.asarray(audio, dtype=np.float32)))
+        status, payload = self.receive()
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+    def close(self, timeout=5):
+        if self.process.is_alive():
+            try:
+                self.conn.send(("stop",))
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        self.conn.close()
+        del self.buffer
+        self.memory.close()
+        self.memory.unlink()
+class ProcessModelPool(ModelPool):
+    def __init__(self, size="base", device="cpu", compute_type="int8", num_workers=1, cpu_threads=0, sample_rate=16000, transcribe_options=None, batch_size=1, batch_wait=0.05, max_seconds=MAX_AUDIO_SECONDS):
+        super().__init__(size, device, compute_type, num_workers, cpu_threads, sample_rate, transcribe_options, 1, batch_wait)
+        if batch_size > 1:
+            logging.info("Batched decoding is not used with worker processes.")
+        self.max_samples = int(max_seconds * sample_rate)
+        self.warm_up = True
+        self.restarts = 0
+        self.ready_workers = 0
+    def start(self, warm_up=True):
+        if self.handle is None:
+            self.handle = ModelHandle((self.size, self.device, self.compute_type, self.cpu_threads, 1))
+            self.handle.warmed = warm_up
+        self.warm_up = warm_up
+        self.running = True
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self.run, args=(index,), name=f"model-process-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+    def spawn(self, index):
+        failures = 0
+        while self.running:
+            worker = WorkerProcess(index, (self.size, self.device, self.compute_type, self.cpu_threads, 1), self.transcribe_options, self.max_samples, self.warm_up)
+            try:
+                status, payload = worker.receive(lambda: not self.running)
+            except WorkerCrashed as e:
+                worker.close()
+                if not self.running:
+                    return None
+                failures += 1
+                logging.error(f"{str(e)} while loading the model")
+                if failures >= MAX_RESTARTS:
+                    return self.give_up(RuntimeError(f"Model worker {index} crashed {failures} times while loading"))
+                self.restarts += 1
+                continue
+            if status == "error":
+                worker.close()
+                logging.error(payload)
+                return self.give_up(RuntimeError(payload))
+            with self.cond:
+                self.ready_workers += 1
+            self.handle.load_seconds, self.handle.warm_up_seconds = payload
+            self.handle.set_ready()
+            logging.info(f"Model worker {index} ready (pid {worker.process.pid}).")
+            return worker
+        return None
+    def give_up(self, error):
+        if not self.handle.ready.is_set():
+            self.handle.error = error
+            self.handle.set_ready()
+        self.fail_pending(error)
+        return None
+    def run(self, index):
+        worker = self.spawn(index)
+        while worker is not None:
+            jobs = self.take_jobs()
+            if not jobs:
+                break
+            job = jobs[0]
+            job.started = time.time()
+            try:
+                job.result = worker.transcribe(job.audio, job.kwargs)
+            except WorkerCrashed as e:
+                logging.error(f"{str(e)}, restarting it")
+                job.error = e
+                worker.close()
+                with self.cond:
+                    self.ready_workers -= 1
+                    self.restarts += 1
+                worker = None
+            except Exception as e:
+                job.error = e
+            self.finish_jobs(jobs, job.started)
+            if worker is None:
+                worker = self.spawn(index)
+        if worker is not None:
+            worker.close()
+            with self.cond:
+                self.ready_workers -= 1
+    def release(self):
+        self.handle = None
+    def stats(self):
+        result = super().stats()
+        for item in result.values():
+            item["restarts"] = self.restarts
+        return result